@@ -1,9 +1,7 @@
 import requests
 import json
-import base64
 from datetime import datetime
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType
+from notify_outbox import NotificationOutbox, SendGridTransport, make_attachment
 
 # Define the base URL
 base_url = "https://services.nvd.nist.gov/rest/json/cves/1.0"
@@ -36,33 +34,16 @@ if response.status_code == 200:
 
     # Prepare for email sending
     with open(filename, "rb") as f:
-        data = f.read()
-        encoded = base64.b64encode(data).decode()
-
-    attachment = Attachment(
-        FileContent(encoded),
-        FileName(filename),
-        FileType('application/json')
-    )
-
-    # Create the Mail object and append the attachment
-    message = Mail(
-        from_email='user@example.com',
-        to_emails='user@example.com',
-        subject='NIST CVE Data for Cisco',
-        plain_text_content='Please find attached the NIST CVE data related to Cisco devices.'
+        attachment = make_attachment(filename, f.read(), 'application/json')
+
+    # Queue the email; failed sends stay in the outbox spool and are retried on the next run
+    outbox = NotificationOutbox(SendGridTransport('SG.XYZ', 'user@example.com', 'user@example.com'))
+    outbox.enqueue(
+        'NIST CVE Data for Cisco',
+        'Please find attached the NIST CVE data related to Cisco devices.',
+        attachments=[attachment]
     )
-    message.attachment = attachment
-
-    # Send the email
-    try:
-        sg = SendGridAPIClient('SG.XYZ')
-        response = sg.send(message)
-        print(response.status_code)
-        print(response.body)
-        print(response.headers)
-    except Exception as e:
-        print(f"Error sending email: {e}")
+    outbox.close()
 
 else:
     print(f"Failed to retrieve data. Status code: {response.status_code}")
\ No newline at end of file
@@ -1,72 +1,97 @@
 import paramiko
-import time
 import maskpass
+from ios_shell import wait_for_prompt, send_and_wait, stream_config_lines
+from config_transfer import push_config_via_transfer
+from ios_config_lint import lint_config_file, report_lint_issues
 
-def recv_all(channel, timeout=10):
-    start_time = time.time()
-    data = b""
-    while True:
-        if channel.recv_ready():
-            recv_data = channel.recv(65535)
-            data += recv_data
-            start_time = time.time()
-        elif time.time() - start_time > timeout:
-            break
-        else:
-            time.sleep(1)
-    return data
+def load_config_lines(config_file):
+    """Reads a configuration file once, dropping blank lines and '!'/'#' comments (as the linter does)."""
+    with open(config_file, 'r') as file:
+        return [line.rstrip() for line in file if line.strip() and not line.strip().startswith(('!', '#'))]
+
+def push_configs_via_transfer(ip, username, password, config_files):
+    """
+    Uploads all configuration files as one file over SCP and applies it with
+    'copy flash:<file> running-config' instead of typing it line by line.
+    """
+    config_text = "\n".join(line for config_file in config_files for line in load_config_lines(config_file))
+    success, output, errors = push_config_via_transfer(ip, username, password, config_text)
+    for error in errors:
+        print(f"  {error}")
+    print(f"Transfer push to {ip} {'succeeded' if success else 'failed'}.")
+    return [("transfer", "", error) for error in errors]
+
+def push_configs(ip, username, password, config_files, transfer_mode="cli"):
+    """
+    Pushes several configuration files to a Cisco switch over a single SSH session.
+
+    Lines are streamed paced by the device's echoed prompts, and any
+    '% Invalid'/'% Incomplete' errors are reported with the line that caused them.
+    transfer_mode="scp" uploads all files in one transfer instead.
+
+    Returns:
+        list: (config_file, line, error) tuples for every rejected line.
+    """
+    # Check every file offline before opening a connection
+    lint_issues = [issue for config_file in config_files for issue in lint_config_file(config_file)]
+    if report_lint_issues(lint_issues):
+        return [(issue.source, issue.line, issue.message) for issue in lint_issues if issue.severity == 'error']
+
+    if transfer_mode == "scp":
+        return push_configs_via_transfer(ip, username, password, config_files)
 
-def push_config(ip, username, password, config_file):
     # Connect to the Cisco switch
     ssh = paramiko.SSHClient()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    all_errors = []
 
     try:
         print(f"Connecting to {ip}...")
         ssh.connect(ip, username=username, password=password, look_for_keys=False)
 
-        # Open the configuration file
-        print(f"Reading configuration from {config_file}...")
-        with open(config_file, 'r') as file:
-            config_text = file.read()
-
         # Start an SSH shell
         print("Starting SSH shell...")
         shell = ssh.invoke_shell()
-        output = recv_all(shell)
+        output, prompt_seen = wait_for_prompt(shell)
+        if not prompt_seen:
+            print(f"No prompt received from {ip}.")
+            return all_errors
 
         # Enter privileged mode
-        #shell.send('enable\n')
-        #shell.send(enable_password + '\n')
-        time.sleep(1)
-        output = recv_all(shell)
+        #send_and_wait(shell, 'enable')
+        #send_and_wait(shell, enable_password)
 
         # Send the configuration commands
         print("Entering configure terminal...")
-        shell.send('configure terminal\n')
-        time.sleep(1)
-        output = recv_all(shell)
-
-        # Read and send the configuration file in chunks
-        with open(config_file, 'r') as file:
-            print("Sending configuration...")
-            while True:
-                chunk = file.read(1024)
-                if not chunk:
-                    break
-                shell.send(chunk)
-                time.sleep(1)
-
-        # Send "exit" to exit configuration terminal
-        #shell.send('exit\n')
-        time.sleep(1)
-
-        # Capture the remaining output
-        output = recv_all(shell)
-
-        # Print the output
+        output, state = send_and_wait(shell, 'configure terminal')
+        if state != 'prompt':
+            print(f"Could not enter configure terminal on {ip}.")
+            return all_errors
+
+        for config_file in config_files:
+            print(f"Reading configuration from {config_file}...")
+            lines = load_config_lines(config_file)
+            print(f"Sending {len(lines)} lines from {config_file}...")
+            result = stream_config_lines(shell, lines)
+            for line, error in result['errors']:
+                all_errors.append((config_file, line, error))
+                print(f"  {config_file}: '{line}' -> {error}")
+            if result['timed_out']:
+                print(f"Timed out on {config_file} after {result['completed']} of {len(lines)} lines.")
+                return all_errors
+            print(f"{config_file}: {result['completed']} lines applied, {len(result['errors'])} errors.")
+
+        # Send "end" to exit configuration terminal
+        send_and_wait(shell, 'end')
+
+        # Print the summary
         print("Configuration Output:")
-        print(output.decode('utf-8'))
+        if all_errors:
+            print(f"{len(all_errors)} lines were rejected by {ip}:")
+            for config_file, line, error in all_errors:
+                print(f"  {config_file}: {line}\n    {error}")
+        else:
+            print(f"All configuration files applied to {ip} without errors.")
 
     except paramiko.AuthenticationException:
         print("Authentication failed. Please check your credentials.")
@@ -77,6 +102,7 @@ def push_config(ip, username, password, config_file):
     finally:
         # Close the SSH connection
         ssh.close()
+    return all_errors
 
 # Usage example
 ip_address = input('Enter IP address: ')  # IP address of the Cisco switch
@@ -95,17 +121,20 @@ config_file_path_7 = 'aaa_config_part_7.txt'  # Path to the configuration text f
 config_file_path_8 = 'aaa_config_part_8.txt'  # Path to the configuration text file
 config_file_path_9 = 'aaa_config_part_9.txt'  # Path to the configuration text file
 config_file_path_snmp = 'snmp_config_1.txt'  # Path to the configuration text file
+transfer_mode = 'cli'  # 'cli' types the lines; 'scp' uploads them to flash and copies to running-config
 
-# Call the function with debugging
-push_config(ip_address, username, password, config_file_path_1)
-push_config(ip_address, username, password, config_file_path_2)
-push_config(ip_address, username, password, config_file_path_2_1)
-push_config(ip_address, username, password, config_file_path_2_2)
-push_config(ip_address, username, password, config_file_path_3)
-push_config(ip_address, username, password, config_file_path_4)
-push_config(ip_address, username, password, config_file_path_5)
-push_config(ip_address, username, password, config_file_path_6)
-push_config(ip_address, username, password, config_file_path_7)
-push_config(ip_address, username, password, config_file_path_8)
-push_config(ip_address, username, password, config_file_path_9)
-push_config(ip_address, username, password, config_file_path_snmp)
\ No newline at end of file
+# Push every file over one session
+push_configs(ip_address, username, password, [
+    config_file_path_1,
+    config_file_path_2,
+    config_file_path_2_1,
+    config_file_path_2_2,
+    config_file_path_3,
+    config_file_path_4,
+    config_file_path_5,
+    config_file_path_6,
+    config_file_path_7,
+    config_file_path_8,
+    config_file_path_9,
+    config_file_path_snmp,
+], transfer_mode)
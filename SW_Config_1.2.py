@@ -1,11 +1,64 @@
 import paramiko
 import getpass
 import time
+from config_transfer import push_config_via_transfer
+from ios_config_lint import lint_config_file, report_lint_issues, next_mode
+
+def config_lines_for_transfer(lines):
+    """
+    Keeps only the configuration lines of a command file typed from the exec prompt:
+    'configure terminal', 'end', 'do ...' and exec commands such as 'show' or 'write'
+    are not valid in a file applied with 'copy flash: running-config'.
+
+    Returns:
+        tuple: (list: config lines, list: dropped exec lines)
+    """
+    config_lines, dropped = [], []
+    mode = 'exec'
+    for raw_line in lines:
+        text = raw_line.strip()
+        if not text or text.startswith(('!', '#')):
+            continue
+        keyword = text.split()[0].lower()
+        if mode == 'exec':
+            if next_mode('exec', text):
+                mode = 'global'
+            else:
+                dropped.append(text)
+            continue
+        if keyword == 'end' or (keyword == 'exit' and mode == 'global'):
+            mode = 'exec'
+            continue
+        if keyword == 'exit':
+            mode = 'global'
+        elif keyword == 'do':
+            dropped.append(text)
+            continue
+        elif next_mode('global', text):
+            mode = 'sub'
+        config_lines.append(raw_line.rstrip())
+    return config_lines, dropped
+
+def ssh_to_cisco(host, port, command_file, transfer_mode='cli'):
+    # Commands are typed from the exec prompt; check them before connecting
+    if report_lint_issues(lint_config_file(command_file, start_mode='exec')):
+        return
 
-def ssh_to_cisco(host, port, command_file):
     username = input("Enter your username: ")
     password = getpass.getpass("Enter your password: ")
 
+    if transfer_mode == 'scp':
+        # Upload the config lines in one transfer and apply them from flash
+        with open(command_file, 'r') as file:
+            config_lines, dropped = config_lines_for_transfer(file.read().splitlines())
+        for line in dropped:
+            print(f"Not run in scp mode (exec command): {line}")
+        success, output, errors = push_config_via_transfer(host, username, password, "\n".join(config_lines), port=port)
+        print(f"Output: {output}\n{'-'*40}\n")
+        for error in errors:
+            print(f"Error: {error}")
+        return
+
     ssh_client = paramiko.SSHClient()
     ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
     
@@ -16,9 +69,9 @@ def ssh_to_cisco(host, port, command_file):
     remote_conn = ssh_client.invoke_shell()
     time.sleep(1)  # give the shell a second to establish
     
-    # Read commands from the file and execute
+    # Read commands from the file and execute; '#' comments are for the reader, not the device
     with open(command_file, 'r') as file:
-        commands = file.readlines()
+        commands = [line for line in file if not line.strip().startswith('#')]
 
     for command in commands:
         remote_conn.send(command + '\n')
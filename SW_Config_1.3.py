@@ -1,6 +1,18 @@
 import paramiko
 import getpass
 import time
+from ios_shell import wait_for_prompt, send_and_wait, stream_config_lines
+from config_transfer import push_config_via_transfer
+from ios_config_lint import lint_config_lines, report_lint_issues
+
+# What to do when a device rejects a command:
+#   'continue'    - keep sending the remaining commands and record the errors
+#   'skip_device' - stop sending to this device and move on to the next one
+#   'abort_run'   - stop the whole run; the same error would repeat on every switch
+ERROR_POLICY = 'skip_device'
+
+# 'cli' sends commands one by one; 'scp' uploads them to flash and copies them to running-config
+TRANSFER_MODE = 'cli'
 
 # Function to log SSH failures
 def log_ssh_failure(ip, error_message, log_path):
@@ -8,8 +20,10 @@ def log_ssh_failure(ip, error_message, log_path):
         log_file.write(f"{ip} - {error_message}\n")
 
 # ssh_to_switch function with try-except for logging and command output capture
-def ssh_to_switch(ip, username, password, commands, log_path):
+def ssh_to_switch(ip, username, password, commands, log_path, error_policy=ERROR_POLICY):
     output = ""  # Initialize output string
+    errors = []  # (command, error message) pairs reported by the device
+    start_time = time.time()
     try:
         print(f"Connecting to {ip}...")
         ssh = paramiko.SSHClient()
@@ -17,20 +31,32 @@ def ssh_to_switch(ip, username, password, commands, log_path):
         ssh.connect(ip, username=username, password=password)
 
         channel = ssh.invoke_shell()
-        response = channel.recv(10000).decode('utf-8')
+        response, prompt_seen = wait_for_prompt(channel)
         output += f"Initial response from {ip}: {response}\n"  # Append initial response to output
+        if not prompt_seen:
+            raise paramiko.SSHException("No prompt received from device")
 
-        channel.send('enable\n')
-        time.sleep(1)
+        if not response.rstrip().endswith('#'):
+            response, state = send_and_wait(channel, 'enable')
+            output += response
 
-        channel.send('conf t\n')
-        time.sleep(1)
+        response, state = send_and_wait(channel, 'conf t')
+        output += response
+        if state != 'prompt':
+            raise paramiko.SSHException("Could not enter configuration mode")
+
+        # Send one command at a time and read its response before the next one
+        print(f"Sending {len(commands)} commands to {ip}")
+        result = stream_config_lines(channel, commands, window=1, stop_on_error=(error_policy != 'continue'))
+        output += result['output']
+        errors = result['errors']
+        for command, error in errors:
+            print(f"{ip} rejected '{command}': {error}")
+        if result['timed_out']:
+            errors.append((commands[min(result['completed'], len(commands) - 1)], "Timed out waiting for the device prompt"))
+        if errors and error_policy != 'continue':
+            output += f"\nStopped after {result['completed']} of {len(commands)} commands due to errors.\n"
 
-        for command in commands:
-            print(f"Sending command to {ip}: {command}")
-            channel.send(command + "\n")
-            time.sleep(10)  # Delay before sending next command
-        
         channel.close()
         ssh.close()
     except Exception as e:
@@ -38,7 +64,13 @@ def ssh_to_switch(ip, username, password, commands, log_path):
         print(f"Failed to connect to {ip}. Error: {error_message}")
         log_ssh_failure(ip, error_message, log_path)
         output += f"Failed to connect to {ip}. Error: {error_message}\n"
-    return output  # Return the collected output
+    elapsed = time.time() - start_time
+    output += f"\nElapsed: {elapsed:.1f}s\n"
+    if errors:
+        output += f"Errors on {ip}:\n"
+        for command, error in errors:
+            output += f"  {command}: {error}\n"
+    return output, errors  # Return the collected output and device errors
 
 def main():
     username = input("Enter your username: ")
@@ -47,15 +79,28 @@ def main():
     commands = ['int range gig 1/0/1 - 48',
                 'do wr mem']
 
+    # Refuse to start a run that would fail on every switch
+    if report_lint_issues(lint_config_lines(commands, "commands")):
+        return
+
     with open('ip_addresses.txt', 'r') as file:
         ip_addresses = [line.strip() for line in file.readlines()]
 
     with open('output.txt', 'a') as file:
         for ip in ip_addresses:
-            output = ssh_to_switch(ip, username, password, commands, log_file_path)
+            if TRANSFER_MODE == 'scp':
+                success, output, transfer_errors = push_config_via_transfer(ip, username, password, "\n".join(commands))
+                errors = [("transfer", error) for error in transfer_errors]
+                output += "".join(f"\n  {error}" for error in transfer_errors)
+            else:
+                output, errors = ssh_to_switch(ip, username, password, commands, log_file_path)
             file.write("\n" + "="*50 + "\n")  # Corrected line separators
             file.write(output)
             file.write("\n" + "="*50 + "\n")
+            if errors and ERROR_POLICY == 'abort_run':
+                print(f"Aborting run: {ip} rejected the configuration, remaining devices not attempted.")
+                file.write(f"\nRun aborted after {ip}; remaining devices not attempted.\n")
+                break
 
 if __name__ == "__main__":
     main()
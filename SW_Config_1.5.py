@@ -1,6 +1,9 @@
 import netmiko
 import getpass
 import os
+from config_transfer import push_config_via_transfer
+from ios_config_lint import lint_config_file, report_lint_issues
+from ios_config_tree import parse_config_tree, compute_config_delta
 
 # --- User Inputs ---
 username = input("Enter SSH username: ")
@@ -12,6 +15,17 @@ config_commands_file = "2960x_config.txt" # File containing configuration comman
 log_file = "2960x_deployment_log.txt"
 error_log_file = "2960x_ssh_error_log.txt"
 
+# --- Deployment Mode ---
+# 'delta' reads the running-config once per device and pushes only missing lines
+# (with their parent context); 'full' pushes every line on every device.
+# Delta compares lines in running-config form: interface names and the keywords in
+# ios_config_tree.ARGUMENT_KEYWORDS are expanded ('int gi1/0/1', 'sw mode acc') and
+# 'interface range' is split per interface. Any other abbreviation never matches and
+# is pushed on every run, so write such lines out in full.
+deploy_mode = "delta"
+# 'cli' sends lines with send_config_set; 'scp' uploads them to flash and copies to running-config
+transfer_mode = "cli"
+
 # --- Load Configuration Commands ---
 def load_config_commands(filepath):
     """Loads configuration commands from a text file, ignoring comments."""
@@ -26,7 +40,17 @@ def load_config_commands(filepath):
         print(f"Error: Configuration commands file '{filepath}' not found. Please create it.")
         return []
 
+# --- Hierarchical Config Comparison ---
+def load_config_tree(filepath):
+    """Loads the desired configuration as a tree, keeping the file's indentation."""
+    try:
+        with open(filepath, 'r') as f:
+            return parse_config_tree(f.read().splitlines())
+    except FileNotFoundError:
+        return {}
+
 config_commands = load_config_commands(config_commands_file)
+config_tree = load_config_tree(config_commands_file)
 
 # --- Main Logic ---
 def main():
@@ -34,6 +58,11 @@ def main():
         print("Script cannot proceed without configuration commands. Exiting.")
         return
 
+    # Check the config offline before opening any SSH session
+    if report_lint_issues(lint_config_file(config_commands_file)):
+        print(f"Fix '{config_commands_file}' and re-run. No devices were contacted.")
+        return
+
     # Initialize log files (clear previous content if they exist)
     with open(log_file, "w") as log_output:
         log_output.write("--- Cisco 2960X Configuration Deployment Log ---\n\n")
@@ -72,11 +101,34 @@ def main():
                 log_output.write(f"Successfully connected to {ip_address}\n")
                 print(f"  Connected to {ip_address}")
 
+                commands_to_send = config_commands
+                if deploy_mode == "delta":
+                    # One read per device; compare against the running-config locally
+                    running_config = net_connect.send_command("show running-config")
+                    running_tree = parse_config_tree(running_config.splitlines())
+                    commands_to_send = compute_config_delta(config_tree, running_tree)
+                    if not commands_to_send:
+                        log_output.write(f"  Status: Already compliant, nothing to push.\n")
+                        print(f"  {ip_address} is already compliant, skipping.")
+                        continue
+                    log_output.write(f"  Delta: {len(commands_to_send)} of {len(config_commands)} lines missing or changed.\n")
+                    print(f"  {len(commands_to_send)} lines missing or changed on {ip_address}")
+
                 # Push configuration commands
                 print(f"  Pushing configuration to {ip_address}...")
-                output = net_connect.send_config_set(config_commands)
+                if transfer_mode == "scp":
+                    # The transfer opens its own SSH session; don't hold a second vty meanwhile
+                    net_connect.disconnect()
+                    net_connect = None
+                    log_output.write(f"  Disconnected from {ip_address} before the file transfer\n")
+                    success, output, transfer_errors = push_config_via_transfer(
+                        ip_address, username, password, "\n".join(commands_to_send))
+                    if not success:
+                        raise RuntimeError("; ".join(transfer_errors))
+                else:
+                    output = net_connect.send_config_set(commands_to_send)
                 log_output.write(f"  Configuration Commands Sent:\n")
-                for cmd in config_commands:
+                for cmd in commands_to_send:
                     log_output.write(f"    {cmd}\n")
                 log_output.write(f"  Configuration Output:\n{output}\n")
                 log_output.write(f"  Status: Configuration applied successfully.\n")
@@ -1,42 +1,56 @@
 import paramiko
 import time
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import re
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import config # Import the configuration file
+from ios_shell import wait_for_prompt, send_and_wait, SAVE_OK_PATTERN
+from notify_outbox import NotificationOutbox, SMTPTransport
 
 # --- File Paths ---
 # These paths can remain here or be moved to config.py as well.
 LOG_FILE_PATH = 'script_output.log'
 IP_LIST_FILENAME = "ip_address.txt"
 
+# --- Command Timeouts (seconds) ---
+# Commands complete as soon as the device prompt (or a confirmation prompt) appears;
+# these are only upper bounds for devices that never answer.
+DEFAULT_COMMAND_TIMEOUT = 10
+COMMAND_TIMEOUTS = {
+    'copy run start': 15,
+    'startup-config': 60, # Answering the destination prompt starts the actual save
+}
+
+# --- Rollout Settings ---
+# 'waves' pushes to a canary batch first, then growing parallel batches;
+# 'sequential' processes one switch at a time.
+ROLLOUT_MODE = 'waves'
+CANARY_SIZE = 5             # Switches in the first wave
+WAVE_GROWTH_FACTOR = 4      # Each wave is this many times larger than the previous one
+MAX_CONCURRENCY = 50        # Upper bound on parallel SSH sessions (and wave size)
+MAX_FAILURE_RATE = 0.10     # Stop the rollout when more than 10% of processed switches failed
+
+log_lock = threading.Lock()
+
 
 # --- Helper Functions ---
 
-def send_email(subject, body, sender, recipient, smtp_server, smtp_port):
+def create_outbox():
     """
-    Sends an email using the provided details.
+    Creates the notification outbox that batches per-switch emails into digests
+    sent over one persistent SMTP connection.
     """
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = sender
-        msg['To'] = recipient
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-
-        print(f"Connecting to SMTP server {smtp_server}:{smtp_port}...")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        # If your SMTP server requires authentication, uncomment the next line
-        # and replace with your email password or an app-specific password.
-        # server.login(sender, "YOUR_EMAIL_PASSWORD")
-        server.sendmail(sender, recipient, msg.as_string())
-        server.quit()
-        print(f"Email sent successfully to {recipient}")
-    except Exception as e:
-        print(f"Error sending email: {e}")
+    transport = SMTPTransport(
+        config.SMTP_SERVER,
+        config.SMTP_PORT,
+        config.SENDER_EMAIL,
+        config.RECIPIENT_EMAIL,
+        # If your SMTP server requires authentication, set the username and
+        # password (or an app-specific password) here.
+        # username=config.SENDER_EMAIL, password="YOUR_EMAIL_PASSWORD",
+    )
+    return NotificationOutbox(transport).start()
 
 def log_output(ip, message, log_path):
     """
@@ -44,14 +58,17 @@ def log_output(ip, message, log_path):
     """
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     log_entry = f"[{timestamp}] - {ip}\n{message}\n{'='*60}\n"
-    with open(log_path, 'a') as log_file:
-        log_file.write(log_entry)
+    # Parallel waves share the log file; keep each entry contiguous
+    with log_lock:
+        with open(log_path, 'a') as log_file:
+            log_file.write(log_entry)
 
 # --- Core SSH Function ---
 
 def ssh_to_switch(ip, username, password, commands):
     """
     Connects to a network switch via SSH and executes a list of commands.
+    Each command completes when the device prompt or a confirmation prompt is read back.
 
     Args:
         ip (str): The IP address of the switch.
@@ -79,26 +96,36 @@ def ssh_to_switch(ip, username, password, commands):
         )
         print(f"Successfully connected to {ip}.")
 
-        # Invoke an interactive shell
+        # Invoke an interactive shell and wait for the banner and prompt
         channel = ssh.invoke_shell()
-        time.sleep(2) # Wait for the shell to be ready
-
-        # Read the initial banner and prompt
-        initial_response = channel.recv(65535).decode('utf-8')
+        initial_response, prompt_seen = wait_for_prompt(channel, DEFAULT_COMMAND_TIMEOUT)
         output += f"--- Initial Response from {ip} ---\n{initial_response}\n"
+        if not prompt_seen:
+            channel.close()
+            ssh.close()
+            return (False, output + f"\nNo device prompt received from {ip} within {DEFAULT_COMMAND_TIMEOUT}s.")
 
-        # Execute each command with a fixed delay
+        # Execute each command, waiting only as long as the device needs
+        save_started = False
         for command in commands:
             print(f"Sending command to {ip}: {command}")
-            channel.send(command + "\n")
-            # Wait for a fixed amount of time for the command to execute.
-            # Adjust this value if your devices are slower or faster.
-            time.sleep(5)
-            # Capture the output after the delay
-            if channel.recv_ready():
-                 command_output = channel.recv(65535).decode('utf-8')
-                 output += f"\n--- Output for Command: '{command}' ---\n{command_output}"
+            timeout = COMMAND_TIMEOUTS.get(command, DEFAULT_COMMAND_TIMEOUT)
+            command_output, state = send_and_wait(channel, command, timeout)
+            output += f"\n--- Output for Command: '{command}' ---\n{command_output}"
+            if state == 'timeout':
+                channel.close()
+                ssh.close()
+                return (False, output + f"\nTimed out after {timeout}s waiting for '{command}' on {ip}.")
+            if command == 'copy run start':
+                save_started = True
+            if save_started and SAVE_OK_PATTERN.search(command_output):
+                output += f"\nConfiguration saved on {ip} ([OK] received)."
+                save_started = False
 
+        if save_started:
+            channel.close()
+            ssh.close()
+            return (False, output + f"\n'copy run start' on {ip} did not report [OK].")
 
         print(f"Finished commands for {ip}.")
         channel.close()
@@ -118,6 +145,96 @@ def ssh_to_switch(ip, username, password, commands):
         print(error_message)
         return (False, error_message)
 
+def process_switch(ip, commands, outbox):
+    """
+    Runs the configuration on one switch, logs the output and queues the result email.
+
+    Returns:
+        bool: True if the switch was configured successfully.
+    """
+    print(f"--- Starting process for {ip} ---")
+    # Use credentials from the imported config file
+    success, result_output = ssh_to_switch(ip, config.SSH_USERNAME, config.SSH_PASSWORD, commands)
+
+    # Log the full output regardless of success or failure
+    log_output(ip, result_output, LOG_FILE_PATH)
+
+    # Send email based on the result using settings from the config file
+    if success:
+        subject = f"SUCCESS: Configuration script completed for {ip}"
+        body = (
+            f"The configuration script has successfully run on the switch at {ip}.\n\n"
+            f"Please see the attached log file '{LOG_FILE_PATH}' on the script server for detailed output."
+        )
+        outbox.enqueue(subject, body)
+    else:
+        subject = f"ERROR: Configuration script failed for {ip}"
+        body = (
+            f"The configuration script encountered an error for the switch at {ip}.\n\n"
+            f"Error Message:\n{result_output}\n\n"
+            f"Please check the device and the log file '{LOG_FILE_PATH}' on the script server for more details."
+        )
+        outbox.enqueue(subject, body)
+    print("-" * 35)
+    return success
+
+def plan_waves(ip_addresses, canary_size, growth_factor, max_wave_size):
+    """
+    Splits the IP list into waves: a canary batch, then batches growing by
+    growth_factor up to max_wave_size.
+    """
+    waves = []
+    wave_size = max(1, min(canary_size, max_wave_size))
+    index = 0
+    while index < len(ip_addresses):
+        waves.append(ip_addresses[index:index + wave_size])
+        index += wave_size
+        wave_size = min(wave_size * growth_factor, max_wave_size)
+    return waves
+
+def rollout_in_waves(ip_addresses, commands, outbox):
+    """
+    Pushes the configuration in parallel waves, stopping when the cumulative
+    failure rate exceeds MAX_FAILURE_RATE.
+
+    Returns:
+        tuple: (list: succeeded IPs, list: failed IPs, list: IPs not attempted)
+    """
+    waves = plan_waves(ip_addresses, CANARY_SIZE, WAVE_GROWTH_FACTOR, MAX_CONCURRENCY)
+    succeeded, failed = [], []
+    print(f"Rolling out to {len(ip_addresses)} switches in {len(waves)} waves "
+          f"(canary {len(waves[0])}, max {MAX_CONCURRENCY} in parallel).")
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        for wave_number, wave in enumerate(waves, start=1):
+            wave_start = time.time()
+            label = "canary" if wave_number == 1 else f"wave {wave_number}"
+            print(f"\n=== Starting {label}: {len(wave)} switches ===")
+            results = list(executor.map(lambda ip: process_switch(ip, commands, outbox), wave))
+
+            wave_failed = [ip for ip, ok in zip(wave, results) if not ok]
+            succeeded.extend(ip for ip, ok in zip(wave, results) if ok)
+            failed.extend(wave_failed)
+            processed = len(succeeded) + len(failed)
+            failure_rate = len(failed) / processed
+            print(f"=== {label} finished in {time.time() - wave_start:.1f}s: "
+                  f"{len(wave) - len(wave_failed)} ok, {len(wave_failed)} failed. "
+                  f"Progress {processed}/{len(ip_addresses)}, failure rate {failure_rate:.0%} ===")
+
+            if failure_rate > MAX_FAILURE_RATE:
+                remaining = [ip for later in waves[wave_number:] for ip in later]
+                print(f"\nStopping rollout: failure rate {failure_rate:.0%} exceeds "
+                      f"{MAX_FAILURE_RATE:.0%}. {len(remaining)} switches were not attempted.")
+                outbox.enqueue(
+                    f"HALTED: Configuration rollout stopped after {label}",
+                    f"Failure rate {failure_rate:.0%} exceeded the {MAX_FAILURE_RATE:.0%} threshold.\n\n"
+                    f"Failed switches:\n" + "\n".join(failed) + "\n\n"
+                    f"Not attempted: {len(remaining)} switches."
+                )
+                return succeeded, failed, remaining
+
+    return succeeded, failed, []
+
 # --- Main Execution ---
 
 def main():
@@ -154,33 +271,18 @@ def main():
 
     print(f"\nFound {len(ip_addresses)} IP addresses to process.\n")
 
+    outbox = create_outbox()
+
     # --- Process each IP address ---
-    for ip in ip_addresses:
-        print(f"--- Starting process for {ip} ---")
-        # Use credentials from the imported config file
-        success, result_output = ssh_to_switch(ip, config.SSH_USERNAME, config.SSH_PASSWORD, commands_to_run)
-
-        # Log the full output regardless of success or failure
-        log_output(ip, result_output, LOG_FILE_PATH)
-
-        # Send email based on the result using settings from the config file
-        if success:
-            subject = f"SUCCESS: Configuration script completed for {ip}"
-            body = (
-                f"The configuration script has successfully run on the switch at {ip}.\n\n"
-                f"Please see the attached log file '{LOG_FILE_PATH}' on the script server for detailed output."
-            )
-            send_email(subject, body, config.SENDER_EMAIL, config.RECIPIENT_EMAIL, config.SMTP_SERVER, config.SMTP_PORT)
-        else:
-            subject = f"ERROR: Configuration script failed for {ip}"
-            body = (
-                f"The configuration script encountered an error for the switch at {ip}.\n\n"
-                f"Error Message:\n{result_output}\n\n"
-                f"Please check the device and the log file '{LOG_FILE_PATH}' on the script server for more details."
-            )
-            send_email(subject, body, config.SENDER_EMAIL, config.RECIPIENT_EMAIL, config.SMTP_SERVER, config.SMTP_PORT)
-        print("-" * 35)
+    if ROLLOUT_MODE == 'waves':
+        succeeded, failed, skipped = rollout_in_waves(ip_addresses, commands_to_run, outbox)
+        print(f"\nRollout summary: {len(succeeded)} succeeded, {len(failed)} failed, {len(skipped)} not attempted.")
+    else:
+        for ip in ip_addresses:
+            process_switch(ip, commands_to_run, outbox)
 
+    # Send any queued notifications before exiting
+    outbox.close()
     print("\n--- Script finished for all IP addresses. ---")
 
 
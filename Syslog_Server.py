@@ -1,44 +1,632 @@
+import json
+import multiprocessing
+import os
+import select
+import signal
 import socket
+import struct
+import threading
+import time
+import urllib.request
+from collections import Counter, deque
+from notify_outbox import NotificationOutbox, SMTPTransport
+from syslog_dedup import Deduplicator
+from syslog_inventory import Enricher
+from syslog_metrics import MetricsServer, SourceRates, read_udp_drops
+from syslog_parser import parse_message
+from syslog_relay import Relay
+from syslog_rules import DEFAULT_RULES, RulesEngine, format_alert, load_rules
+from syslog_sketch import DEFAULT_LIMIT, DEFAULT_WINDOW, StreamSketches, merge_exports, summarize
+from syslog_store import SegmentStore, MAX_STORE_BYTES
+from syslog_tcp import StreamListener, make_server_ssl_context
 
-def start_syslog_server(address, port, log_file):
-    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    server.bind((address, port))
-    print(f"Starting syslog server on {address}:{port}")
+# --- Receiver Settings ---
+RECV_BUFFER_SIZE = 8 * 1024 * 1024  # Kernel socket buffer (SO_RCVBUF) to absorb bursts
+MAX_DATAGRAM_SIZE = 65535           # Full-size reads; nothing is truncated
+RECV_BATCH_SIZE = 512               # Datagrams drained per wakeup
+# --- Writer Settings ---
+FLUSH_INTERVAL = 1.0                # Seconds between file flushes
+FLUSH_BYTES = 1024 * 1024           # Flush early once this much is buffered
+STATS_INTERVAL = 10                 # Seconds between counter reports on the console
+# --- Ingest Queue Settings ---
+MAX_QUEUED_MESSAGES = 200000        # Messages buffered between the receive and write stages
+OVERFLOW_POLICY = 'drop_newest'     # 'drop_newest', 'drop_oldest' or 'block' (stop receiving; the kernel drops instead)
+MAX_TRACKED_SOURCES = 10000         # Per-source counters kept; further sources are counted as 'other'
+# --- Metrics Settings (see syslog_metrics) ---
+METRICS_ADDRESS = "127.0.0.1"
+METRICS_PORT = 9514                 # /metrics and /metrics.json; None disables. Workers use METRICS_PORT + 1 + id
+SKETCHES_ENABLED = True             # Live top talkers and distinct sources on /top (see syslog_sketch)
+DEDUP_ENABLED = True                # Collapse repeated messages in the store (see syslog_dedup)
+# --- Enrichment Settings (see syslog_inventory) ---
+INVENTORY_FILE = "devices.csv"      # Hostname/IP Address(/Site) CSV or SolarWinds JSON dump; reloaded when it changes
+REVERSE_DNS = True                  # Name sources missing from the inventory by PTR lookup (resolved in the background)
+# --- TCP/TLS Settings (RFC 6587 framing, see syslog_tcp) ---
+TCP_PORT = None                     # e.g. 5154; None disables the TCP listener
+TLS_PORT = None                     # e.g. 6514; requires TLS_CERTFILE and TLS_KEYFILE
+TLS_CERTFILE = "certs/syslog.crt"
+TLS_KEYFILE = "certs/syslog.key"
+TLS_CLIENT_CAFILE = None            # Set to require device client certificates
+# --- Alert Rules Settings (see syslog_rules) ---
+RULES_FILE = "syslog_rules.json"    # JSON list of rules; DEFAULT_RULES are used if it does not exist
+ALERT_SMTP_SERVER = None            # e.g. 'smtp-gateway.test.com' to also email alerts
+ALERT_SMTP_PORT = 25
+ALERT_SENDER = 'test@test.com'
+ALERT_RECIPIENT = 'test@test.com'
+# --- Relay Settings (see syslog_relay) ---
+RELAY_DESTINATIONS = []             # e.g. [{"name": "siem", "host": "10.0.0.50", "port": 6514, "cafile": "certs/siem-ca.pem"}]
+RELAY_SPOOL_DIR = "relay_spool"     # Messages for unreachable destinations are buffered here
+# --- Multi-process Settings ---
+# Processes sharing the UDP port via SO_REUSEPORT, e.g. os.cpu_count(). 1 runs a single
+# process; more is only used where the platform has SO_REUSEPORT (not on Windows)
+WORKER_COUNT = 1
+WORKER_COUNTERS = ('received', 'bytes_received', 'truncated', 'kernel_drops', 'written', 'bytes_written', 'flushes',
+                   'connections', 'framing_errors', 'alerts', 'dropped', 'queue_depth', 'queue_high_water', 'suppressed',
+                   'relayed', 'relay_spooled', 'relay_dropped')
+
+# Linux reports the socket's cumulative kernel drop count as ancillary data
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40)
+# Windows has no recvmsg(); datagrams are read with recvfrom() there, without kernel drop counts
+HAS_RECVMSG = hasattr(socket.socket, 'recvmsg')
+HAS_REUSEPORT = hasattr(socket, 'SO_REUSEPORT')
+
+
+class ServerStats:
+    """Thread-safe throughput and drop counters shared by the receive and write stages."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.received = 0
+        self.bytes_received = 0
+        self.truncated = 0
+        self.kernel_drops = 0
+        self.written = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.connections = 0
+        self.framing_errors = 0
+        self.alerts = 0
+        self.dropped = 0            # Discarded by the ingest queue's overflow policy
+        self.queue_depth = 0        # Messages waiting for the writer
+        self.queue_high_water = 0
+        self.suppressed = 0         # Duplicate copies collapsed into summary records
+        self.relayed = 0            # Sent to relay destinations (including replayed from the spool)
+        self.relay_spooled = 0      # Buffered on disk while a destination was down
+        self.relay_dropped = 0      # Discarded because a destination's memory queue was full
+        self.sources = Counter()    # Messages received per source IP
+        self.relay = None           # Relay whose totals are reported with the counters
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def set_queue_depth(self, depth):
+        with self.lock:
+            self.queue_depth = depth
+            self.queue_high_water = max(self.queue_high_water, depth)
+
+    def count_sources(self, batch):
+        with self.lock:
+            for data, addr, received_at in batch:
+                source = addr[0] if addr[0] in self.sources or len(self.sources) < MAX_TRACKED_SOURCES else 'other'
+                self.sources[source] += 1
+
+    def snapshot(self):
+        with self.lock:
+            snapshot = {name: value for name, value in vars(self).items() if name not in ('lock', 'sources', 'relay')}
+        if self.relay:
+            snapshot.update(self.relay.totals())
+        return snapshot
+
+    def source_snapshot(self):
+        with self.lock:
+            return dict(self.sources)
+
+
+def format_stats(stats, previous, interval):
+    rate = (stats['received'] - previous.get('received', 0)) / interval
+    return (f"[stats] received={stats['received']} ({rate:.0f} msg/s) written={stats['written']} "
+            f"kernel_drops={stats['kernel_drops']} truncated={stats['truncated']} "
+            f"bytes_written={stats['bytes_written']} flushes={stats['flushes']} "
+            f"connections={stats['connections']} framing_errors={stats['framing_errors']} alerts={stats['alerts']} "
+            f"dropped={stats['dropped']} queue={stats['queue_depth']} (max {stats['queue_high_water']}) "
+            f"suppressed={stats['suppressed']} relayed={stats['relayed']} relay_spooled={stats['relay_spooled']}")
+
+
+class BatchedLogWriter(threading.Thread):
+    """
+    Writes received messages in batches.
+    Each message is parsed into a SyslogRecord (see syslog_records) and appended to the
+    segmented store in store_dir; an optional plain-text log_file keeps the old format.
+    Output is flushed every FLUSH_INTERVAL seconds or once FLUSH_BYTES are buffered,
+    instead of one write and flush per message. Parsed records are also run through
+    the alert rules, if given, and repeated messages are collapsed before they reach
+    the store when DEDUP_ENABLED is set. Raw messages are handed to the relay, if given,
+    as they are submitted, before any queueing or dropping. With an enricher, records
+    get the inventory device name and site of their source before anything else sees them.
+    Every parsed record is also counted in the streaming sketches, if given.
+
+    The queue in front of the writer holds at most MAX_QUEUED_MESSAGES; when it is full,
+    OVERFLOW_POLICY decides what is dropped (and counted) so a stalled disk or console
+    never stops the receive loop, unless 'block' is chosen.
+    """
+    def __init__(self, stats, store_dir=None, log_file=None, echo=False, store_options=None, rules=None, relay=None,
+                 enricher=None, sketches=None):
+        super().__init__(name="syslog-writer", daemon=True)
+        self.log_file = log_file
+        self.store_dir = store_dir
+        self.store_options = store_options or {}
+        self.rules = rules
+        self.relay = relay
+        self.enricher = enricher
+        self.sketches = sketches
+        self.dedup = Deduplicator() if DEDUP_ENABLED and store_dir else None
+        self.stats = stats
+        self.echo = echo
+        self.batches = deque()
+        self.queued = 0  # Messages in self.batches
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+
+    def submit(self, batch, block=None):
+        """
+        Queues a batch for writing, applying OVERFLOW_POLICY when the queue is full.
+        block overrides the policy (stream listeners always block, since TCP can push back).
+        Returns the number of messages dropped.
+        """
+        self.stats.count_sources(batch)
+        if self.relay:
+            self.relay.submit(batch)  # Never blocks; each destination has its own queue and spool
+        block = OVERFLOW_POLICY == 'block' if block is None else block
+        dropped = 0
+        with self.condition:
+            if block:
+                while self.queued and self.queued + len(batch) > MAX_QUEUED_MESSAGES and not self.stop_event.is_set():
+                    self.condition.wait(0.1)
+            elif self.queued + len(batch) > MAX_QUEUED_MESSAGES:
+                if OVERFLOW_POLICY == 'drop_oldest':
+                    while self.batches and self.queued + len(batch) > MAX_QUEUED_MESSAGES:
+                        oldest = self.batches.popleft()
+                        self.queued -= len(oldest)
+                        dropped += len(oldest)
+                room = max(MAX_QUEUED_MESSAGES - self.queued, 0)
+                if len(batch) > room:
+                    dropped += len(batch) - room
+                    batch = batch[:room]
+            if batch:
+                self.batches.append(batch)
+                self.queued += len(batch)
+                self.condition.notify_all()
+            depth = self.queued
+        if dropped:
+            self.stats.add(dropped=dropped)
+        self.stats.set_queue_depth(depth)
+        return dropped
+
+    def take(self, timeout):
+        """Next batch to write, or None after timeout."""
+        with self.condition:
+            if not self.batches:
+                self.condition.wait(timeout)
+            if not self.batches:
+                return None
+            batch = self.batches.popleft()
+            self.queued -= len(batch)
+            self.condition.notify_all()
+            depth = self.queued
+        self.stats.set_queue_depth(depth)
+        return batch
 
-    with open(log_file, 'a') as f:
+    def pending(self):
+        """Number of batches waiting to be written; stream listeners pause reading above a limit."""
+        return len(self.batches)
+
+    def full(self):
+        return self.queued >= MAX_QUEUED_MESSAGES
+
+    def format_batch(self, batch):
+        return [f"Received from {addr}: {data.decode('utf-8', errors='replace')}\n" for data, addr, received_at in batch]
+
+    def parse_batch(self, batch):
+        records = [parse_message(data, addr, received_at) for data, addr, received_at in batch]
+        return self.enricher.enrich(records) if self.enricher else records
+
+    def run(self):
+        pending_bytes = 0
+        last_flush = time.time()
+        store = SegmentStore(self.store_dir, **self.store_options) if self.store_dir else None
+        f = open(self.log_file, 'a') if self.log_file else None
         try:
-            while True:
-                data, addr = server.recvfrom(1024)
-                log_entry = f"Received from {addr}: {data.decode('utf-8')}\n"
-                print(log_entry, end='')  # Print to console
-                f.write(log_entry)  # Write to file
-                f.flush()  # Flush the file buffer to ensure real-time writing
-        except KeyboardInterrupt:
-            print("\nStopping syslog server")
+            while not (self.stop_event.is_set() and not self.batches):
+                batch = self.take(FLUSH_INTERVAL)
+                if batch:
+                    written_bytes = 0
+                    records = self.parse_batch(batch) if store or self.rules or self.sketches else None
+                    if self.rules:
+                        self.rules.evaluate_batch(records)  # Alerts see every copy
+                    if self.sketches:
+                        self.sketches.update(records)
+                    if self.dedup:
+                        suppressed = self.dedup.suppressed
+                        records = self.dedup.process(records)
+                        self.stats.add(suppressed=self.dedup.suppressed - suppressed)
+                    if store:
+                        written_bytes += store.append(records)
+                    if f or self.echo:
+                        text = "".join(self.format_batch(batch))
+                        if self.echo:
+                            print(text, end='')  # Print to console
+                        if f:
+                            f.write(text)
+                            written_bytes += len(text)
+                    pending_bytes += written_bytes
+                    self.stats.add(written=len(batch), bytes_written=written_bytes)
+                elif self.dedup:
+                    # Quiet period: write summaries for windows that have ended
+                    pending_bytes += self.write_summaries(store, self.dedup.expire(time.time()))
+                if pending_bytes and (pending_bytes >= FLUSH_BYTES or time.time() - last_flush >= FLUSH_INTERVAL):
+                    if f:
+                        f.flush()
+                    if store:
+                        store.flush()
+                    self.stats.add(flushes=1)
+                    pending_bytes = 0
+                    last_flush = time.time()
         finally:
-            server.close()
+            if f:
+                f.close()
+            if store:
+                if self.dedup:
+                    self.write_summaries(store, self.dedup.flush(time.time()))
+                store.close()
+
+    def write_summaries(self, store, records):
+        written_bytes = store.append(records) if records else 0
+        self.stats.add(bytes_written=written_bytes)
+        return written_bytes
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        self.join()
 
-if __name__ == "__main__":
-    start_syslog_server("0.0.0.0", 5154, "syslog.txt")
-import socket
 
-def start_syslog_server(address, port, log_file):
+def open_udp_socket(address, port, reuse_port=False):
+    """
+    Binds the UDP socket with a large receive buffer and kernel drop reporting enabled.
+    With reuse_port, several processes can bind the same port and the kernel
+    spreads incoming datagrams across them.
+    """
     server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reuse_port:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+    try:
+        server.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+    except OSError:
+        pass  # Not supported on this platform; kernel drops stay at 0
     server.bind((address, port))
-    print(f"Starting syslog server on {address}:{port}")
+    server.setblocking(False)
+    return server
 
-    with open(log_file, 'a') as f:
+
+def receive_batch(server, max_batch=RECV_BATCH_SIZE):
+    """
+    Drains up to max_batch datagrams that are already queued on the socket.
+
+    Returns:
+        tuple: (list of (bytes, addr, received_at), int: truncated count, int or None: kernel drop total,
+               which is always None without recvmsg)
+    """
+    batch = []
+    truncated = 0
+    kernel_drops = None
+    now = time.time()
+    for _ in range(max_batch):
         try:
-            while True:
-                data, addr = server.recvfrom(1024)
-                log_entry = f"Received from {addr}: {data.decode('utf-8')}\n"
-                print(log_entry, end='')  # Print to console
-                f.write(log_entry)  # Write to file
-                f.flush()  # Flush the file buffer to ensure real-time writing
-        except KeyboardInterrupt:
-            print("\nStopping syslog server")
-        finally:
-            server.close()
+            if HAS_RECVMSG:
+                data, ancdata, flags, addr = server.recvmsg(MAX_DATAGRAM_SIZE, socket.CMSG_SPACE(4))
+            else:
+                data, addr = server.recvfrom(MAX_DATAGRAM_SIZE)
+                ancdata, flags = [], 0
+        except BlockingIOError:
+            break
+        for level, kind, value in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL and len(value) >= 4:
+                kernel_drops = struct.unpack('I', value[:4])[0]
+        if flags & socket.MSG_TRUNC:
+            truncated += 1
+        batch.append((data, addr, now))
+    return batch, truncated, kernel_drops
+
+
+def receive_loop(server, writer, stats, on_tick=None):
+    """Receives batches until interrupted, calling on_tick() about once a second."""
+    while True:
+        readable, _, _ = select.select([server], [], [], 1.0)
+        if readable:
+            batch, truncated, kernel_drops = receive_batch(server)
+            if batch:
+                writer.submit(batch)
+                stats.add(received=len(batch), bytes_received=sum(len(d) for d, a, t in batch), truncated=truncated)
+            if kernel_drops is not None:
+                with stats.lock:
+                    stats.kernel_drops = kernel_drops
+        if on_tick:
+            on_tick()
+
+
+def create_rules_engine(stats):
+    """
+    Loads the alert rules. Alerts are printed, counted and, with ALERT_SMTP_SERVER set,
+    emailed through a NotificationOutbox. Returns (engine, outbox or None).
+    """
+    rules = load_rules(RULES_FILE) if os.path.exists(RULES_FILE) else DEFAULT_RULES
+    outbox = None
+    if ALERT_SMTP_SERVER:
+        outbox = NotificationOutbox(SMTPTransport(ALERT_SMTP_SERVER, ALERT_SMTP_PORT, ALERT_SENDER, ALERT_RECIPIENT)).start()
+
+    def on_alert(alert):
+        stats.add(alerts=1)
+        print(format_alert(alert))
+        if outbox:
+            outbox.enqueue(f"Syslog alert: {alert.rule.name} on {alert.host}", format_alert(alert))
+
+    return RulesEngine(rules, on_alert), outbox
+
+
+def make_metrics_collector(stats, port):
+    """Returns the collect() function the metrics endpoint calls on each request."""
+    def collect():
+        metrics = stats.snapshot()
+        metrics['uptime_seconds'] = round(time.time() - metrics.pop('started'), 1)
+        metrics['queue_capacity'] = MAX_QUEUED_MESSAGES
+        metrics['proc_udp_drops'] = read_udp_drops(port)
+        if stats.relay:
+            metrics.update(stats.relay.metrics())
+        return metrics
+    return collect
+
+
+def start_relay(stats, spool_dir, enricher=None):
+    """Starts a sender per RELAY_DESTINATIONS entry; returns None when none are configured."""
+    if not RELAY_DESTINATIONS:
+        return None
+    relay = Relay(RELAY_DESTINATIONS, spool_dir, enricher).start()
+    stats.relay = relay
+    targets = ", ".join(f"{d['name']} ({d['host']}:{d['port']})" for d in RELAY_DESTINATIONS)
+    print(f"Relaying to {targets}")
+    return relay
+
+
+def start_enricher():
+    """Starts the inventory reloader; returns None when there is neither an inventory nor reverse DNS."""
+    if not (os.path.exists(INVENTORY_FILE) or REVERSE_DNS):
+        return None
+    enricher = Enricher(INVENTORY_FILE, reverse_dns=REVERSE_DNS)
+    enricher.start()
+    return enricher
+
+
+def sketch_views(sketches):
+    """Endpoints for the streaming sketches: '/top' summaries and mergeable '/sketch' exports."""
+    if sketches is None:
+        return {}
+    return {
+        '/top': lambda params: sketches.summary(int(params.get('window', DEFAULT_WINDOW)),
+                                                int(params.get('limit', DEFAULT_LIMIT))),
+        '/sketch': lambda params: sketches.export(int(params.get('window', DEFAULT_WINDOW))),
+    }
+
+def fetch_worker_top(workers, params):
+    """Supervisor '/top': merges the sketches exported by every worker's metrics endpoint."""
+    window = int(params.get('window', DEFAULT_WINDOW))
+    exports = []
+    for worker_id in range(workers):
+        url = f"http://{METRICS_ADDRESS}:{METRICS_PORT + 1 + worker_id}/sketch?window={window}"
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                exports.append(json.load(response))
+        except OSError as e:
+            print(f"Could not read sketches from worker {worker_id}: {e}")
+    if not exports:
+        raise OSError("no worker sketches available")
+    return summarize(merge_exports(exports), int(params.get('limit', DEFAULT_LIMIT)))
+
+
+def start_metrics_server(port, collect, rates=None, views=None):
+    if port is None:
+        return None
+    metrics_server = MetricsServer(METRICS_ADDRESS, port, collect, rates, views)
+    metrics_server.start()
+    print(f"Serving metrics on http://{METRICS_ADDRESS}:{port}/metrics")
+    return metrics_server
+
+
+def start_stream_listener(address, writer, stats, tcp_port=None, tls_port=None, reuse_port=False):
+    """Starts the TCP/TLS listeners (if any port is set) feeding the same writer as UDP."""
+    if not (tcp_port or tls_port):
+        return None
+    ssl_context = make_server_ssl_context(TLS_CERTFILE, TLS_KEYFILE, TLS_CLIENT_CAFILE) if tls_port else None
+    listener = StreamListener(address, writer, stats, tcp_port=tcp_port, tls_port=tls_port,
+                              ssl_context=ssl_context, reuse_port=reuse_port)
+    listener.start()
+    listener.wait_ready()
+    return listener
+
+
+def start_syslog_server(address, port, log_file=None, echo=False, store_dir=None, tcp_port=None, tls_port=None):
+    server = open_udp_socket(address, port)
+    print(f"Starting syslog server on {address}:{port} "
+          f"(rcvbuf={server.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} bytes)")
+
+    stats = ServerStats()
+    rules, outbox = create_rules_engine(stats)
+    print(f"Loaded {len(rules.rules)} alert rules")
+    enricher = start_enricher()
+    relay = start_relay(stats, RELAY_SPOOL_DIR, enricher)
+    sketches = StreamSketches() if SKETCHES_ENABLED else None
+    writer = BatchedLogWriter(stats, store_dir=store_dir, log_file=log_file, echo=echo, rules=rules, relay=relay,
+                              enricher=enricher, sketches=sketches)
+    writer.start()
+    listener = start_stream_listener(address, writer, stats, tcp_port, tls_port)
+    rates = SourceRates()
+    metrics_server = start_metrics_server(METRICS_PORT, make_metrics_collector(stats, port), rates,
+                                          sketch_views(sketches))
+    report = {'last': time.time(), 'previous': stats.snapshot(), 'sampled': 0}
+
+    def print_stats():
+        if time.time() - report['sampled'] >= 1:
+            rates.sample(stats.source_snapshot())
+            report['sampled'] = time.time()
+        if time.time() - report['last'] >= STATS_INTERVAL:
+            current = stats.snapshot()
+            print(format_stats(current, report['previous'], time.time() - report['last']))
+            report['previous'], report['last'] = current, time.time()
+
+    try:
+        receive_loop(server, writer, stats, on_tick=print_stats)
+    except KeyboardInterrupt:
+        print("\nStopping syslog server")
+    finally:
+        server.close()
+        if listener:
+            listener.stop()
+        writer.stop()
+        if relay:
+            relay.stop()
+        if outbox:
+            outbox.close()
+        if metrics_server:
+            metrics_server.stop()
+        print(format_stats(stats.snapshot(), report['previous'], max(time.time() - report['last'], 1e-6)))
+
+
+# --- Multi-process Mode ---
+
+def raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_worker(worker_id, address, port, store_dir, counters, store_options, tcp_port=None, tls_port=None):
+    """
+    Worker process: binds the shared port(s) with SO_REUSEPORT and writes its own
+    segments under store_dir/worker-<id>. Counters are published to the
+    supervisor through the shared array slot for this worker.
+    """
+    signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+    server = open_udp_socket(address, port, reuse_port=True)
+    stats = ServerStats()
+    # A device's datagrams hash to the same worker, so per-host thresholds still hold
+    rules, outbox = create_rules_engine(stats)
+    enricher = start_enricher()
+    relay = start_relay(stats, os.path.join(RELAY_SPOOL_DIR, f"worker-{worker_id}"), enricher)
+    sketches = StreamSketches() if SKETCHES_ENABLED else None
+    writer = BatchedLogWriter(stats, store_dir=os.path.join(store_dir, f"worker-{worker_id}"),
+                              store_options=store_options, rules=rules, relay=relay, enricher=enricher,
+                              sketches=sketches)
+    writer.start()
+    listener = start_stream_listener(address, writer, stats, tcp_port, tls_port, reuse_port=True)
+    # Per-source rates stay per worker; the supervisor's endpoint has the combined counters
+    rates = SourceRates()
+    metrics_server = start_metrics_server(METRICS_PORT + 1 + worker_id if METRICS_PORT else None,
+                                          make_metrics_collector(stats, port), rates, sketch_views(sketches))
+    slot = worker_id * len(WORKER_COUNTERS)
+
+    def publish():
+        current = stats.snapshot()
+        for i, name in enumerate(WORKER_COUNTERS):
+            counters[slot + i] = current[name]
+        rates.sample(stats.source_snapshot())
+
+    try:
+        receive_loop(server, writer, stats, on_tick=publish)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if listener:
+            listener.stop()
+        writer.stop()
+        if relay:
+            relay.stop()
+        if outbox:
+            outbox.close()
+        if metrics_server:
+            metrics_server.stop()
+        publish()
+
+def start_multiprocess_server(address, port, store_dir, workers=WORKER_COUNT, tcp_port=None, tls_port=None):
+    """
+    Supervisor: starts `workers` receiver processes on the same UDP port, restarts
+    any that exit, and prints counters aggregated across all of them.
+    """
+    counters = multiprocessing.Array('d', workers * len(WORKER_COUNTERS), lock=False)
+    retired = dict.fromkeys(WORKER_COUNTERS, 0)  # Totals from workers that were restarted
+    restarts = 0
+    # Each worker enforces its share of the store's size limit
+    store_options = {'max_bytes': MAX_STORE_BYTES // workers}
+
+    def spawn(worker_id):
+        process = multiprocessing.Process(target=run_worker, name=f"syslog-worker-{worker_id}",
+                                          args=(worker_id, address, port, store_dir, counters, store_options, tcp_port, tls_port))
+        process.start()
+        return process
+
+    def totals():
+        result = dict(retired)
+        for worker_id in range(workers):
+            for i, name in enumerate(WORKER_COUNTERS):
+                result[name] += int(counters[worker_id * len(WORKER_COUNTERS) + i])
+        return result
+
+    started = time.time()
+
+    def collect():
+        metrics = totals()
+        metrics.update(uptime_seconds=round(time.time() - started, 1), workers=workers, restarts=restarts,
+                       queue_capacity=MAX_QUEUED_MESSAGES * workers, proc_udp_drops=read_udp_drops(port))
+        return metrics
+
+    print(f"Starting syslog server on {address}:{port} with {workers} worker processes (SO_REUSEPORT)")
+    views = {'/top': lambda params: fetch_worker_top(workers, params)} if SKETCHES_ENABLED else {}
+    metrics_server = start_metrics_server(METRICS_PORT, collect, views=views)
+    processes = [spawn(worker_id) for worker_id in range(workers)]
+    last_report = time.time()
+    previous = totals()
+    try:
+        while True:
+            time.sleep(1)
+            for worker_id, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Worker {worker_id} exited with code {process.exitcode}; restarting")
+                    slot = worker_id * len(WORKER_COUNTERS)
+                    for i, name in enumerate(WORKER_COUNTERS):
+                        if name not in ('kernel_drops', 'queue_depth', 'queue_high_water'):  # Per-socket/gauges
+                            retired[name] += int(counters[slot + i])
+                        counters[slot + i] = 0
+                    processes[worker_id] = spawn(worker_id)
+                    restarts += 1
+            if time.time() - last_report >= STATS_INTERVAL:
+                current = totals()
+                print(format_stats(current, previous, time.time() - last_report) + f" workers={workers} restarts={restarts}")
+                previous, last_report = current, time.time()
+    except KeyboardInterrupt:
+        print("\nStopping syslog server")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        if metrics_server:
+            metrics_server.stop()
+        print(format_stats(totals(), previous, max(time.time() - last_report, 1e-6)) + f" workers={workers} restarts={restarts}")
 
 if __name__ == "__main__":
-    start_syslog_server("0.0.0.0", 5154, "syslog.txt")
\ No newline at end of file
+    if WORKER_COUNT > 1 and HAS_REUSEPORT:
+        start_multiprocess_server("0.0.0.0", 5154, "syslog_store", tcp_port=TCP_PORT, tls_port=TLS_PORT)
+    else:
+        if WORKER_COUNT > 1:
+            print("SO_REUSEPORT is not available on this platform; running a single process")
+        start_syslog_server("0.0.0.0", 5154, store_dir="syslog_store", tcp_port=TCP_PORT, tls_port=TLS_PORT)
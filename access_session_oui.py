@@ -1,7 +1,27 @@
 import paramiko
 import re
+import csv
+import time
+import argparse
 import getpass
-import manuf
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from oui_lookup import get_oui_database
+from mac_locator import MacLocator
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# --- Collection Settings ---
+IP_LIST_FILENAME = "ip_addresses.txt"
+MAC_TABLE_COMMAND = "show mac address-table | e All"
+MAX_WORKERS = 20            # Switches collected in parallel (one SSH session each)
+FLEET_COLUMNS = ['switch', 'vlan', 'mac', 'port', 'manufacturer', 'collected_at']
+
+# A MAC table entry: VLAN, MAC (Cisco dotted format), type, port
+MAC_PORT_PATTERN = re.compile(r'\s*(\d+)\s+([0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4})\s+\S+\s+(\S+)')
 
 def ssh_and_run_command(ip, username, password, command):
     ssh = paramiko.SSHClient()
@@ -24,29 +44,109 @@ def ssh_and_run_command(ip, username, password, command):
         return None
 
 def find_mac_addresses_and_ports(output):
-    mac_port_pattern = re.compile(r'(\d+)\s+([0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4})\s+\S+\s+(\S+)')
-    mac_ports = re.findall(mac_port_pattern, output)
+    """
+    Returns (vlan, mac, port) for each MAC table entry, matching one line at a time
+    so header, separator and footer lines are skipped without a regex search.
+    """
+    mac_ports = []
+    for line in output.splitlines():
+        if not line.lstrip()[:1].isdigit():
+            continue
+        match = MAC_PORT_PATTERN.match(line)
+        if match:
+            mac_ports.append(match.groups())
     return mac_ports
 
 def lookup_oui(mac_address):
-    p = manuf.MacParser()
-    manufacturer = p.get_manuf(mac_address)
-    return manufacturer
+    # The OUI database is parsed (or mapped from its binary cache) once per run, not per MAC
+    return get_oui_database().manufacturer(mac_address)
+
+def collect_switch(ip, username, password, command=MAC_TABLE_COMMAND):
+    """
+    Reads and parses one switch's MAC table.
+    Returns a list of (vlan, mac, port, manufacturer), or None if the switch could not be read.
+    """
+    output = ssh_and_run_command(ip, username, password, command)
+    if output is None:
+        return None
+    return [(vlan, mac, port, lookup_oui(mac)) for vlan, mac, port in find_mac_addresses_and_ports(output)]
+
+def write_switch_output(ip, entries):
+    """Appends a switch's entries to {ip}_output.txt in a single write."""
+    lines = [f"VLAN: {vlan}, MAC Address: {mac}, Port: {port}, Manufacturer: {manufacturer}\n"
+             for vlan, mac, port, manufacturer in entries]
+    with open(f"{ip}_output.txt", "a") as file:
+        file.write("".join(lines))
+
+def write_fleet_csv(path, rows):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(FLEET_COLUMNS)
+        writer.writerows(rows)
+
+def write_fleet_parquet(path, rows):
+    if pyarrow is None:
+        print("Parquet output needs pyarrow (pip install pyarrow); skipping " + path)
+        return
+    columns = {name: [row[i] for row in rows] for i, name in enumerate(FLEET_COLUMNS)}
+    columns['vlan'] = [int(vlan) for vlan in columns['vlan']]
+    pyarrow.parquet.write_table(pyarrow.table(columns), path)
+
+def collect_fleet(ip_addresses, username, password, workers=MAX_WORKERS, locator=None):
+    """
+    Collects every switch's MAC table in parallel. Each switch's text file is written by
+    this (the calling) thread as its result arrives, so files are never shared between workers;
+    the same goes for the MacLocator, if given, which records each switch's changes.
+    Returns (fleet rows as FLEET_COLUMNS, list of IPs that failed).
+    """
+    get_oui_database()  # Load once up front rather than racing in the workers
+    rows = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(collect_switch, ip, username, password): ip for ip in ip_addresses}
+        for future in as_completed(futures):
+            ip = futures[future]
+            entries = future.result()
+            if entries is None:
+                failed.append(ip)
+                continue
+            polled_at = time.time()
+            collected_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(polled_at))
+            write_switch_output(ip, entries)
+            if locator:
+                added, moved, removed = locator.apply_switch(ip, entries, polled_at)
+                print(f"{ip}: locator {added} added, {moved} moved, {removed} removed")
+            rows.extend((ip, vlan, mac, port, manufacturer, collected_at) for vlan, mac, port, manufacturer in entries)
+            print(f"{ip}: {len(entries)} MAC entries")
+    return rows, failed
 
 def main():
-    command = "show mac address-table | e All"
+    parser = argparse.ArgumentParser(description="Collect MAC address tables (with vendors) from a list of switches.")
+    parser.add_argument("--ip-file", default=IP_LIST_FILENAME, help="One switch IP per line (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Switches collected in parallel (default: %(default)s)")
+    parser.add_argument("--csv", help="Also write every switch's entries to one CSV file")
+    parser.add_argument("--parquet", help="Also write every switch's entries to one Parquet file (needs pyarrow)")
+    parser.add_argument("--db", help="Also update this MAC locator database (see mac_locator.py)")
+    args = parser.parse_args()
+
     username = input("Enter your username: ")
     password = getpass.getpass("Enter your password: ")
-    with open("ip_addresses.txt", "r") as file:
-        ip_addresses = [line.strip() for line in file]
-    for ip in ip_addresses:
-        output = ssh_and_run_command(ip, username, password, command)
-        if output is not None:
-            mac_ports = find_mac_addresses_and_ports(output)
-            for vlan, mac, port in mac_ports:
-                manufacturer = lookup_oui(mac)
-                with open(f"{ip}_output.txt", "a") as file:
-                    file.write(f"VLAN: {vlan}, MAC Address: {mac}, Port: {port}, Manufacturer: {manufacturer}\n")
+    with open(args.ip_file, "r") as file:
+        ip_addresses = [line.strip() for line in file if line.strip()]
+
+    locator = MacLocator(args.db) if args.db else None
+    start = time.time()
+    rows, failed = collect_fleet(ip_addresses, username, password, args.workers, locator)
+    if locator:
+        locator.close()
+    print(f"Collected {len(rows)} MAC entries from {len(ip_addresses) - len(failed)}/{len(ip_addresses)} "
+          f"switches in {time.time() - start:.1f}s")
+    if failed:
+        print("Failed: " + ", ".join(failed))
+    if args.csv:
+        write_fleet_csv(args.csv, rows)
+    if args.parquet:
+        write_fleet_parquet(args.parquet, rows)
 
 if __name__ == "__main__":
     main()
@@ -7,6 +7,9 @@ import csv
 import re
 import time
 
+# Commands that only exist to find the device's interface; bulk discovery replaces them
+DISCOVERY_COMMAND_PREFIXES = ("show ip interface brief", "show ip int brief", "show ip arp")
+
 # --- Paramiko Helper Functions (Crucial for interaction) ---
 def read_until_prompt(channel, prompt="#", timeout=5):
     """Reads all data from the channel until the prompt is found."""
@@ -41,7 +44,7 @@ def send_command_and_read(channel, command, prompt="#", timeout=5):
     return output
 
 
-def run_commands_and_extract_info(input_csv_file, commands):
+def run_commands_and_extract_info(input_csv_file, commands, discovery_mode="bulk"):
     """
     Connects to Cisco switches via SSH, runs commands, extracts specific info,
     and logs results to CSV and text files using Paramiko.
@@ -51,6 +54,12 @@ def run_commands_and_extract_info(input_csv_file, commands):
         commands (list): A list of commands to execute on the switches.
                          Can contain {IP_ADDR_VAR} for the device's own IP.
                          {INTERFACE_NAME_VAR} will be dynamically replaced after discovery.
+        discovery_mode (str): "bulk" pulls one 'show interfaces' per device and answers
+                              interface/IP/MAC/loopback questions from the parsed table;
+                              the per-IP discovery commands are skipped, other commands
+                              using {IP_ADDR_VAR} still run.
+                              "legacy" uses the per-IP 'show ip int brief'/'show ip arp'
+                              commands plus follow-up 'show interface' round trips.
     """
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -196,11 +205,27 @@ def run_commands_and_extract_info(input_csv_file, commands):
                 show_ip_arp_output_for_ip = ""
                 last_command_output = ""
 
+                # --- Interface Discovery and Loopback Fallback Logic ---
+                initial_discovered_interface = "N/A"
+                interface_table = None
+
+                # 0. Bulk mode: one 'show interfaces' answers every discovery question
+                if discovery_mode == "bulk":
+                    f_main_log.write("Executing command: show interfaces\n")
+                    print("Executing command: show interfaces")
+                    show_interfaces_output = send_command_and_read(channel, "show interfaces", prompt='#', timeout=30)
+                    interface_table = parse_show_interfaces(show_interfaces_output)
+                    f_main_log.write(f"Parsed {len(interface_table)} interfaces from 'show interfaces'.\n")
+                    initial_discovered_interface = find_interface_by_ip(interface_table, ip_address)
+
                 # Execute static commands and capture relevant output
                 for i, command_template in enumerate(commands):
                     command_to_execute = command_template
 
                     if "{IP_ADDR_VAR}" in command_template:
+                        if discovery_mode == "bulk" and is_discovery_command(command_template):
+                            # Already answered from the 'show interfaces' table above
+                            continue
                         command_to_execute = command_template.replace("{IP_ADDR_VAR}", ip_address)
                     elif "{INTERFACE_NAME_VAR}" in command_template:
                          # This command should never be in the static list, as it's dynamic
@@ -222,9 +247,6 @@ def run_commands_and_extract_info(input_csv_file, commands):
                     if i == len(commands) - 1:
                         last_command_output = output.strip()
 
-                # --- Interface Discovery and Loopback Fallback Logic ---
-                initial_discovered_interface = "N/A"
-
                 # 1. Try 'show ip int brief | include {IP}'
                 if show_ip_int_brief_output_for_ip:
                     initial_discovered_interface = parse_interface_name(show_ip_int_brief_output_for_ip, ip_address)
@@ -248,11 +270,14 @@ def run_commands_and_extract_info(input_csv_file, commands):
                     f_main_log.write(f"Loopback interface '{device['Interface Name']}' detected for {ip_address}. Searching for a physical interface with an IP.\n")
                     print(f"Loopback interface '{device['Interface Name']}' detected for {ip_address}. Searching for a physical interface with an IP.")
 
-                    # Execute full 'show ip interface brief' to get all interfaces
-                    full_ip_int_brief_output = send_command_and_read(channel, "show ip interface brief", prompt='#')
-                    f_main_log.write(f"Full 'show ip interface brief' output for physical interface search:\n{full_ip_int_brief_output}\n")
+                    if interface_table is not None:
+                        physical_interface = find_non_loopback_active_interface(interface_table)
+                    else:
+                        # Execute full 'show ip interface brief' to get all interfaces
+                        full_ip_int_brief_output = send_command_and_read(channel, "show ip interface brief", prompt='#')
+                        f_main_log.write(f"Full 'show ip interface brief' output for physical interface search:\n{full_ip_int_brief_output}\n")
 
-                    physical_interface = find_non_loopback_active_interface(full_ip_int_brief_output)
+                        physical_interface = find_non_loopback_active_interface(full_ip_int_brief_output)
 
                     if physical_interface != "N/A":
                         device['Interface Name'] = physical_interface
@@ -264,7 +289,10 @@ def run_commands_and_extract_info(input_csv_file, commands):
                         print(f"No suitable physical interface found for {ip_address} after loopback detection.")
 
                 # --- MAC Address Retrieval (based on final 'Interface Name') ---
-                if device['Interface Name'] and "N/A" not in device['Interface Name'] and "Failed" not in device['Interface Name']:
+                if interface_table is not None and device['Interface Name'] in interface_table:
+                    device['Base MAC Address'] = interface_table[device['Interface Name']]['mac']
+                    f_main_log.write(f"MAC for {device['Interface Name']} taken from 'show interfaces' table: {device['Base MAC Address']}\n")
+                elif device['Interface Name'] and "N/A" not in device['Interface Name'] and "Failed" not in device['Interface Name']:
                     f_main_log.write(f"Dynamically executing: show interface {device['Interface Name']}\n")
                     print(f"Dynamically executing: show interface {device['Interface Name']}")
                     mac_detail_output = send_command_and_read(channel, f"show interface {device['Interface Name']}", prompt='#')
@@ -363,7 +391,17 @@ def find_non_loopback_active_interface(output):
     """
     Parses 'show ip interface brief' output to find the first non-loopback,
     IP-assigned, up/up interface.
+    Also accepts a table returned by parse_show_interfaces.
     """
+    if isinstance(output, dict):
+        for interface_name, info in output.items():
+            if not interface_name.lower().startswith("loopback") and \
+               info['ip'] != "unassigned" and \
+               info['status'] == "up" and \
+               info['protocol'] == "up":
+                return interface_name
+        return "N/A"
+
     lines = output.splitlines()
     # Skip header lines
     data_lines = [line for line in lines if not line.strip().startswith(('Interface', 'Protocol')) and line.strip()]
@@ -385,6 +423,52 @@ def find_non_loopback_active_interface(output):
     return "N/A"
 
 
+def parse_show_interfaces(output):
+    """
+    Parses full 'show interfaces' output into an interface table.
+    Returns {interface_name: {'ip', 'mac', 'status', 'protocol'}} in device order.
+    """
+    table = {}
+    current = None
+    for line in output.splitlines():
+        header = re.match(r"^(\S+) is (up|down|administratively down|deleted), line protocol is (up|down)", line, re.IGNORECASE)
+        if header:
+            current = header.group(1)
+            table[current] = {
+                'ip': "unassigned",
+                'mac': "N/A",
+                'status': header.group(2).lower(),
+                'protocol': header.group(3).lower(),
+            }
+            continue
+        if current is None:
+            continue
+        mac_match = re.search(r"address is\s+([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4})", line, re.IGNORECASE)
+        if mac_match and table[current]['mac'] == "N/A":
+            table[current]['mac'] = mac_match.group(1).upper()
+            continue
+        ip_match = re.search(r"Internet address is\s+(\d+\.\d+\.\d+\.\d+)", line, re.IGNORECASE)
+        if ip_match:
+            table[current]['ip'] = ip_match.group(1)
+    return table
+
+def is_discovery_command(command):
+    """
+    True for the per-IP interface discovery commands ('show ip interface brief | include',
+    'show ip arp | include') that bulk mode answers from the 'show interfaces' table.
+    """
+    return command.lower().startswith(DISCOVERY_COMMAND_PREFIXES)
+
+def find_interface_by_ip(table, ip_address):
+    """
+    Returns the interface owning ip_address in a parse_show_interfaces table.
+    """
+    for interface_name, info in table.items():
+        if info['ip'] == ip_address:
+            return interface_name
+    return "N/A"
+
+
 def parse_mac_from_show_interface(output):
     """
     Parses the MAC address from 'show interface <interface>' output.
@@ -406,5 +490,5 @@ if __name__ == "__main__":
         "terminal no length"
     ]
 
-    run_commands_and_extract_info(input_devices_csv, switch_commands)
+    run_commands_and_extract_info(input_devices_csv, switch_commands, discovery_mode="bulk")
     print("\nScript execution finished. Check the main log file, error_output.txt, and the processed_devices_*.csv for details.")
\ No newline at end of file
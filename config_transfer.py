@@ -0,0 +1,187 @@
+import hashlib
+import io
+import re
+import time
+import paramiko
+from ios_shell import wait_for_prompt, send_and_wait, IOS_ERROR_PATTERN
+from ios_config_tree import parse_config_tree, find_missing_config
+
+# --- Defaults ---
+REMOTE_FILESYSTEM = "flash:"
+TRANSFER_TIMEOUT = 120
+APPLY_TIMEOUT = 300
+# Lines the device stores in a different (encrypted/hashed) form; they cannot be verified verbatim
+UNVERIFIABLE_PATTERN = re.compile(r"\b(password|secret|key|community)\b", re.IGNORECASE)
+
+
+# --- SCP / SFTP Upload ---
+
+def _scp_check_ack(channel):
+    """Reads one SCP acknowledgement byte; raises on an error reply."""
+    ack = channel.recv(1)
+    if ack == b"\x00":
+        return
+    message = ack[1:] if ack else b""
+    while not message.endswith(b"\n"):
+        data = channel.recv(1024)
+        if not data:
+            break
+        message += data
+    raise paramiko.SSHException(f"SCP transfer rejected: {message.decode('utf-8', errors='ignore').strip() or ack!r}")
+
+
+def scp_upload(ssh, data, remote_name, filesystem=REMOTE_FILESYSTEM, timeout=TRANSFER_TIMEOUT):
+    """
+    Uploads bytes to the device in one SCP transfer ('ip scp server enable' on IOS).
+
+    Args:
+        ssh (paramiko.SSHClient): A connected client.
+        data (bytes): File contents.
+        remote_name (str): File name on the device.
+        filesystem (str): Target file system, e.g. 'flash:'.
+    """
+    channel = ssh.get_transport().open_session()
+    channel.settimeout(timeout)
+    try:
+        channel.exec_command(f"scp -t {filesystem}{remote_name}")
+        _scp_check_ack(channel)
+        channel.sendall(f"C0644 {len(data)} {remote_name}\n".encode())
+        _scp_check_ack(channel)
+        channel.sendall(data)
+        channel.sendall(b"\x00")
+        _scp_check_ack(channel)
+    finally:
+        channel.close()
+
+
+def sftp_upload(ssh, data, remote_name, filesystem=REMOTE_FILESYSTEM):
+    """Uploads bytes to the device over SFTP, for platforms that run an SFTP server."""
+    sftp = ssh.open_sftp()
+    try:
+        sftp.putfo(io.BytesIO(data), f"{filesystem}{remote_name}")
+    finally:
+        sftp.close()
+
+
+# --- Apply and Verify ---
+
+def verify_remote_md5(channel, remote_name, expected_md5, filesystem=REMOTE_FILESYSTEM):
+    """Runs 'verify /md5' on the uploaded file and compares it with the local hash."""
+    output, state = send_and_wait(channel, f"verify /md5 {filesystem}{remote_name}", timeout=TRANSFER_TIMEOUT)
+    match = re.search(r"=\s*([0-9a-fA-F]{32})", output)
+    if not match:
+        return False, output
+    return match.group(1).lower() == expected_md5, output
+
+
+def apply_config_file(channel, remote_name, mode="copy", filesystem=REMOTE_FILESYSTEM):
+    """
+    Applies an uploaded file with 'copy <file> running-config' (merge) or
+    'configure replace <file> force' (replace).
+
+    Returns:
+        tuple: (str: output, list: IOS error lines)
+    """
+    if mode == "replace":
+        output, state = send_and_wait(channel, f"configure replace {filesystem}{remote_name} force", timeout=APPLY_TIMEOUT)
+    else:
+        output, state = send_and_wait(channel, f"copy {filesystem}{remote_name} running-config", timeout=APPLY_TIMEOUT)
+        if state == 'confirm':
+            # 'Destination filename [running-config]?'
+            more, state = send_and_wait(channel, "", timeout=APPLY_TIMEOUT)
+            output += more
+    errors = [line.strip() for line in output.splitlines() if IOS_ERROR_PATTERN.match(line)]
+    if state == 'timeout':
+        errors.append(f"Timed out after {APPLY_TIMEOUT}s applying {filesystem}{remote_name}")
+    if mode == "replace" and "Rollback Done" not in output:
+        errors.append("configure replace did not report 'Rollback Done'")
+    return output, errors
+
+
+def find_missing_lines(config_lines, running_config):
+    """
+    Returns the configuration lines that are not in the running-config, each checked
+    under its own parent section and reported as 'parent > line'. Abbreviations and
+    interface ranges are expanded first (see ios_config_tree); negations, lines that
+    only enter a mode and secrets are not checked.
+    """
+    desired = parse_config_tree(config_lines)
+    running = parse_config_tree(running_config.splitlines())
+    return [" > ".join(parents + (line,)) for parents, line in find_missing_config(desired, running)
+            if not UNVERIFIABLE_PATTERN.search(line)]
+
+
+def push_config_via_transfer(ip, username, password, config_text, remote_name=None, method="scp",
+                             mode="copy", port=22, cleanup=True):
+    """
+    Uploads a whole configuration in one SCP/SFTP transfer, applies it from flash
+    and verifies the result, instead of typing it line by line.
+
+    Args:
+        ip (str): Device address.
+        config_text (str): Configuration to apply.
+        remote_name (str): File name on flash; defaults to a timestamped name.
+        method (str): 'scp' or 'sftp'.
+        mode (str): 'copy' merges into running-config, 'replace' uses configure replace.
+        port (int): SSH port.
+        cleanup (bool): Delete the file from flash afterwards.
+
+    Returns:
+        tuple: (bool: success, str: output, list: errors)
+    """
+    remote_name = remote_name or f"push_{time.strftime('%Y%m%d_%H%M%S')}.cfg"
+    if not config_text.endswith("\n"):
+        config_text += "\n"
+    if mode == "copy" and not config_text.rstrip().endswith("end"):
+        config_text += "end\n"
+    data = config_text.encode()
+    local_md5 = hashlib.md5(data).hexdigest()
+    output = ""
+    errors = []
+
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        print(f"Connecting to {ip}:{port}...")
+        ssh.connect(ip, port=port, username=username, password=password, look_for_keys=False, allow_agent=False)
+
+        print(f"Uploading {len(data)} bytes to {REMOTE_FILESYSTEM}{remote_name} via {method.upper()}...")
+        if method == "sftp":
+            sftp_upload(ssh, data, remote_name)
+        else:
+            scp_upload(ssh, data, remote_name)
+
+        channel = ssh.invoke_shell()
+        banner, prompt_seen = wait_for_prompt(channel)
+        if not prompt_seen:
+            return False, banner, ["No prompt received from device"]
+        send_and_wait(channel, "terminal length 0")
+
+        md5_ok, md5_output = verify_remote_md5(channel, remote_name, local_md5)
+        output += md5_output
+        if not md5_ok:
+            errors.append(f"MD5 mismatch after transfer (expected {local_md5})")
+            # Never leave a corrupt config on flash, whatever cleanup says
+            send_and_wait(channel, f"delete /force {REMOTE_FILESYSTEM}{remote_name}")
+            channel.close()
+            return False, output, errors
+
+        print(f"Applying {REMOTE_FILESYSTEM}{remote_name} ({mode})...")
+        apply_output, apply_errors = apply_config_file(channel, remote_name, mode)
+        output += apply_output
+        errors.extend(apply_errors)
+
+        running_config, state = send_and_wait(channel, "show running-config", timeout=APPLY_TIMEOUT)
+        missing = find_missing_lines(config_text.splitlines(), running_config)
+        errors.extend(f"Not in running-config after apply: {line}" for line in missing)
+
+        if cleanup:
+            send_and_wait(channel, f"delete /force {REMOTE_FILESYSTEM}{remote_name}")
+        channel.close()
+        return not errors, output, errors
+    except paramiko.AuthenticationException:
+        return False, output, [f"Authentication failed for {ip}"]
+    except Exception as e:
+        return False, output, [f"Transfer to {ip} failed: {e}"]
+    finally:
+        ssh.close()
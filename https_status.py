@@ -1,20 +1,16 @@
 import requests
 import time
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from notify_outbox import NotificationOutbox, SendGridTransport
+
+# Status changes are queued and sent as digests by a background sender
+outbox = NotificationOutbox(SendGridTransport(
+    'your_sendgrid_api_key',  # Replace with your API key
+    'from_email@example.com',  # Replace with your email
+    'to_email@example.com',  # Replace with recipient email
+)).start()
 
 def send_email(subject, content):
-    message = Mail(
-        from_email='from_email@example.com',  # Replace with your email
-        to_emails='to_email@example.com',  # Replace with recipient email
-        subject=subject,
-        html_content=content)
-    try:
-        sg = SendGridAPIClient('your_sendgrid_api_key')  # Replace with your API key
-        response = sg.send(message)
-        print(f"Email sent with status code: {response.status_code}")
-    except Exception as e:
-        print(f"Error sending email: {e}")
+    outbox.enqueue(subject, content, subtype='html')
 
 def check_https_status(websites):
     last_status = {}
@@ -46,4 +42,7 @@ websites = ["https://www.google.com", "https://www.github.com/"]
 # Suppress only the single InsecureRequestWarning from urllib3 needed
 requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
 
-check_https_status(websites)
+try:
+    check_https_status(websites)
+finally:
+    outbox.close()  # Send whatever is still queued (Ctrl+C included)
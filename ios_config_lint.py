@@ -0,0 +1,290 @@
+import re
+import sys
+from collections import namedtuple
+
+# --- Command Grammar ---
+# First keyword(s) accepted in each CLI mode. IOS accepts unique abbreviations,
+# so a token matches a keyword it is a prefix of (e.g. 'int' -> 'interface').
+MODE_COMMANDS = {
+    'exec': {
+        'show', 'configure', 'copy', 'write', 'terminal', 'enable', 'disable', 'ping',
+        'traceroute', 'reload', 'clear', 'debug', 'undebug', 'verify', 'delete', 'dir',
+        'more', 'exit', 'end', 'logout', 'send', 'test', 'archive', 'ssh', 'telnet',
+    },
+    'global': {
+        'aaa', 'access-list', 'alias', 'archive', 'banner', 'boot', 'cdp', 'class-map', 'clock',
+        'crypto', 'default', 'dot1x', 'enable', 'end', 'errdisable', 'exit', 'hostname',
+        'interface', 'ip', 'ipv6', 'key', 'line', 'lldp', 'logging', 'mac', 'monitor',
+        'ntp', 'policy-map', 'port-channel', 'radius', 'radius-server', 'router',
+        'service', 'snmp-server', 'spanning-tree', 'system', 'tacacs', 'tacacs-server',
+        'udld', 'username', 'vlan', 'vtp', 'device-tracking', 'authentication', 'epm',
+        'login', 'license', 'power', 'stack-mac', 'switch', 'track', 'vrf', 'file',
+        'version', 'mls', 'vstack', 'service-template', 'parameter-map', 'template', 'access-session',
+        'device-sensor', 'macro', 'table-map', 'platform', 'redundancy', 'control-plane', 'diagnostic',
+        'memory', 'process', 'call-home', 'identity', 'sdm', 'event', 'cts', 'privilege', 'scheduler',
+        'no', 'do',
+    },
+    'interface': {
+        'description', 'switchport', 'shutdown', 'ip', 'ipv6', 'spanning-tree', 'speed',
+        'duplex', 'channel-group', 'channel-protocol', 'power', 'authentication', 'dot1x', 'mab',
+        'storm-control', 'cdp', 'lldp', 'load-interval', 'mtu', 'logging', 'service-policy',
+        'udld', 'access-session', 'device-tracking', 'snmp', 'standby', 'vrrp', 'bandwidth',
+        'delay', 'media-type', 'negotiation', 'keepalive', 'carrier-delay', 'priority-queue',
+        'mls', 'auto', 'srr-queue', 'queue-set', 'trust', 'vrf', 'source', 'subscriber',
+        'exit', 'end', 'default', 'no', 'do',
+    },
+    'line': {
+        'access-class', 'exec-timeout', 'logging', 'login', 'password', 'transport',
+        'privilege', 'session-timeout', 'stopbits', 'length', 'width', 'history',
+        'authorization', 'accounting', 'absolute-timeout', 'exit', 'end', 'default', 'no', 'do',
+    },
+    'router': {
+        'network', 'router-id', 'passive-interface', 'redistribute', 'default-information',
+        'area', 'neighbor', 'distance', 'maximum-paths', 'auto-summary', 'bgp', 'timers',
+        'log-adjacency-changes', 'address-family', 'exit-address-family', 'eigrp', 'metric',
+        'exit', 'end', 'default', 'no', 'do',
+    },
+    'acl-standard': {'permit', 'deny', 'remark', 'exit', 'end', 'default', 'no', 'do'},
+    'acl-extended': {'permit', 'deny', 'remark', 'exit', 'end', 'default', 'no', 'do'},
+    'vlan': {'name', 'state', 'shutdown', 'exit', 'end', 'default', 'no', 'do'},
+    'tacacs-server': {'address', 'key', 'port', 'timeout', 'single-connection', 'exit', 'end', 'no', 'do'},
+    'radius-server': {'address', 'key', 'timeout', 'retransmit', 'automate-tester', 'pac', 'exit', 'end', 'no', 'do'},
+    'aaa-server-group': {'server', 'server-private', 'ip', 'deadtime', 'load-balance', 'exit', 'end', 'no', 'do'},
+    'class-map': {'match', 'description', 'exit', 'end', 'no', 'do'},
+    'policy-map': {'class', 'police', 'set', 'priority', 'bandwidth', 'description', 'exit', 'end', 'no', 'do'},
+    'archive': {'path', 'maximum', 'log', 'write-memory', 'time-period', 'exit', 'end', 'no', 'do'},
+    # 'policy-map type control subscriber': events, numbered classes and numbered actions
+    'control-policy': {
+        'event', 'class', 'authenticate', 'authorize', 'unauthorize', 'activate', 'deactivate',
+        'terminate', 'pause', 'resume', 'restrict', 'protect', 'replace', 'err-disable', 'clear-session',
+        'clear-authenticated-data-hosts-on-port', 'authentication-restart', 'set-domain', 'description',
+        'exit', 'end', 'no', 'do',
+    },
+    'service-template': {
+        'vlan', 'access-group', 'inactivity-timer', 'description', 'voice', 'tag', 'redirect',
+        'interface-template', 'absolute-timer', 'linksec', 'sgt', 'exit', 'end', 'no', 'do',
+    },
+}
+
+# (mode, regex on the command, new mode) - commands that enter a sub-mode
+MODE_TRANSITIONS = [
+    ('exec', re.compile(r"^conf(i(g(u(r(e)?)?)?)?)?(\s+t(e(r(m(i(n(a(l)?)?)?)?)?)?)?)?$", re.IGNORECASE), 'global'),
+    ('global', re.compile(r"^int(e(r(f(a(c(e)?)?)?)?)?)?\s+\S", re.IGNORECASE), 'interface'),
+    ('global', re.compile(r"^line\s+\S", re.IGNORECASE), 'line'),
+    ('global', re.compile(r"^router\s+\S", re.IGNORECASE), 'router'),
+    ('global', re.compile(r"^ip\s+access-list\s+standard\s+\S", re.IGNORECASE), 'acl-standard'),
+    ('global', re.compile(r"^ip\s+access-list\s+extended\s+\S", re.IGNORECASE), 'acl-extended'),
+    ('global', re.compile(r"^vlan\s+[\d,\-]+$", re.IGNORECASE), 'vlan'),
+    ('global', re.compile(r"^tacacs\s+server\s+\S", re.IGNORECASE), 'tacacs-server'),
+    ('global', re.compile(r"^radius\s+server\s+\S", re.IGNORECASE), 'radius-server'),
+    ('global', re.compile(r"^aaa\s+group\s+server\s+\S+\s+\S", re.IGNORECASE), 'aaa-server-group'),
+    ('global', re.compile(r"^class-map\b", re.IGNORECASE), 'class-map'),
+    ('global', re.compile(r"^policy-map\s+type\s+control\s+subscriber\s+\S", re.IGNORECASE), 'control-policy'),
+    ('global', re.compile(r"^policy-map\b", re.IGNORECASE), 'policy-map'),
+    ('global', re.compile(r"^service-template\s+\S", re.IGNORECASE), 'service-template'),
+    ('global', re.compile(r"^template\s+\S", re.IGNORECASE), 'interface'),
+    ('global', re.compile(r"^archive$", re.IGNORECASE), 'archive'),
+]
+
+SUB_MODES = [mode for mode in MODE_COMMANDS if mode not in ('exec', 'global')]
+ACL_MODES = ('acl-standard', 'acl-extended')
+# Modes whose lines may start with a sequence number ('10 permit ip any any', '10 class always')
+SEQUENCED_MODES = ACL_MODES + ('control-policy',)
+# Severity of a command the grammar does not know at all. The grammar covers the
+# common switch commands only, so a gap in it must not block a push.
+UNKNOWN_COMMAND_SEVERITY = 'warning'
+
+LintIssue = namedtuple('LintIssue', ['source', 'line_number', 'line', 'severity', 'message'])
+
+# Two or more dots: an address with a missing or extra octet, not a version such as 15.2
+DOTTED_PATTERN = re.compile(r"^\d+(\.\d+){2,}$")
+
+
+# --- Address Checks ---
+
+def is_valid_ipv4(text):
+    """Returns True for a dotted-quad IPv4 address with octets 0-255."""
+    parts = text.split('.')
+    return len(parts) == 4 and all(p.isdigit() and int(p) <= 255 and len(p) <= 3 for p in parts)
+
+def ipv4_to_int(text):
+    a, b, c, d = (int(p) for p in text.split('.'))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+def is_contiguous_mask(text):
+    """Returns True for a subnet mask such as 255.255.255.0."""
+    value = ipv4_to_int(text)
+    inverted = ~value & 0xFFFFFFFF
+    return inverted & (inverted + 1) == 0
+
+def is_contiguous_wildcard(text):
+    """Returns True for a wildcard such as 0.0.0.255."""
+    value = ipv4_to_int(text)
+    return value & (value + 1) == 0
+
+def check_addresses(tokens, mode):
+    """Returns (severity, message) tuples for malformed addresses, masks and wildcards."""
+    issues = []
+    for token in tokens:
+        if DOTTED_PATTERN.match(token) and not is_valid_ipv4(token):
+            issues.append(('error', f"malformed IPv4 address '{token}'"))
+    lowered = [t.lower() for t in tokens]
+
+    # ip address A.B.C.D M.M.M.M
+    if len(tokens) >= 4 and lowered[0] == 'ip' and lowered[1] == 'address' and is_valid_ipv4(tokens[2]):
+        if is_valid_ipv4(tokens[3]) and not is_contiguous_mask(tokens[3]):
+            if is_contiguous_wildcard(tokens[3]):
+                issues.append(('error', f"'{tokens[3]}' is a wildcard, 'ip address' needs a subnet mask"))
+            else:
+                issues.append(('error', f"non-contiguous subnet mask '{tokens[3]}'"))
+
+    # ACL entries: address followed by a wildcard
+    is_acl_entry = (mode in ACL_MODES and lowered[0] in ('permit', 'deny')) or \
+                   (lowered[0] == 'access-list' and len(lowered) > 2 and lowered[2] in ('permit', 'deny'))
+    if is_acl_entry:
+        for i, token in enumerate(tokens[:-1]):
+            nxt = tokens[i + 1]
+            if i > 0 and lowered[i - 1] == 'host':
+                continue
+            if is_valid_ipv4(token) and is_valid_ipv4(nxt) and nxt != '0.0.0.0':
+                if is_contiguous_mask(nxt) and not is_contiguous_wildcard(nxt):
+                    issues.append(('error', f"'{nxt}' looks like a subnet mask; ACLs need a wildcard (e.g. 0.0.0.255)"))
+                elif ipv4_to_int(token) & ipv4_to_int(nxt):
+                    issues.append(('warning', f"address '{token}' has host bits set under wildcard '{nxt}'"))
+    return issues
+
+
+# --- Linter ---
+
+def keyword_matches(token, keywords):
+    """True if token is a keyword or an unambiguous-looking abbreviation of one."""
+    token = token.lower()
+    if token in keywords:
+        return True
+    return len(token) >= 2 and any(k.startswith(token) for k in keywords)
+
+def command_tokens(tokens, mode):
+    """
+    The tokens checked against mode's grammar: without a leading 'no'/'default' and,
+    in SEQUENCED_MODES, without the sequence number. Empty for 'no <sequence>'.
+    """
+    negated = tokens[0].lower() in ('no', 'default') and len(tokens) > 1
+    if negated:
+        tokens = tokens[1:]
+    if mode in SEQUENCED_MODES and tokens[0].isdigit() and (len(tokens) > 1 or negated):
+        tokens = tokens[1:]
+    return tokens
+
+def next_mode(mode, command):
+    for from_mode, pattern, to_mode in MODE_TRANSITIONS:
+        if from_mode == mode and pattern.match(command):
+            return to_mode
+    return None
+
+def lint_config_lines(lines, source="<config>", start_mode='global'):
+    """
+    Checks configuration lines against the command grammar without touching a device.
+
+    Args:
+        lines (list): Configuration lines as they would be typed.
+        source (str): Name used in the report (usually the file name).
+        start_mode (str): Mode the lines are typed in ('global' after 'conf t', or 'exec').
+
+    Returns:
+        list: LintIssue tuples, in line order.
+    """
+    issues = []
+    mode = start_mode
+    banner_delimiter = None
+
+    for line_number, raw_line in enumerate(lines, start=1):
+        command = raw_line.strip()
+
+        # Skip multi-line banner bodies until the closing delimiter
+        if banner_delimiter is not None:
+            if banner_delimiter in command:
+                banner_delimiter = None
+            continue
+        # Blank lines, '!' separators and '#' comments are skipped, as the push scripts' loaders do
+        if not command or command.startswith(('!', '#')):
+            continue
+
+        tokens = command.split()
+        keyword = tokens[0].lower()
+
+        if keyword == 'banner' and len(tokens) >= 3:
+            delimiter = tokens[2][:2] if tokens[2].startswith('^') else tokens[2][0]
+            if command.count(delimiter) < 2:
+                banner_delimiter = delimiter
+            continue
+
+        if keyword == 'do' or (keyword == 'end' and mode != 'exec'):
+            mode = 'exec' if keyword == 'end' else mode
+            continue
+        if keyword == 'exit':
+            mode = 'global' if mode in SUB_MODES else 'exec'
+            continue
+
+        check_tokens = command_tokens(tokens, mode)
+        if not check_tokens:
+            continue  # 'no 10' removes an entry by its sequence number
+        if mode in SUB_MODES and keyword not in ('no', 'default') and next_mode('global', command):
+            # Entering another sub-mode (e.g. 'ip access-list' typed under an interface)
+            effective_mode = 'global'
+        elif keyword_matches(check_tokens[0], MODE_COMMANDS[mode]):
+            effective_mode = mode
+        elif mode in SUB_MODES and keyword_matches(check_tokens[0], MODE_COMMANDS['global']):
+            # IOS drops back to global config for a global command typed in a sub-mode
+            effective_mode = 'global'
+        else:
+            valid_in = [m for m in MODE_COMMANDS if m not in (mode, 'global') and keyword_matches(check_tokens[0], MODE_COMMANDS[m])]
+            if valid_in:
+                issues.append(LintIssue(source, line_number, command, 'error',
+                                        f"'{check_tokens[0]}' is not valid in {mode} mode (valid in: {', '.join(valid_in)})"))
+            else:
+                issues.append(LintIssue(source, line_number, command, UNKNOWN_COMMAND_SEVERITY,
+                                        f"unknown command '{check_tokens[0]}'"))
+            continue
+
+        for severity, message in check_addresses(check_tokens, effective_mode):
+            issues.append(LintIssue(source, line_number, command, severity, message))
+
+        if keyword in ('no', 'default'):
+            mode = effective_mode
+            continue
+        entered = next_mode(effective_mode, command)
+        mode = entered or effective_mode
+
+    if banner_delimiter is not None:
+        issues.append(LintIssue(source, len(lines), "", 'error', f"banner is never closed with '{banner_delimiter}'"))
+    return issues
+
+def lint_config_file(filepath, start_mode='global'):
+    """Lints a configuration file; see lint_config_lines."""
+    with open(filepath, 'r') as f:
+        return lint_config_lines(f.read().splitlines(), filepath, start_mode)
+
+def report_lint_issues(issues):
+    """
+    Prints lint issues and returns True if any of them is an error.
+    Push scripts call this before opening any connection.
+    """
+    for issue in issues:
+        print(f"{issue.source}:{issue.line_number}: {issue.severity}: {issue.message}\n    {issue.line}")
+    errors = sum(1 for issue in issues if issue.severity == 'error')
+    if errors:
+        print(f"Config lint found {errors} error(s); refusing to start the push.")
+    return errors > 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python ios_config_lint.py <config_file> [<config_file> ...]")
+        sys.exit(2)
+    all_issues = []
+    for path in sys.argv[1:]:
+        all_issues.extend(lint_config_file(path))
+    has_errors = report_lint_issues(all_issues)
+    if not all_issues:
+        print("No issues found.")
+    sys.exit(1 if has_errors else 0)
@@ -0,0 +1,247 @@
+import re
+from ios_config_lint import next_mode, keyword_matches, command_tokens, MODE_COMMANDS
+
+# --- Canonical Forms ---
+# Config lines are compared in the form 'show running-config' prints them, so
+# abbreviations typed in a config file ('int gi1/0/1', 'sw mode acc') are expanded first.
+
+# Interface types as the running-config prints them; a unique prefix ('gi', 'Te', 'po') expands
+INTERFACE_TYPES = (
+    'GigabitEthernet', 'FastEthernet', 'TenGigabitEthernet', 'TwoGigabitEthernet',
+    'FiveGigabitEthernet', 'TwentyFiveGigE', 'FortyGigabitEthernet', 'HundredGigE',
+    'AppGigabitEthernet', 'Ethernet', 'Port-channel', 'Vlan', 'Loopback', 'Tunnel', 'Serial',
+)
+# Keywords after a command's first word that may be abbreviated. Only these expand;
+# names, numbers and free text are kept as typed.
+ARGUMENT_KEYWORDS = {
+    'interface': {'range'},
+    'switchport': {'mode', 'access', 'trunk', 'voice', 'vlan', 'allowed', 'native', 'add', 'remove',
+                   'except', 'nonegotiate', 'port-security', 'maximum', 'violation',
+                   'restrict', 'protect', 'mac-address', 'sticky', 'aging', 'host', 'dynamic',
+                   'desirable', 'encapsulation', 'dot1q', 'priority', 'extend'},
+    'spanning-tree': {'portfast', 'bpduguard', 'bpdufilter', 'enable', 'disable', 'guard', 'root',
+                      'loop', 'mode', 'rapid-pvst', 'pvst', 'mst', 'vlan', 'priority', 'link-type',
+                      'point-to-point', 'shared', 'edge', 'trunk', 'extend', 'system-id', 'loopguard',
+                      'cost', 'port-priority'},
+    'channel-group': {'mode', 'active', 'passive', 'on', 'auto', 'desirable'},
+    'power': {'inline', 'auto', 'never', 'static', 'police', 'max'},
+    'storm-control': {'broadcast', 'multicast', 'unicast', 'level', 'action', 'shutdown', 'trap'},
+    'authentication': {'port-control', 'host-mode', 'multi-auth', 'multi-domain', 'multi-host',
+                       'single-host', 'order', 'priority', 'periodic', 'timer', 'reauthenticate',
+                       'inactivity', 'violation', 'restrict', 'event', 'open', 'control-direction', 'in', 'both'},
+    'dot1x': {'pae', 'authenticator', 'timeout', 'tx-period', 'max-reauth-req', 'system-auth-control'},
+    'ip': {'address', 'helper-address', 'access-group', 'dhcp', 'snooping', 'trust', 'route',
+           'default-gateway', 'domain-name', 'name-server', 'ssh', 'version', 'http', 'server',
+           'secure-server', 'routing', 'arp', 'inspection', 'source-route', 'access-list',
+           'standard', 'extended', 'device', 'tracking'},
+    'logging': {'host', 'trap', 'buffered', 'console', 'monitor', 'source-interface', 'event',
+                'link-status', 'synchronous', 'origin-id', 'hostname'},
+    'ntp': {'server', 'source', 'authenticate', 'authentication-key', 'trusted-key', 'prefer'},
+    'cdp': {'enable', 'run'},
+    'lldp': {'run', 'transmit', 'receive'},
+    'udld': {'port', 'aggressive', 'enable'},
+    'service': {'password-encryption', 'timestamps', 'debug', 'log', 'datetime', 'msec',
+                'localtime', 'show-timezone', 'sequence-numbers'},
+    'transport': {'input', 'output', 'preferred', 'ssh', 'telnet', 'none', 'all'},
+}
+# The word after these is a name or a secret, never a keyword ('ip access-list extended st')
+NAME_KEYWORDS = {'standard', 'extended', 'access-group', 'access-class', 'name', 'description',
+                 'remark', 'key', 'password', 'secret', 'community', 'domain-name', 'hostname', 'host'}
+RANGE_ITEM_PATTERN = re.compile(r"^([A-Za-z][A-Za-z-]*?)\s*((?:\d+/)*)(\d+)(?:\s*-\s*(\d+))?$")
+INTERFACE_NAME_PATTERN = re.compile(r"^([A-Za-z][A-Za-z-]*?)(\d[\d/.:]*)?$")
+
+
+def expand_keyword(token, keywords, min_length=2):
+    """Returns the keyword that token is (or uniquely abbreviates), ignoring case; otherwise token."""
+    lowered = token.lower()
+    matches = [k for k in keywords if k.lower() == lowered]
+    if not matches and len(lowered) >= min_length:
+        matches = [k for k in keywords if k.lower().startswith(lowered)]
+    return matches[0] if len(matches) == 1 else token
+
+def expand_interface_name(tokens, index):
+    """Returns (name, tokens used) for the interface at tokens[index]: 'gi1/0/1' or 'gi 1/0/1'."""
+    match = INTERFACE_NAME_PATTERN.match(tokens[index])
+    if not match:
+        return tokens[index], 1
+    kind = expand_keyword(match.group(1), INTERFACE_TYPES, min_length=1)
+    if kind not in INTERFACE_TYPES:
+        return tokens[index], 1
+    if match.group(2):
+        return kind + match.group(2), 1
+    if index + 1 < len(tokens) and tokens[index + 1][:1].isdigit():
+        return kind + tokens[index + 1], 2
+    return tokens[index], 1
+
+def expand_interface_range(text):
+    """
+    'gi1/0/1 - 4, gi1/0/10' -> ['GigabitEthernet1/0/1', ..., 'GigabitEthernet1/0/10'];
+    None for anything it cannot expand (macros, unknown types).
+    """
+    names = []
+    for item in text.split(','):
+        match = RANGE_ITEM_PATTERN.match(item.strip())
+        if not match:
+            return None
+        kind = expand_keyword(match.group(1), INTERFACE_TYPES, min_length=1)
+        first = int(match.group(3))
+        last = int(match.group(4) or first)
+        if kind not in INTERFACE_TYPES or last < first:
+            return None
+        names.extend(f"{kind}{match.group(2)}{number}" for number in range(first, last + 1))
+    return names
+
+def normalize_line(text, mode='global'):
+    """
+    Expands the abbreviations in one config line typed in mode (None if unknown): the
+    command word, the keywords in ARGUMENT_KEYWORDS and interface names.
+    Other abbreviations are left as typed and will not match the running-config.
+    """
+    tokens = text.split()
+    if not tokens:
+        return text
+    prefix = []
+    if tokens[0].lower() in ('no', 'default') and len(tokens) > 1:
+        prefix, tokens = [tokens[0].lower()], tokens[1:]
+    if mode in MODE_COMMANDS:
+        tokens[0] = expand_keyword(tokens[0], MODE_COMMANDS[mode])
+    arguments = ARGUMENT_KEYWORDS.get(tokens[0], ())
+    result = [tokens[0]]
+    index = 1
+    while index < len(tokens):
+        previous = result[-1]
+        if previous == 'range' and result[0] == 'interface':
+            result.append(" ".join(tokens[index:]))  # Expanded by expand_interface_range
+            break
+        if previous in NAME_KEYWORDS:
+            result.append(tokens[index])
+            index += 1
+            continue
+        if previous == 'interface' or previous.endswith('-interface'):
+            name, used = expand_interface_name(tokens, index)
+            if name != tokens[index]:
+                result.append(name)
+                index += used
+                continue
+        result.append(expand_keyword(tokens[index], arguments) if arguments else tokens[index])
+        index += 1
+    return " ".join(prefix + result)
+
+
+# --- Hierarchical Config Comparison ---
+
+def is_skipped_line(text):
+    """Blank lines, comments, mode exits and 'do' exec commands carry no configuration."""
+    return not text or text.startswith(('!', '#')) or text in ('end', 'exit') or text.lower().startswith('do ')
+
+def add_config_line(tree, line):
+    """Adds line to tree; returns the child dicts (one per interface of an 'interface range')."""
+    if line.startswith('interface range '):
+        names = expand_interface_range(line[len('interface range '):])
+        if names:
+            return [tree.setdefault(f"interface {name}", {}) for name in names]
+    return [tree.setdefault(line, {})]
+
+def parse_config_tree(lines):
+    """
+    Parses IOS config lines into a nested dict {line: {child: {...}}}, with every line
+    normalized (see normalize_line) and 'interface range' split into its interfaces.
+    Indentation (as printed by 'show running-config') defines parent/child context;
+    files with no indentation at all are parsed with parse_flat_config_tree.
+    """
+    if not any(line[:1].isspace() for line in lines if line.strip()):
+        return parse_flat_config_tree(lines)
+    tree = {}
+    stack = [(-1, [tree], 'global')]  # (indent, parent dicts, mode of their children)
+    for raw_line in lines:
+        text = " ".join(raw_line.split())
+        if is_skipped_line(text):
+            continue
+        indent = len(raw_line) - len(raw_line.lstrip(' '))
+        while indent <= stack[-1][0]:
+            stack.pop()
+        parents, mode = stack[-1][1], stack[-1][2]
+        line = normalize_line(text, mode)
+        children = [child for parent in parents for child in add_config_line(parent, line)]
+        stack.append((indent, children, next_mode(mode, line) if mode else None))
+    return tree
+
+def parse_flat_config_tree(lines):
+    """
+    Parses unindented config lines, as typed into 'conf t', into the same nested dict.
+    A line entering a sub-mode (interface, line, router, vlan, ...; see
+    ios_config_lint.MODE_TRANSITIONS) becomes the parent of the lines after it that are
+    valid in that mode, until 'exit'/'end' or a line that only makes sense globally.
+    """
+    tree = {}
+    parents = None
+    mode = 'global'
+    for raw_line in lines:
+        text = " ".join(raw_line.split())
+        if text in ('end', 'exit'):
+            parents, mode = None, 'global'
+            continue
+        if is_skipped_line(text):
+            continue
+        keyword = (command_tokens(text.split(), mode) or [""])[0]
+        entered = next_mode('global', text)
+        if parents is not None and not entered and keyword_matches(keyword, MODE_COMMANDS[mode]):
+            line = normalize_line(text, mode)
+            for parent in parents:
+                parent.setdefault(line, {})
+            continue
+        children = add_config_line(tree, normalize_line(text, 'global'))
+        parents, mode = (children, entered) if entered else (None, 'global')
+    return tree
+
+def compute_config_delta(desired_tree, running_tree, running_root=None):
+    """
+    Returns the commands from desired_tree missing in running_tree, each
+    preceded by the parent context lines needed to enter its mode.
+    """
+    delta = []
+    for line, children in desired_tree.items():
+        if line.startswith("no "):
+            # A negation is already satisfied when the positive form is absent
+            if line[3:] not in running_tree:
+                continue
+            delta.append(line)
+        elif line not in running_tree:
+            if running_root is not None and not children and line in running_root:
+                # A flat file cannot tell 'logging host ...' after 'line vty' from a
+                # global command; it is present if the running-config has it globally
+                continue
+            delta.append(line)
+            delta.extend(flatten_config_tree(children))
+        elif children:
+            child_delta = compute_config_delta(children, running_tree[line], running_root or running_tree)
+            if child_delta:
+                delta.append(line)
+                delta.extend(child_delta)
+    return delta
+
+def find_missing_config(desired_tree, running_tree, running_root=None, parents=()):
+    """
+    Returns (parents, line) for each line of desired_tree that is not in running_tree
+    under the same parents. Negations and lines that only enter a mode ('vlan 10',
+    an interface with no lines under it) are not checked.
+    """
+    missing = []
+    for line, children in desired_tree.items():
+        running_children = running_tree.get(line)
+        if children:
+            missing.extend(find_missing_config(children, running_children or {},
+                                               running_root or running_tree, parents + (line,)))
+        elif line.startswith("no ") or (not parents and next_mode('global', line)):
+            continue
+        elif running_children is None and not (running_root is not None and line in running_root):
+            missing.append((parents, line))
+    return missing
+
+def flatten_config_tree(tree):
+    """Flattens a config tree back into a command list in parent-first order."""
+    commands = []
+    for line, children in tree.items():
+        commands.append(line)
+        commands.extend(flatten_config_tree(children))
+    return commands
@@ -0,0 +1,148 @@
+import re
+import socket
+import time
+
+# --- Prompt Patterns ---
+# Exec/config prompts such as 'SW1>', 'SW1#' or 'SW1(config-if)#'
+PROMPT_PATTERN = re.compile(r"(?:^|[\r\n])[\w.\-@/:()]+[>#]\s*$")
+# Confirmation prompts such as 'Destination filename [startup-config]?' or '[confirm]'
+CONFIRM_PATTERN = re.compile(r"(\[confirm\]|\]\?|\[yes/no\]:?|\(y/n\)\??)\s*$", re.IGNORECASE)
+# Marker printed once 'copy run start' / 'write memory' has finished
+SAVE_OK_PATTERN = re.compile(r"\[OK\]")
+
+DEFAULT_TIMEOUT = 10
+# Only the tail of the buffer needs to be scanned for a prompt
+PROMPT_SCAN_WINDOW = 256
+
+
+def read_until(channel, patterns, timeout=DEFAULT_TIMEOUT):
+    """
+    Reads from a Paramiko channel until the output ends with one of the patterns.
+
+    Args:
+        channel: An interactive channel from invoke_shell().
+        patterns (list): Compiled regular expressions checked against the tail of the output.
+        timeout (float): Seconds to wait before giving up.
+
+    Returns:
+        tuple: (str: output, pattern or None) - the pattern that matched, or None on timeout.
+    """
+    chunks = []
+    tail = ""
+    deadline = time.time() + timeout
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return "".join(chunks), None
+        channel.settimeout(remaining)
+        try:
+            data = channel.recv(65535)
+        except socket.timeout:
+            return "".join(chunks), None
+        if not data:
+            # Channel closed by the device
+            return "".join(chunks), None
+        text = data.decode('utf-8', errors='ignore')
+        chunks.append(text)
+        tail = (tail + text)[-PROMPT_SCAN_WINDOW:]
+        for pattern in patterns:
+            if pattern.search(tail):
+                return "".join(chunks), pattern
+
+
+def wait_for_prompt(channel, timeout=DEFAULT_TIMEOUT):
+    """Reads the banner/initial output until the first exec prompt appears."""
+    output, matched = read_until(channel, [PROMPT_PATTERN], timeout)
+    return output, matched is not None
+
+
+def send_and_wait(channel, command, timeout=DEFAULT_TIMEOUT):
+    """
+    Sends a command and waits for either the device prompt or a confirmation prompt.
+
+    Returns:
+        tuple: (str: output, str: 'prompt', 'confirm' or 'timeout')
+    """
+    channel.send(command + "\n")
+    output, matched = read_until(channel, [PROMPT_PATTERN, CONFIRM_PATTERN], timeout)
+    if matched is PROMPT_PATTERN:
+        return output, 'prompt'
+    if matched is CONFIRM_PATTERN:
+        return output, 'confirm'
+    return output, 'timeout'
+
+
+# --- Config Streaming ---
+# Error markers IOS prints under a rejected command
+IOS_ERROR_PATTERN = re.compile(r"^\s*% ?(Invalid input|Incomplete command|Ambiguous command|Unknown command|Unrecognized command|Bad mask|Invalid)", re.IGNORECASE)
+# Lines in the device's output that start with a prompt, e.g. 'SW1(config-if)#ip address ...'
+LINE_PROMPT_PATTERN = re.compile(r"^[\w.\-@/:]+(\([\w\-]+\))?[>#]")
+FLOW_CONTROL_WINDOW = 16  # config lines allowed in flight before their prompt is echoed back
+LINE_TIMEOUT = 30
+
+
+def stream_config_lines(channel, lines, window=FLOW_CONTROL_WINDOW, timeout=LINE_TIMEOUT, stop_on_error=False):
+    """
+    Streams configuration lines into a shell that is already at a config prompt.
+
+    Sending is paced by the device: at most `window` lines are outstanding, and a
+    line counts as done once the next prompt is echoed back. Error markers are
+    attributed to the line whose echo they follow.
+
+    Args:
+        channel: An interactive channel sitting at a '(config)#' prompt.
+        lines (list): Configuration lines, without trailing newlines.
+        window (int): Maximum lines sent ahead of the device (1 = one at a time).
+        timeout (float): Seconds without any output before giving up.
+        stop_on_error (bool): Stop sending further lines after the first error.
+
+    Returns:
+        dict: 'completed' (int), 'errors' (list of (line, message)),
+              'output' (str) and 'timed_out' (bool).
+    """
+    errors = []
+    output = []
+    sent = 0
+    completed = 0
+    partial = ""
+    timed_out = False
+
+    def done():
+        # A bare prompt at the end of the output also completes the previous line
+        if PROMPT_PATTERN.search(partial) and LINE_PROMPT_PATTERN.match(partial.strip()):
+            return completed + 1
+        return completed
+
+    while True:
+        if not (stop_on_error and errors):
+            while sent < len(lines) and sent - done() < window:
+                channel.send(lines[sent] + "\n")
+                sent += 1
+        if done() >= sent and (sent == len(lines) or (stop_on_error and errors)):
+            break
+
+        channel.settimeout(timeout)
+        try:
+            data = channel.recv(65535)
+        except socket.timeout:
+            timed_out = True
+            break
+        if not data:
+            timed_out = True
+            break
+        text = data.decode('utf-8', errors='ignore').replace("\r", "")
+        output.append(text)
+        *complete_lines, partial = (partial + text).split("\n")
+        for line in complete_lines:
+            if LINE_PROMPT_PATTERN.match(line):
+                completed += 1
+            elif IOS_ERROR_PATTERN.match(line):
+                index = min(completed, len(lines) - 1)
+                errors.append((lines[index], line.strip()))
+
+    return {
+        'completed': min(done(), sent),
+        'errors': errors,
+        'output': "".join(output),
+        'timed_out': timed_out,
+    }
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from oui_lookup import mac_to_int
+
+# --- Locator Settings ---
+LOCATOR_DB = "mac_locator.db"
+# Ports that are never where a device is plugged in: port-channels and the switch's own entries
+UPLINK_PORT_PATTERN = re.compile(r'^(Po|Port-channel|CPU|Router|Switch|Drop|Sup)', re.IGNORECASE)
+UPLINK_MAC_THRESHOLD = 10   # A port with more MACs than this (across VLANs) is treated as a trunk/uplink
+HISTORY_LIMIT = 20          # History entries shown per MAC
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS macs (
+    mac INTEGER NOT NULL,
+    vlan INTEGER NOT NULL,
+    switch TEXT NOT NULL,
+    port TEXT NOT NULL,
+    vendor TEXT,
+    uplink INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (switch, vlan, mac)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS macs_by_mac ON macs (mac);
+CREATE TABLE IF NOT EXISTS polls (
+    switch TEXT PRIMARY KEY,
+    polled_at REAL NOT NULL,
+    entries INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    mac INTEGER NOT NULL,
+    vlan INTEGER NOT NULL,
+    switch TEXT NOT NULL,
+    port TEXT NOT NULL,
+    vendor TEXT,
+    uplink INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_by_mac ON history (mac, at);
+CREATE TABLE IF NOT EXISTS uplinks (
+    switch TEXT NOT NULL,
+    port TEXT NOT NULL,
+    PRIMARY KEY (switch, port)
+) WITHOUT ROWID;
+"""
+
+
+def format_mac(value):
+    """48-bit int -> Cisco dotted form ('0011.2233.4455')."""
+    digits = f"{value:012x}"
+    return f"{digits[0:4]}.{digits[4:8]}.{digits[8:12]}"
+
+def uplink_ports(entries):
+    """Ports in a switch's (vlan, mac, port, vendor) entries that look like trunks or uplinks."""
+    counts = Counter(port for vlan, mac, port, vendor in entries)
+    return {port for port, count in counts.items() if count > UPLINK_MAC_THRESHOLD or UPLINK_PORT_PATTERN.match(port)}
+
+
+class MacLocator:
+    """
+    Where each MAC was last seen, kept in SQLite with MACs as integer keys.
+
+    'macs' holds every switch's current MAC table (as of that switch's row in 'polls').
+    apply_switch() compares a new poll with it and writes only the differences: new
+    MACs, MACs that moved port and MACs that are gone, each also recorded in 'history'
+    when an access port is involved.
+
+    A port once seen as an uplink stays one ('uplinks'), so a trunk that is quiet in
+    one poll does not turn into an access port and back.
+    """
+    def __init__(self, path=LOCATOR_DB):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def apply_switch(self, switch, entries, polled_at=None):
+        """
+        Replaces switch's MAC table with entries, a list of (vlan, mac, port, vendor).
+        Returns (added, moved, removed) counts.
+        """
+        polled_at = polled_at or time.time()
+        known = {port for port, in self.db.execute("SELECT port FROM uplinks WHERE switch = ?", (switch,))}
+        uplinks = uplink_ports(entries) | known
+        current = {}
+        for vlan, mac, port, vendor in entries:
+            try:
+                current[(int(vlan), mac_to_int(mac))] = (port, vendor or None, int(port in uplinks))
+            except ValueError:
+                continue
+        previous = {(vlan, mac): (port, vendor, uplink) for vlan, mac, port, vendor, uplink in self.db.execute(
+            "SELECT vlan, mac, port, vendor, uplink FROM macs WHERE switch = ?", (switch,))}
+
+        added = [key for key in current if key not in previous]
+        moved = [key for key in current if key in previous and current[key][0] != previous[key][0]]
+        # Same port, newly classed as an uplink: not a move, so first_seen and history are left alone
+        reclassed = [key for key in current if key in previous and current[key][0] == previous[key][0]
+                     and current[key][2] != previous[key][2]]
+        removed = [key for key in previous if key not in current]
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO uplinks VALUES (?, ?)",
+                                [(switch, port) for port in uplinks - known])
+            self.db.executemany("DELETE FROM macs WHERE switch = ? AND vlan = ? AND mac = ?",
+                                [(switch, vlan, mac) for vlan, mac in removed])
+            self.db.executemany("INSERT OR REPLACE INTO macs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                [(mac, vlan, switch, *current[(vlan, mac)], polled_at) for vlan, mac in added + moved])
+            self.db.executemany("UPDATE macs SET uplink = ? WHERE switch = ? AND vlan = ? AND mac = ?",
+                                [(current[(vlan, mac)][2], switch, vlan, mac) for vlan, mac in reclassed])
+            # History is kept for access ports only; MACs coming and going on uplinks are noise
+            events = [(key, current[key], 'added') for key in added if not current[key][2]]
+            events += [(key, current[key], 'moved') for key in moved if not (current[key][2] and previous[key][2])]
+            events += [(key, previous[key], 'removed') for key in removed if not previous[key][2]]
+            self.db.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                [(mac, vlan, switch, port, vendor, uplink, event, polled_at)
+                                 for (vlan, mac), (port, vendor, uplink), event in events])
+            self.db.execute("INSERT OR REPLACE INTO polls VALUES (?, ?, ?)", (switch, polled_at, len(current)))
+        return len(added), len(moved), len(removed)
+
+    def locate(self, mac, include_uplinks=False):
+        """
+        Current locations of a MAC (any common format), access ports first.
+        Returns a list of dicts; empty if it is not in any switch's latest table.
+        """
+        query = ("SELECT m.switch, m.vlan, m.port, m.vendor, m.uplink, m.first_seen, p.polled_at "
+                 "FROM macs m JOIN polls p ON p.switch = m.switch WHERE m.mac = ?")
+        if not include_uplinks:
+            query += " AND m.uplink = 0"
+        rows = self.db.execute(query + " ORDER BY m.uplink, p.polled_at DESC", (mac_to_int(mac),))
+        columns = ('switch', 'vlan', 'port', 'vendor', 'uplink', 'first_seen', 'last_seen')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def history(self, mac, limit=HISTORY_LIMIT):
+        """The MAC's most recent added/moved/removed events, newest first."""
+        rows = self.db.execute("SELECT at, event, switch, vlan, port, uplink FROM history WHERE mac = ? "
+                               "ORDER BY at DESC LIMIT ?", (mac_to_int(mac), limit))
+        columns = ('at', 'event', 'switch', 'vlan', 'port', 'uplink')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def import_csv(self, path):
+        """Loads a fleet CSV written by access_session_oui --csv, one switch at a time."""
+        switches = defaultdict(list)
+        polled = {}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                switches[row['switch']].append((row['vlan'], row['mac'], row['port'], row['manufacturer']))
+                polled[row['switch']] = time.mktime(time.strptime(row['collected_at'], "%Y-%m-%d %H:%M:%S"))
+        for switch, entries in switches.items():
+            added, moved, removed = self.apply_switch(switch, entries, polled[switch])
+            print(f"{switch}: {len(entries)} entries, {added} added, {moved} moved, {removed} removed")
+
+
+def format_time(value):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value))
+
+def print_location(locator, mac, include_uplinks, show_history):
+    start = time.perf_counter()
+    locations = locator.locate(mac, include_uplinks)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{format_mac(mac_to_int(mac))} ({elapsed:.1f} ms)")
+    for location in locations:
+        kind = " (uplink)" if location['uplink'] else ""
+        print(f"  {location['switch']:15} {location['port']:12} vlan {location['vlan']:<5} "
+              f"{location['vendor'] or '-':20} since {format_time(location['first_seen'])}, "
+              f"last polled {format_time(location['last_seen'])}{kind}")
+    if not locations:
+        print("  Not in any switch's current MAC table" + ("" if include_uplinks else " (access ports)"))
+    if show_history or not locations:
+        for event in locator.history(mac):
+            kind = " (uplink)" if event['uplink'] else ""
+            print(f"  {format_time(event['at'])} {event['event']:8} {event['switch']} {event['port']} vlan {event['vlan']}{kind}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find which switch port a MAC address is on.")
+    parser.add_argument("macs", nargs="*", metavar="MAC", help="e.g. 0011.2233.4455 or 00:11:22:33:44:55")
+    parser.add_argument("--db", default=LOCATOR_DB, help="Locator database (default: %(default)s)")
+    parser.add_argument("--all", action="store_true", help="Include trunk/uplink ports")
+    parser.add_argument("--history", action="store_true", help="Show where each MAC has been")
+    parser.add_argument("--import", dest="import_csv", metavar="CSV", help="Load a fleet CSV from access_session_oui --csv")
+    args = parser.parse_args()
+    if not args.macs and not args.import_csv:
+        parser.error("give a MAC address or --import")
+    locator = MacLocator(args.db)
+    if args.import_csv:
+        locator.import_csv(args.import_csv)
+    for mac in args.macs:
+        try:
+            print_location(locator, mac, args.all, args.history)
+        except ValueError as e:
+            print(e)
+            sys.exit(2)
+    locator.close()
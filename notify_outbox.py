@@ -0,0 +1,333 @@
+import base64
+import json
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# --- Defaults ---
+DEFAULT_SPOOL_DIR = 'outbox_spool'
+DEFAULT_BATCH_WINDOW = 30  # seconds of events collected into one digest
+DEFAULT_MAX_BATCH = 50     # messages per digest
+DEFAULT_RETRY_INTERVAL = 60
+
+
+# --- Transports ---
+
+class PermanentSendError(Exception):
+    """The server rejected the message itself (5xx); resending it will never succeed."""
+
+
+class SMTPTransport:
+    """
+    Sends outbox messages over one persistent SMTP connection.
+    The connection is opened on first use and re-opened only if the server drops it.
+    """
+    def __init__(self, smtp_server, smtp_port, sender, recipient, starttls=True,
+                 username=None, password=None, timeout=30):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender = sender
+        self.recipient = recipient
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._server = None
+
+    def _connect(self):
+        print(f"Connecting to SMTP server {self.smtp_server}:{self.smtp_port}...")
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def _build(self, message):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = message.get('recipient') or self.recipient
+        msg['Subject'] = message['subject']
+        msg.attach(MIMEText(message['body'], message.get('subtype', 'plain')))
+        for attachment in message.get('attachments', []):
+            part = MIMEApplication(base64.b64decode(attachment['content']), Name=attachment['filename'])
+            part['Content-Disposition'] = f'attachment; filename="{attachment["filename"]}"'
+            msg.attach(part)
+        return msg
+
+    def send(self, message):
+        msg = self._build(message)
+        for attempt in range(2):
+            try:
+                if self._server is None:
+                    self._connect()
+                self._server.sendmail(self.sender, msg['To'], msg.as_string())
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError):
+                # Stale persistent connection; reconnect once before giving up
+                self.close()
+                if attempt == 1:
+                    raise
+            except smtplib.SMTPRecipientsRefused as e:
+                # Every recipient was refused; the connection itself is still usable
+                codes = [code for code, reply in e.recipients.values()]
+                if all(code >= 500 for code in codes):
+                    raise PermanentSendError(f"Recipients refused: {e.recipients}") from e
+                raise
+            except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                if e.smtp_code >= 500:
+                    raise PermanentSendError(f"Message rejected: {e.smtp_code} {e.smtp_error!r}") from e
+                raise
+            except smtplib.SMTPException:
+                # Authentication failures, unsupported STARTTLS and the like: reconnecting
+                # will not help, so fail now and let the outbox spool the message
+                self.close()
+                raise
+            except OSError:
+                # Socket-level failure (refused, reset, timed out); reconnect once
+                self.close()
+                if attempt == 1:
+                    raise
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+class SendGridTransport:
+    """
+    Sends outbox messages through the SendGrid API with a single reused client.
+    """
+    def __init__(self, api_key, sender, recipient):
+        from sendgrid import SendGridAPIClient
+        self.client = SendGridAPIClient(api_key)
+        self.sender = sender
+        self.recipient = recipient
+
+    def send(self, message):
+        from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType
+        content = {'html_content' if message.get('subtype') == 'html' else 'plain_text_content': message['body']}
+        mail = Mail(
+            from_email=self.sender,
+            to_emails=message.get('recipient') or self.recipient,
+            subject=message['subject'],
+            **content)
+        for attachment in message.get('attachments', []):
+            mail.add_attachment(Attachment(
+                FileContent(attachment['content']),
+                FileName(attachment['filename']),
+                FileType(attachment.get('mimetype', 'application/octet-stream'))))
+        response = self.client.send(mail)
+        if response.status_code >= 300:
+            raise RuntimeError(f"SendGrid returned status code {response.status_code}")
+
+    def close(self):
+        pass
+
+
+# --- Outbox ---
+
+def make_attachment(filename, data, mimetype='application/octet-stream'):
+    """Builds a spoolable attachment entry from raw bytes."""
+    return {'filename': filename, 'content': base64.b64encode(data).decode(), 'mimetype': mimetype}
+
+
+def build_digest(messages):
+    """Collapses several messages for the same recipient into one digest message."""
+    if len(messages) == 1:
+        return messages[0]
+    subtype = 'html' if any(m.get('subtype') == 'html' for m in messages) else 'plain'
+    separator = "<hr>" if subtype == 'html' else "\n" + "-" * 60 + "\n"
+    sections = []
+    for m in messages:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(m['queued_at']))
+        if subtype == 'html':
+            body = m['body'] if m.get('subtype') == 'html' else m['body'].replace("\n", "<br>")
+            sections.append(f"<h3>[{stamp}] {m['subject']}</h3>{body}")
+        else:
+            sections.append(f"[{stamp}] {m['subject']}\n{m['body']}")
+    return {
+        'subject': f"{len(messages)} notifications: {messages[0]['subject']}",
+        'body': separator.join(sections),
+        'subtype': subtype,
+        'recipient': messages[0].get('recipient'),
+        'attachments': [],
+        'queued_at': messages[0]['queued_at'],
+    }
+
+
+class NotificationOutbox:
+    """
+    Queue that scripts enqueue notifications into instead of sending them inline.
+
+    A background thread collects messages for batch_window seconds, merges them
+    into one digest per recipient and sends them over the transport's single
+    connection. Messages that cannot be sent are written to spool_dir and retried
+    every retry_interval seconds, and on the next start.
+    """
+    def __init__(self, transport, spool_dir=DEFAULT_SPOOL_DIR, batch_window=DEFAULT_BATCH_WINDOW,
+                 max_batch=DEFAULT_MAX_BATCH, retry_interval=DEFAULT_RETRY_INTERVAL, digest=True):
+        self.transport = transport
+        self.spool_dir = spool_dir
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.retry_interval = retry_interval
+        self.digest = digest
+        self.sent_count = 0
+        self.failed_count = 0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._spool_seq = 0
+        self._last_retry = 0
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notify-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def enqueue(self, subject, body, recipient=None, subtype='plain', attachments=None):
+        """Queues a notification; never blocks on the network."""
+        self._queue.put({
+            'subject': subject,
+            'body': body,
+            'subtype': subtype,
+            'recipient': recipient,
+            'attachments': attachments or [],
+            'queued_at': time.time(),
+        })
+
+    def close(self, timeout=None):
+        """Sends everything still queued, then stops the sender and closes the connection."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        else:
+            self._drain_and_send()
+        self.transport.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Background sender ---
+
+    def _run(self):
+        self._retry_spool()
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=1)
+            except queue.Empty:
+                self._maybe_retry_spool()
+                continue
+            batch = [first]
+            deadline = time.time() + self.batch_window
+            while len(batch) < self.max_batch and not self._stop.is_set():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, 1)))
+                except queue.Empty:
+                    continue
+            self._send_batch(batch)
+            self._maybe_retry_spool()
+        self._drain_and_send()
+
+    def _drain_and_send(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch and not self._send_batch(batch):
+            # Transport is down; leave the spool for the next run
+            return
+        self._retry_spool()
+
+    def _send_batch(self, batch):
+        if not self.digest:
+            outgoing = batch
+        else:
+            # Attachments are sent on their own; everything else is digested per recipient
+            outgoing = [m for m in batch if m['attachments']]
+            by_recipient = {}
+            for m in batch:
+                if not m['attachments']:
+                    by_recipient.setdefault(m.get('recipient'), []).append(m)
+            outgoing.extend(build_digest(group) for group in by_recipient.values())
+        all_sent = True
+        for message in outgoing:
+            all_sent = self._send_or_spool(message) and all_sent
+        return all_sent
+
+    def _send_or_spool(self, message):
+        try:
+            self.transport.send(message)
+            self.sent_count += 1
+            print(f"Notification sent: {message['subject']}")
+            return True
+        except PermanentSendError as e:
+            self.failed_count += 1
+            print(f"Notification rejected, dropping it: {message['subject']}: {e}")
+            return True
+        except Exception as e:
+            self.failed_count += 1
+            print(f"Error sending notification, spooling for retry: {e}")
+            self._spool(message)
+            return False
+
+    # --- Local spool ---
+
+    def _spool(self, message):
+        self._spool_seq += 1
+        name = f"{time.time():.6f}_{os.getpid()}_{self._spool_seq}.json"
+        tmp_path = os.path.join(self.spool_dir, name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(message, f)
+        os.replace(tmp_path, os.path.join(self.spool_dir, name))
+
+    def _maybe_retry_spool(self):
+        if time.time() - self._last_retry >= self.retry_interval:
+            self._retry_spool()
+
+    def _retry_spool(self):
+        self._last_retry = time.time()
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            with open(path) as f:
+                message = json.load(f)
+            try:
+                self.transport.send(message)
+            except PermanentSendError as e:
+                print(f"Spooled notification rejected, dropping it: {message['subject']}: {e}")
+                os.remove(path)
+                self.failed_count += 1
+                continue
+            except Exception as e:
+                print(f"Spooled notification still failing, keeping it: {e}")
+                return
+            os.remove(path)
+            self.sent_count += 1
+            print(f"Spooled notification sent: {message['subject']}")
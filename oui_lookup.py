@@ -0,0 +1,251 @@
+import array
+import bisect
+import functools
+import mmap
+import os
+import re
+import struct
+import sys
+
+try:
+    import manuf  # Only used to locate the Wireshark manuf file it ships with
+except ImportError:
+    manuf = None
+
+# --- OUI Database Settings ---
+OUI_FILE = None                 # Wireshark 'manuf' file; None uses the copy bundled with the manuf package
+OUI_CACHE_FILE = "manuf.cache"  # Binary index written next to the run; None disables it
+MEMO_SIZE = 65536               # Distinct MAC strings whose answers are remembered
+
+# --- Binary Cache Format ---
+#   magic 'OUIX' | version u32 | source mtime f64 | source size u64 | table count u32 | vendor count u32 |
+#   per table: prefix bits u32, entry count u32 |
+#   per table: keys u64[count], vendor ids u32[count] (padded to 8 bytes) |
+#   vendor offsets u32[vendors + 1] | UTF-8 'short\tlong' strings
+# Tables are sorted by key, so the file is searched in place through mmap.
+CACHE_HEADER = struct.Struct('<4sIdQII')
+CACHE_TABLE = struct.Struct('<II')
+CACHE_MAGIC = b"OUIX"
+CACHE_VERSION = 1
+MAC_SEPARATORS = re.compile(r"[-:.]")
+
+
+def mac_to_int(mac):
+    """'0011.2233.4455', '00:11:22:33:44:55' or '00-11-...' -> 48-bit int; ValueError if malformed."""
+    digits = MAC_SEPARATORS.sub("", mac)
+    if len(digits) != 12:
+        raise ValueError(f"Could not parse MAC: {mac}")
+    return int(digits, 16)
+
+def default_oui_file():
+    if OUI_FILE:
+        return OUI_FILE
+    if manuf is None:
+        raise FileNotFoundError("No OUI file: set OUI_FILE or install the manuf package (pip install manuf)")
+    return manuf.MacParser.get_packaged_manuf_file_path()
+
+def parse_manuf_file(path):
+    """
+    Reads a Wireshark manuf file into {prefix bits: {prefix int: (short, long)}}.
+    Plain lines are /24 OUIs; '/28' and '/36' (and other) suffixes mark IEEE sub-blocks.
+    """
+    tables = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.replace("\t\t", "\t").split("\t")]
+            if len(fields) < 2:
+                continue
+            prefix, _, mask = fields[0].partition("/")
+            digits = MAC_SEPARATORS.sub("", prefix)
+            try:
+                value = int(digits, 16)
+            except ValueError:
+                continue
+            bits = 4 * len(digits)
+            if mask and int(mask) < bits:
+                value >>= bits - int(mask)
+                bits = int(mask)
+            long_name = fields[2] if len(fields) > 2 else fields[1]
+            tables.setdefault(bits, {})[value] = (fields[1], long_name)
+    return tables
+
+
+class OuiDatabase:
+    """
+    MAC -> vendor lookups against an OUI database loaded once.
+
+    Each prefix length has its own integer-keyed table (a dict when parsed from the
+    manuf file, sorted arrays searched in place when read from the mmap'd binary
+    cache); a MAC is checked against the longest prefixes (e.g. /36, then /28) before
+    its /24 OUI. Answers for repeated MAC strings are memoized.
+    """
+    def __init__(self, tables, vendors, strings=None, mapped=None):
+        self.tables = tables          # [(bits, keys, ids)] longest prefix first: ({prefix: id}, None) or sorted arrays
+        self.vendors = vendors        # vendor id -> (short, long), or string offsets into `strings` when mapped
+        self.strings = strings
+        self.mapped = mapped          # Open mmap backing the tables, if any
+        self.lookup = functools.lru_cache(maxsize=MEMO_SIZE)(self.find)
+
+    @classmethod
+    def from_manuf_file(cls, path):
+        parsed = parse_manuf_file(path)
+        vendors = []
+        vendor_ids = {}
+        tables = []
+        for bits in sorted(parsed, reverse=True):
+            ids = {}
+            for key, vendor in parsed[bits].items():
+                if vendor not in vendor_ids:
+                    vendor_ids[vendor] = len(vendors)
+                    vendors.append(vendor)
+                ids[key] = vendor_ids[vendor]
+            tables.append((bits, ids, None))
+        return cls(tables, vendors)
+
+    @classmethod
+    def load(cls, path=None, cache_path=OUI_CACHE_FILE):
+        """
+        Loads the database, from the binary cache when it matches the manuf file,
+        otherwise from the manuf file itself (then writing the cache, if cache_path is set).
+        """
+        path = path or default_oui_file()
+        if cache_path:
+            database = cls.from_cache(cache_path, path)
+            if database:
+                return database
+        database = cls.from_manuf_file(path)
+        if cache_path:
+            try:
+                database.save_cache(cache_path, path)
+            except OSError as e:
+                print(f"Could not write OUI cache {cache_path}: {e}")
+        return database
+
+    def find(self, mac):
+        """Returns (short, long) vendor names for a MAC string, or None if unknown or malformed."""
+        try:
+            value = mac_to_int(mac)
+        except ValueError:
+            return None
+        for bits, keys, ids in self.tables:
+            key = value >> (48 - bits)
+            if ids is None:
+                vendor_id = keys.get(key)
+                if vendor_id is not None:
+                    return self.vendor(vendor_id)
+            else:
+                position = bisect.bisect_left(keys, key)
+                if position < len(keys) and keys[position] == key:
+                    return self.vendor(ids[position])
+        return None
+
+    def vendor(self, vendor_id):
+        if self.strings is None:
+            return self.vendors[vendor_id]
+        # Cache-backed: decode the name from the mapped string table on demand
+        offsets = self.vendors
+        name = bytes(self.strings[offsets[vendor_id]:offsets[vendor_id + 1]]).decode('utf-8')
+        return tuple(name.split("\t", 1))
+
+    def manufacturer(self, mac):
+        """Short vendor name (as manuf's get_manuf returns), or None."""
+        vendor = self.lookup(mac)
+        return vendor[0] if vendor else None
+
+    def manufacturer_long(self, mac):
+        vendor = self.lookup(mac)
+        return vendor[1] if vendor else None
+
+    def save_cache(self, cache_path, source_path):
+        """Writes the binary index (see Binary Cache Format) for source_path."""
+        source = os.stat(source_path)
+        strings = [f"{short}\t{long_name}".encode('utf-8') for short, long_name in self.vendors]
+        offsets = array.array('I', [0])
+        for value in strings:
+            offsets.append(offsets[-1] + len(value))
+        sections = []
+        for bits, keys, ids in self.tables:
+            items = sorted(keys.items())
+            key_array = array.array('Q', (key for key, vendor_id in items))
+            id_array = array.array('I', (vendor_id for key, vendor_id in items))
+            if len(id_array) % 2:
+                id_array.append(0)  # Keep the next table 8-byte aligned
+            sections.append((bits, len(items), key_array, id_array))
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, source.st_mtime, source.st_size,
+                                      len(sections), len(strings)))
+            for bits, count, key_array, id_array in sections:
+                f.write(CACHE_TABLE.pack(bits, count))
+            if f.tell() % 8:
+                f.write(bytes(8 - f.tell() % 8))
+            for bits, count, key_array, id_array in sections:
+                f.write(key_array.tobytes())
+                f.write(id_array.tobytes())
+            f.write(offsets.tobytes())
+            f.write(b"".join(strings))
+        os.replace(tmp_path, cache_path)
+
+    @classmethod
+    def from_cache(cls, cache_path, source_path):
+        """Maps the binary cache; None if it is missing, stale or unreadable on this platform."""
+        if sys.byteorder != 'little':
+            return None
+        try:
+            source = os.stat(source_path)
+            with open(cache_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mapped) < CACHE_HEADER.size:
+            mapped.close()
+            return None
+        magic, version, mtime, size, table_count, vendor_count = CACHE_HEADER.unpack_from(mapped)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or mtime != source.st_mtime or size != source.st_size:
+            mapped.close()
+            return None
+        view = memoryview(mapped)
+        try:
+            position = CACHE_HEADER.size
+            layout = []
+            for _ in range(table_count):
+                layout.append(CACHE_TABLE.unpack_from(mapped, position))
+                position += CACHE_TABLE.size
+            position += -position % 8
+            tables = []
+            for bits, count in layout:
+                keys = view[position:position + 8 * count].cast('Q')
+                position += 8 * count
+                ids = view[position:position + 4 * count].cast('I')
+                position += 4 * (count + count % 2)
+                if len(keys) != count or len(ids) != count:
+                    raise ValueError("truncated table")
+                tables.append((bits, keys, ids))
+            offsets = view[position:position + 4 * (vendor_count + 1)].cast('I')
+            position += 4 * (vendor_count + 1)
+            if len(offsets) != vendor_count + 1 or position + offsets[-1] > len(mapped):
+                raise ValueError("truncated string table")
+        except (struct.error, TypeError, ValueError) as e:
+            print(f"Ignoring unreadable OUI cache {cache_path}: {e}")
+            return None
+        return cls(tables, offsets, view[position:], mapped)
+
+
+@functools.lru_cache(maxsize=None)
+def get_oui_database():
+    """The process-wide database, loaded on first use."""
+    return OuiDatabase.load()
+
+
+if __name__ == "__main__":
+    # Looks up MACs given on the command line, e.g. to check the cache works
+    if len(sys.argv) < 2:
+        print("Usage: python oui_lookup.py MAC [MAC ...]")
+        sys.exit(2)
+    database = get_oui_database()
+    for mac in sys.argv[1:]:
+        vendor = database.lookup(mac)
+        print(f"{mac}: {vendor[1] if vendor else 'unknown'}")
@@ -0,0 +1,398 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from Syslog_Server import FLUSH_INTERVAL
+from syslog_query import Query, read_active_segment
+from syslog_store import active_segments
+from syslog_tcp import frame_message
+
+# --- Benchmark Settings ---
+DEFAULT_RATES = "5000,10000,20000,40000"    # Offered messages per second, one step each
+DEFAULT_DURATION = 10                       # Seconds per step
+DEFAULT_DEVICES = 200                       # Simulated switches (one source address/socket each)
+CORPUS_SIZE = 20000                         # Pre-rendered messages, replayed round-robin
+LATENCY_SAMPLE_EVERY = 100                  # Every Nth message carries its send time
+TAIL_INTERVAL = 0.02                        # Seconds between store polls when measuring latency to disk
+DRAIN_TIMEOUT = 15                          # Seconds to wait for the server to catch up after a step
+MAX_DROP_RATE = 0.001                       # Highest drop rate that still counts as sustained
+MAX_P99_LATENCY = 1.0                       # ...and p99 latency to disk (seconds) must stay below this,
+KEEP_UP_RATIO = 0.95                        # or, without latency samples, written/s must reach this share of sent/s
+SERVER_PORT = 15154
+METRICS_PORT = 19514
+LATENCY_TAG = re.compile(rb" \[bench (\d+) (\d+\.\d+)\]$")
+
+# Weighted mix of what a campus access/distribution fleet logs
+CORPUS_TEMPLATES = [
+    (30, "%LINK-3-UPDOWN: Interface {intf}, changed state to {state}"),
+    (30, "%LINEPROTO-5-UPDOWN: Line protocol on Interface {intf}, changed state to {state}"),
+    (12, "%DOT1X-5-FAIL: Authentication failed for client ({mac}) on Interface {intf} AuditSessionID {session}"),
+    (10, "%MAB-5-SUCCESS: Authentication successful for client ({mac}) on Interface {intf} AuditSessionID {session}"),
+    (8, "%SESSION_MGR-5-START: Starting 'dot1x' for client ({mac}) on Interface {intf} AuditSessionID {session}"),
+    (6, "%SW_MATM-4-MACFLAP_NOTIF: Host {mac} in vlan {vlan} is flapping between port {intf} and port {intf2}"),
+    (5, "%SYS-5-CONFIG_I: Configured from console by {user} on vty0 ({ip})"),
+    (5, "%SEC_LOGIN-5-LOGIN_SUCCESS: Login Success [user: {user}] [Source: {ip}] [localport: 22] at {clock}"),
+    (3, "%SEC_LOGIN-4-LOGIN_FAILED: Login failed [user: {user}] [Source: {ip}] [localport: 22] [Reason: Login Authentication Failed] at {clock}"),
+    (4, "%ILPOWER-5-POWER_GRANTED: Interface {intf}: Power granted"),
+    (3, "%SPANTREE-2-BLOCK_BPDUGUARD: Received BPDU on port {intf} with BPDU Guard enabled. Disabling port."),
+    (3, "%PM-4-ERR_DISABLE: bpduguard error detected on {intf}, putting {intf} in err-disable state"),
+    (2, "%OSPF-5-ADJCHG: Process 1, Nbr {ip} on Vlan{vlan} from FULL to DOWN, Neighbor Down: Dead timer expired"),
+    (2, "%DUAL-5-NBRCHANGE: EIGRP-IPv4 100: Neighbor {ip} (Vlan{vlan}) is up: new adjacency"),
+    (1, "%SYS-5-RESTART: System restarted --"),
+    (1, "%PLATFORM_ENV-1-FAN: Faulty fan{fan} detected"),
+]
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def build_corpus(count=CORPUS_SIZE, devices=DEFAULT_DEVICES, size=0, seed=1):
+    """Renders `count` Cisco IOS-style messages (PRI, sequence, origin hostname, timestamp), padded to size bytes."""
+    rng = random.Random(seed)
+    weights = [weight for weight, template in CORPUS_TEMPLATES]
+    templates = [template for weight, template in CORPUS_TEMPLATES]
+    corpus = []
+    for seq in range(count):
+        template = rng.choices(templates, weights)[0]
+        severity = int(template.split("-")[1])
+        values = {
+            'intf': f"GigabitEthernet{rng.randint(1, 4)}/0/{rng.randint(1, 48)}",
+            'intf2': f"GigabitEthernet{rng.randint(1, 4)}/0/{rng.randint(1, 48)}",
+            'state': rng.choice(("up", "down")),
+            'mac': "%04x.%04x.%04x" % (rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(16)),
+            'session': "%024X" % rng.getrandbits(96),
+            'vlan': rng.choice((10, 20, 30, 100, 200)),
+            'user': rng.choice(("admin", "netops", "jsmith", "svc_backup")),
+            'ip': f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            'fan': rng.randint(1, 3),
+            'clock': f"{rng.randint(0, 23):02}:{rng.randint(0, 59):02}:{rng.randint(0, 59):02} UTC",
+        }
+        host = f"sw{rng.randrange(devices):04}-acc"
+        stamp = (f"*{rng.choice(MONTHS)} {rng.randint(1, 28):2} {rng.randint(0, 23):02}:"
+                 f"{rng.randint(0, 59):02}:{rng.randint(0, 59):02}.{rng.randint(0, 999):03}")
+        message = f"<{23 * 8 + severity}>{seq}: {host}: {stamp}: {template.format(**values)}".encode()
+        corpus.append(message.ljust(size, b" ") if size else message)
+    return corpus
+
+def load_corpus(path, size=0):
+    """Real messages to replay, one per line (e.g. a saved syslog.txt)."""
+    with open(path, 'rb') as f:
+        lines = [line.rstrip(b"\r\n") for line in f if line.strip()]
+    return [line.ljust(size, b" ") if size else line for line in lines]
+
+def source_address(index):
+    """Distinct loopback addresses, so each simulated device is its own source."""
+    return f"127.0.{index // 250}.{index % 250 + 2}"
+
+
+def send_worker(host, port, protocol, corpus, rate, duration, devices, offset, sent, tag_base):
+    """One sender process: paces `rate` messages/s for `duration` seconds across `devices` sockets."""
+    loopback = host.startswith("127.")
+    if protocol == "udp":
+        sockets = []
+        for index in range(devices):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1024 * 1024)
+            if loopback:
+                sock.bind((source_address(offset + index), 0))
+            sockets.append(sock)
+    else:
+        sockets = [socket.create_connection((host, port))]
+    chunk = max(1, rate // 1000)  # Messages per pacing tick (about 1 ms)
+    count = 0
+    position = offset * 7919 % len(corpus)
+    start = time.time()
+    deadline = start + duration
+    next_send = start
+    while next_send < deadline:
+        delay = next_send - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        payload = []
+        for _ in range(chunk):
+            message = corpus[position]
+            position = (position + 1) % len(corpus)
+            if count % LATENCY_SAMPLE_EVERY == 0:
+                message += b" [bench %d %.6f]" % (tag_base + count, time.time())
+            payload.append(message)
+            count += 1
+        try:
+            if protocol == "udp":
+                for i, message in enumerate(payload):
+                    sockets[(count + i) % len(sockets)].sendto(message, (host, port))
+            else:
+                sockets[0].sendall(b"".join(frame_message(message) for message in payload))
+        except OSError:
+            pass  # Send buffer full (ENOBUFS); counted as sent, shows up as a drop
+        next_send += chunk / rate
+    for sock in sockets:
+        sock.close()
+    with sent.get_lock():
+        sent.value += count
+
+
+class StoreTail(threading.Thread):
+    """Polls the store's active segments and records send-to-disk latency of tagged messages."""
+    def __init__(self, store_dir):
+        super().__init__(name="bench-tail", daemon=True)
+        self.store_dir = store_dir
+        self.positions = {}
+        self.latencies = []
+        self.last_seen = 0      # When new records last appeared in the store
+        self.query = Query()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(TAIL_INTERVAL):
+            for path in active_segments(self.store_dir, recursive=True):
+                records, self.positions[path] = read_active_segment(path, self.query, self.positions.get(path, 0))
+                now = time.time()
+                if records:
+                    self.last_seen = now
+                for record in records:
+                    tag = LATENCY_TAG.search(record.message.rstrip())
+                    if tag:
+                        self.latencies.append(now - float(tag.group(2)))
+
+    def take(self):
+        latencies, self.latencies = self.latencies, []
+        return latencies
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def fetch_metrics(url):
+    with urllib.request.urlopen(f"{url}/metrics.json", timeout=5) as response:
+        return json.load(response)
+
+def process_tree_cpu(pid):
+    """User + system CPU seconds of pid and all its descendants (Linux /proc); None elsewhere."""
+    ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+    stats = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # Fields after the command: state ppid ... utime(12) stime(13)
+        stats[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]))
+    total = 0
+    pids = {pid}
+    while True:
+        children = {child for child, (ppid, cpu) in stats.items() if ppid in pids and child not in pids}
+        if not children:
+            break
+        pids |= children
+    for member in pids:
+        if member in stats:
+            total += stats[member][1]
+    return total / ticks
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def spawn_server(store_dir, workers, dedup, protocol):
+    """Starts Syslog_Server in its own process on SERVER_PORT with a scratch store."""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    bootstrap = "\n".join([
+        "import sys",
+        f"sys.path.insert(0, {repo!r})",
+        "import Syslog_Server as S",
+        f"S.METRICS_ADDRESS, S.METRICS_PORT = '127.0.0.1', {METRICS_PORT}",
+        f"S.DEDUP_ENABLED = {dedup!r}",
+        "S.REVERSE_DNS = False",
+        "S.RELAY_DESTINATIONS = []",
+        f"tcp_port = {SERVER_PORT if protocol == 'tcp' else None}",
+        f"if {workers} > 1:",
+        f"    S.start_multiprocess_server('127.0.0.1', {SERVER_PORT}, {store_dir!r}, workers={workers}, tcp_port=tcp_port)",
+        "else:",
+        f"    S.start_syslog_server('127.0.0.1', {SERVER_PORT}, store_dir={store_dir!r}, tcp_port=tcp_port)",
+    ])
+    log = open(os.path.join(os.path.dirname(store_dir), "server.log"), 'w')
+    process = subprocess.Popen([sys.executable, "-c", bootstrap], cwd=os.path.dirname(store_dir),
+                               stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{METRICS_PORT}"
+    for _ in range(100):
+        try:
+            fetch_metrics(url)
+            return process, url
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Server did not start; see {log.name}")
+
+def wait_for_drain(url, sent_total, before):
+    """Waits until everything sent is received and written (or dropped), or progress stops."""
+    deadline = time.time() + DRAIN_TIMEOUT
+    last = None
+    stalled_since = time.time()
+    while time.time() < deadline:
+        metrics = fetch_metrics(url)
+        received = metrics['received'] - before['received']
+        handled = metrics['written'] - before['written'] + metrics['dropped'] - before['dropped']
+        if received >= sent_total and handled >= received:
+            return metrics
+        progress = (metrics['received'], metrics['written'])
+        if progress != last:
+            last, stalled_since = progress, time.time()
+        elif time.time() - stalled_since > 2:
+            return metrics  # The rest was lost before reaching the server
+        time.sleep(0.2)
+    return fetch_metrics(url)
+
+
+def run_step(args, corpus, rate, url, server_pid, tail, step):
+    before = fetch_metrics(url)
+    cpu_before = process_tree_cpu(server_pid) if server_pid else None
+    sent = multiprocessing.Value('q', 0)
+    per_sender = rate // args.senders
+    devices = max(1, args.devices // args.senders)
+    start = time.time()
+    senders = [multiprocessing.Process(target=send_worker, args=(
+        args.host, args.port, args.protocol, corpus, per_sender, args.duration, devices, i * devices, sent,
+        (step * args.senders + i) * 10 ** 9)) for i in range(args.senders)]
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    send_time = time.time() - start
+    after = wait_for_drain(url, sent.value, before)
+    elapsed = time.time() - start
+    if tail and tail.last_seen > start:
+        # Time until the last records reached disk, less the idle flush of the final partial batch;
+        # excludes the wait for the counters to settle
+        elapsed = max(send_time, tail.last_seen - start - FLUSH_INTERVAL)
+    cpu_after = process_tree_cpu(server_pid) if server_pid else None
+    latencies = tail.take() if tail else []
+
+    def delta(name):
+        return (after.get(name) or 0) - (before.get(name) or 0)
+
+    received = delta('received')
+    lost = max(sent.value - received, 0) + delta('dropped')
+    return {
+        'offered_rate': rate,
+        'sent': sent.value,
+        'send_rate': round(sent.value / send_time),
+        'received': received,
+        'written': delta('written'),
+        'throughput': round(delta('written') / elapsed),
+        'kernel_drops': delta('kernel_drops'),
+        'queue_drops': delta('dropped'),
+        'drop_rate': round(lost / sent.value, 6) if sent.value else 0,
+        'latency_p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        'latency_max_ms': round(max(latencies) * 1000, 1) if latencies else None,
+        'cpu_us_per_message': (round((cpu_after - cpu_before) / received * 1e6, 1)
+                               if cpu_before is not None and cpu_after is not None and received else None),
+    }
+
+def kept_up(row):
+    """True if the server kept pace with the step instead of building a backlog."""
+    if row['latency_p99_ms'] is not None:
+        return row['latency_p99_ms'] <= MAX_P99_LATENCY * 1000
+    return row['throughput'] >= KEEP_UP_RATIO * row['send_rate']
+
+def print_row(row):
+    def show(value):
+        return "-" if value is None else value
+    print(f"{row['offered_rate']:>9} {row['send_rate']:>9} {row['throughput']:>10} {row['drop_rate'] * 100:>7.3f}% "
+          f"{row['kernel_drops']:>8} {row['queue_drops']:>8} {show(row['latency_p50_ms']):>8} "
+          f"{show(row['latency_p99_ms']):>8} {show(row['cpu_us_per_message']):>9}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay Cisco syslog at controlled rates against a local receiver "
+                                                 "and measure throughput, drops, latency to disk and CPU per message.")
+    parser.add_argument("--rates", default=DEFAULT_RATES, help="Comma-separated messages/s steps (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds per step")
+    parser.add_argument("--size", type=int, default=0, help="Pad messages to this many bytes")
+    parser.add_argument("--corpus", help="Replay these messages (one per line) instead of the generated mix")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="Simulated source devices")
+    parser.add_argument("--senders", type=int, default=1, help="Sender processes (for rates one process cannot reach)")
+    parser.add_argument("--protocol", choices=("udp", "tcp"), default="udp")
+    parser.add_argument("--workers", type=int, default=1, help="Receiver processes when the server is spawned")
+    parser.add_argument("--dedup", action="store_true", help="Keep duplicate suppression on in the spawned server")
+    parser.add_argument("--target", help="Benchmark an already running server instead, given as its metrics URL")
+    parser.add_argument("--host", default="127.0.0.1", help="Receiver address with --target")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Receiver port with --target")
+    parser.add_argument("--store", help="Store directory of the --target server, to measure latency to disk")
+    parser.add_argument("--pid", type=int, help="Process id of the --target server, to measure CPU")
+    parser.add_argument("--output", help="Also write the results as JSON, for comparing runs")
+    parser.add_argument("--keep", action="store_true", help="Keep the spawned server's scratch store")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.size) if args.corpus else build_corpus(size=args.size, devices=args.devices)
+    workdir = process = None
+    if args.target:
+        url, store_dir, server_pid = args.target.rstrip("/"), args.store, args.pid
+    else:
+        workdir = tempfile.mkdtemp(prefix="syslog_bench_")
+        store_dir = os.path.join(workdir, "store")
+        process, url = spawn_server(store_dir, args.workers, args.dedup, args.protocol)
+        server_pid = process.pid
+        args.host, args.port = "127.0.0.1", SERVER_PORT
+    tail = StoreTail(store_dir) if store_dir else None
+    if tail:
+        tail.start()
+
+    average = sum(len(message) for message in corpus) / len(corpus)
+    print(f"{len(corpus)} messages (avg {average:.0f} bytes) over {args.protocol.upper()} from {args.devices} sources, "
+          f"{args.duration:g}s per step")
+    print(f"{'offered':>9} {'sent/s':>9} {'written/s':>10} {'drops':>8} {'kernel':>8} {'queue':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'cpu us':>9}")
+    results = []
+    try:
+        for step, rate in enumerate(int(value) for value in args.rates.split(",")):
+            row = run_step(args, corpus, rate, url, server_pid, tail, step)
+            results.append(row)
+            print_row(row)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if tail:
+            tail.stop()
+        if process:
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+            else:
+                print(f"Scratch store kept in {workdir}")
+
+    sustained = [row['throughput'] for row in results if row['drop_rate'] <= MAX_DROP_RATE and kept_up(row)]
+    if results:
+        print(f"Sustained throughput (drops <= {MAX_DROP_RATE:.1%}, kept up with the send rate): "
+              f"{max(sustained) if sustained else 'none of the steps'} msg/s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'settings': vars(args), 'corpus_messages': len(corpus), 'average_bytes': round(average),
+                       'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,111 @@
+import re
+from collections import OrderedDict, deque
+from syslog_records import encode_repeat
+
+# --- Duplicate Suppression Settings ---
+DEDUP_WINDOW = 60               # Seconds a message's copies are collapsed after its first occurrence
+MAX_FINGERPRINTS = 50000        # Active fingerprints kept (LRU); evicted ones are summarised early
+MASK_NUMBERS = False            # Treat messages differing only in counters, L4 ports and times as duplicates
+# Standalone numbers only: digits inside names (GigabitEthernet1/0/12, Vlan10, vty0)
+# and IP addresses are kept, so flaps on different interfaces stay separate records
+NUMBER_PATTERN = re.compile(rb"(?<![\w/.:])\d+(?::\d+)*(?:\.\d+)?(?![\w/.])")
+
+
+class DedupEntry:
+    __slots__ = ('window_start', 'first', 'last', 'count', 'record')
+
+    def __init__(self, record):
+        self.window_start = record.received_at
+        self.first = None   # First/last suppressed copy
+        self.last = None
+        self.count = 0
+        self.record = None  # Most recent suppressed copy
+
+
+class Deduplicator:
+    """
+    Collapses repeated messages from the same source.
+
+    The first occurrence of a message is passed through unchanged. Further copies with
+    the same fingerprint (source, severity and the message from its mnemonic on, with
+    numbers masked if MASK_NUMBERS) within DEDUP_WINDOW seconds are suppressed; when
+    the window ends, one summary record is emitted: the last copy, stamped with the
+    emit time, whose 'repeat' field holds the suppressed count and first/last times.
+    """
+    def __init__(self, window=DEDUP_WINDOW, max_entries=MAX_FINGERPRINTS, mask_numbers=MASK_NUMBERS):
+        self.window = window
+        self.max_entries = max_entries
+        self.mask_numbers = mask_numbers
+        self.entries = OrderedDict()    # fingerprint -> DedupEntry, least recently seen first
+        self.windows = deque()          # (window_start, fingerprint) in the order windows opened; may hold closed ones
+        self.suppressed = 0
+
+    def fingerprint(self, record):
+        message = record.message
+        if record.mnemonic:
+            # Skip the sequence number and timestamp in front of '%FAC-SEV-MNEMONIC'
+            start = message.find(b"%" + record.mnemonic)
+            if start > 0:
+                message = message[start:]
+        if self.mask_numbers:
+            message = NUMBER_PATTERN.sub(b"#", message)
+        return (record.src_ip, record.severity, message)
+
+    def process(self, records):
+        """Returns the records to write: first occurrences plus summaries of windows that ended."""
+        output = []
+        for record in records:
+            output.extend(self.expire(record.received_at))
+            key = self.fingerprint(record)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = DedupEntry(record)
+                self.windows.append((record.received_at, key))
+                output.append(record)
+                if len(self.entries) > self.max_entries:
+                    output.extend(self.close(next(iter(self.entries)), record.received_at))
+                if len(self.windows) > 2 * len(self.entries) + 1024:
+                    self.compact()
+                continue
+            self.entries.move_to_end(key)
+            if entry.count == 0:
+                entry.first = record.received_at
+            entry.count += 1
+            entry.last = record.received_at
+            entry.record = record
+            self.suppressed += 1
+        return output
+
+    def expire(self, now):
+        """Summaries for every window that has ended by now."""
+        output = []
+        while self.windows and now - self.windows[0][0] >= self.window:
+            window_start, key = self.windows.popleft()
+            entry = self.entries.get(key)
+            if entry is not None and entry.window_start == window_start:
+                output.extend(self.close(key, now))
+        return output
+
+    def compact(self):
+        """
+        Drops windows of fingerprints already closed (evicted from the LRU), so the
+        deque - and the message bytes its keys hold - stays bounded by MAX_FINGERPRINTS
+        rather than by message rate * DEDUP_WINDOW.
+        """
+        self.windows = deque(sorted(((entry.window_start, key) for key, entry in self.entries.items()),
+                                    key=lambda window: window[0]))
+
+    def close(self, key, now):
+        entry = self.entries.pop(key)
+        if not entry.count:
+            return []
+        return [entry.record._replace(received_at=max(now, entry.last),
+                                      repeat=encode_repeat(entry.count, entry.first, entry.last))]
+
+    def flush(self, now):
+        """Summaries for all open windows (on shutdown)."""
+        output = []
+        for key in list(self.entries):
+            output.extend(self.close(key, now))
+        self.windows.clear()
+        return output
@@ -0,0 +1,163 @@
+import array
+import bisect
+import json
+import os
+import struct
+import sys
+from syslog_records import decode_repeat, int_to_ip, iter_records
+
+# --- Query Index Format ---
+# One '.qidx' file per closed segment, next to its sidecar '.idx.json':
+#   magic 'SQIX' | version u32 | json_length u32 | json | times f64[n] | offsets u64[n] |
+#   one column per COLUMNS entry [n] | postings u32[...]
+# Records are numbered (ordinals) in receive-time order; offsets point into the
+# uncompressed segment bytes. The JSON maps each host (source IP, hostname and
+# inventory device name), site, mnemonic and severity to a [start, length] slice of postings, which holds sorted
+# ordinals, and lists the value names the u32 columns refer to.
+QIDX_HEADER = struct.Struct('<4sII')
+# (name, array typecode); NAME_COLUMNS hold ids into the JSON name list of the same name.
+# 'weight' is the number of messages a record stands for: 1, or the suppressed count
+# of a duplicate-suppression summary (see syslog_dedup)
+COLUMNS = (('host', 'I'), ('source', 'I'), ('mnemonic', 'I'), ('severity', 'B'), ('facility', 'B'), ('site', 'I'),
+           ('weight', 'I'))
+NAME_COLUMNS = ('host', 'source', 'mnemonic', 'site')
+POSTING_TABLES = ('hosts', 'sites', 'mnemonics', 'severities')
+QIDX_MAGIC = b"SQIX"
+QIDX_VERSION = 3
+QIDX_SUFFIX = ".qidx"
+
+
+class QueryIndex:
+    """Loaded '.qidx' file: time-sorted record offsets, per-record columns and postings."""
+    def __init__(self, times, offsets, columns, names, postings, tables):
+        self.times = times
+        self.offsets = offsets
+        self.columns = columns      # {'host': array, ...} indexed by ordinal
+        self.names = names          # {'host': [names], ...} for the 'I' columns
+        self.postings = postings
+        self.hosts = tables['hosts']
+        self.sites = tables['sites']
+        self.mnemonics = tables['mnemonics']
+        self.severities = tables['severities']
+
+    def __len__(self):
+        return len(self.times)
+
+    def time_range(self, start=None, end=None):
+        """Returns the [lo, hi) ordinal range of records received in [start, end)."""
+        lo = bisect.bisect_left(self.times, start) if start is not None else 0
+        hi = bisect.bisect_left(self.times, end) if end is not None else len(self.times)
+        return lo, hi
+
+    def ordinals_for(self, keys, table, lo, hi):
+        """Sorted ordinals in [lo, hi) posted under any of keys in table (hosts, sites, ...)."""
+        selected = set()
+        for key in keys:
+            start, length = table[key]
+            ordinals = self.postings[start:start + length]
+            selected.update(ordinals[bisect.bisect_left(ordinals, lo):bisect.bisect_left(ordinals, hi)])
+        return sorted(selected)
+
+    def column_values(self, name, ordinals):
+        """Column values (names for id columns) of the given ordinals."""
+        column = self.columns[name]
+        if isinstance(ordinals, range) and ordinals.step == 1:
+            values = column[ordinals.start:ordinals.stop]
+        else:
+            values = [column[ordinal] for ordinal in ordinals]
+        if name in self.names:
+            names = self.names[name]
+            return [names[value] for value in values]
+        return values
+
+
+def query_index_path(index_path):
+    """'.qidx' path for a segment's sidecar '.idx.json' path."""
+    return index_path[:-len(".idx.json")] + QIDX_SUFFIX
+
+def build_query_index(buffer, qidx_path):
+    """Builds and writes the query index for the uncompressed segment bytes in buffer."""
+    entries = []
+    for offset, record in iter_records(buffer):
+        ip = int_to_ip(record.src_ip)
+        hostname = record.hostname.decode('utf-8', errors='replace')
+        device = record.device.decode('utf-8', errors='replace')
+        site = record.site.decode('utf-8', errors='replace')
+        mnemonic = record.mnemonic.decode('utf-8', errors='replace')
+        repeat = decode_repeat(record.repeat)
+        weight = repeat[0] if repeat else 1
+        entries.append((record.received_at, offset, ip, hostname, device, site, mnemonic, record.severity, record.facility,
+                        weight))
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+    posted = {name: {} for name in POSTING_TABLES}
+    names = {name: {} for name in NAME_COLUMNS}  # value -> id
+    columns = {name: array.array(typecode) for name, typecode in COLUMNS}
+    for ordinal, (received_at, offset, ip, hostname, device, site, mnemonic, severity, facility, weight) in enumerate(entries):
+        posted['hosts'].setdefault(ip, []).append(ordinal)
+        for name in {hostname, device} - {"", ip}:
+            posted['hosts'].setdefault(name, []).append(ordinal)
+        if site:
+            posted['sites'].setdefault(site, []).append(ordinal)
+        if mnemonic:
+            posted['mnemonics'].setdefault(mnemonic, []).append(ordinal)
+        posted['severities'].setdefault(str(severity), []).append(ordinal)
+        for name, value in (('host', device or hostname or ip), ('source', ip), ('mnemonic', mnemonic), ('site', site)):
+            columns[name].append(names[name].setdefault(value, len(names[name])))
+        columns['severity'].append(severity)
+        columns['facility'].append(facility)
+        columns['weight'].append(min(weight, 0xFFFFFFFF))
+
+    postings = array.array('I')
+    tables = {name: {} for name in POSTING_TABLES}
+    for name in POSTING_TABLES:
+        for key, ordinals in posted[name].items():
+            tables[name][key] = [len(postings), len(ordinals)]
+            postings.extend(ordinals)
+
+    arrays = [array.array('d', (entry[0] for entry in entries)), array.array('Q', (entry[1] for entry in entries))]
+    arrays += [columns[name] for name, typecode in COLUMNS] + [postings]
+    if sys.byteorder == 'big':
+        for values in arrays:
+            values.byteswap()
+    header = dict(tables, count=len(entries), names={name: list(ids) for name, ids in names.items()})
+    header_json = json.dumps(header).encode()
+    tmp_path = f"{qidx_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(QIDX_HEADER.pack(QIDX_MAGIC, QIDX_VERSION, len(header_json)))
+        f.write(header_json)
+        for values in arrays:
+            f.write(values.tobytes())
+    os.replace(tmp_path, qidx_path)
+
+def load_query_index(qidx_path):
+    """Reads a '.qidx' file; returns None if it is missing or from another version."""
+    try:
+        with open(qidx_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < QIDX_HEADER.size:
+        return None
+    magic, version, json_length = QIDX_HEADER.unpack_from(data)
+    if magic != QIDX_MAGIC or version != QIDX_VERSION:
+        return None
+    position = QIDX_HEADER.size
+    header = json.loads(data[position:position + json_length])
+    position += json_length
+    count = header['count']
+    arrays = []
+    for typecode in ['d', 'Q'] + [typecode for name, typecode in COLUMNS]:
+        values = array.array(typecode)
+        values.frombytes(data[position:position + values.itemsize * count])
+        position += values.itemsize * count
+        arrays.append(values)
+    postings = array.array('I')
+    postings.frombytes(data[position:])
+    arrays.append(postings)
+    if sys.byteorder == 'big':
+        for values in arrays:
+            values.byteswap()
+    columns = {name: values for (name, typecode), values in zip(COLUMNS, arrays[2:])}
+    tables = {name: header[name] for name in POSTING_TABLES}
+    return QueryIndex(arrays[0], arrays[1], columns, header['names'], postings, tables)
@@ -0,0 +1,201 @@
+import csv
+import ipaddress
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from syslog_records import int_to_ip, ip_to_int
+
+# --- Inventory Settings ---
+INVENTORY_CHECK_INTERVAL = 5        # Seconds between checks for a changed inventory file
+# Column names accepted for each value: cisco_config's devices.csv, SolarWinds node
+# exports (Caption/IPAddress, or the Hostname alias used in the SWQL query) and the like
+HOSTNAME_COLUMNS = ('Hostname', 'Caption', 'SysName', 'NodeName', 'Name', 'hostname', 'name')
+IP_COLUMNS = ('IP Address', 'IPAddress', 'IP_Address', 'IP', 'ip', 'Subnet', 'subnet')
+SITE_COLUMNS = ('Site', 'site', 'Location', 'City', 'Building')
+# --- Reverse DNS Settings ---
+DNS_WORKERS = 4                     # Resolver threads; lookups never run on the receive or write path
+DNS_TTL = 3600                      # Seconds a resolved name is kept
+DNS_NEGATIVE_TTL = 300              # Seconds an address without a PTR record is not retried
+MAX_DNS_CACHE = 50000               # Addresses cached (names and inventory answers)
+
+
+def first_value(row, columns):
+    for column in columns:
+        value = row.get(column)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+def read_inventory_rows(path):
+    """Rows (dicts) from a CSV export or a SolarWinds JSON dump ({"results": [...]} or a plain list)."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('results', []) if isinstance(data, dict) else data
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+class Inventory:
+    """
+    Source IP -> (hostname, site) from a device inventory.
+    Rows whose address is a subnet ('10.20.0.0/16') give the site for any source in it
+    that is not listed on its own; the most specific subnet wins.
+    """
+    def __init__(self, rows=()):
+        self.devices = {}       # ip int -> (hostname bytes, site bytes)
+        self.prefixes = {}      # prefix length -> {network int: site bytes}
+        for row in rows:
+            self.add(first_value(row, IP_COLUMNS), first_value(row, HOSTNAME_COLUMNS), first_value(row, SITE_COLUMNS))
+        self.lengths = sorted(self.prefixes, reverse=True)
+
+    def add(self, address, hostname, site):
+        if not address:
+            return
+        if "/" in address:
+            try:
+                network = ipaddress.IPv4Network(address, strict=False)
+            except ValueError:
+                return
+            self.prefixes.setdefault(network.prefixlen, {})[int(network.network_address)] = site.encode()
+            return
+        ip = ip_to_int(address)
+        if ip:
+            self.devices[ip] = (hostname.encode(), site.encode())
+
+    def __len__(self):
+        return len(self.devices) + sum(len(networks) for networks in self.prefixes.values())
+
+    def site_for(self, ip):
+        for length in self.lengths:
+            mask = (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+            site = self.prefixes[length].get(ip & mask)
+            if site is not None:
+                return site
+        return b""
+
+    def lookup(self, ip):
+        """Returns (hostname, site) as bytes; either may be empty."""
+        hostname, site = self.devices.get(ip, (b"", b""))
+        return hostname, site or self.site_for(ip)
+
+    @classmethod
+    def load(cls, path):
+        return cls(read_inventory_rows(path))
+
+
+class ReverseResolver:
+    """
+    Cached reverse DNS on background threads. lookup() answers from the cache only and
+    queues a resolution for addresses it has not seen, so callers never wait on DNS.
+    """
+    def __init__(self, workers=DNS_WORKERS):
+        self.cache = {}         # ip int -> (name bytes, expires)
+        self.pending = set()
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.resolved = 0
+        self.failed = 0
+        for i in range(workers):
+            threading.Thread(target=self.run, name=f"syslog-dns-{i}", daemon=True).start()
+
+    def lookup(self, ip):
+        """Returns the cached name, or b"" while it is being resolved (or has no PTR record)."""
+        entry = self.cache.get(ip)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        with self.lock:
+            if ip not in self.pending and len(self.pending) < MAX_DNS_CACHE:
+                self.pending.add(ip)
+                self.requests.put(ip)
+        return entry[0] if entry else b""  # Expired names are used until refreshed
+
+    def run(self):
+        while True:
+            ip = self.requests.get()
+            try:
+                name = socket.gethostbyaddr(int_to_ip(ip))[0].encode()
+                ttl = DNS_TTL
+                self.resolved += 1
+            except (OSError, UnicodeError):
+                name, ttl = b"", DNS_NEGATIVE_TTL
+                self.failed += 1
+            with self.lock:
+                if len(self.cache) >= MAX_DNS_CACHE:
+                    self.cache.pop(next(iter(self.cache)))
+                self.cache[ip] = (name, time.time() + ttl)
+                self.pending.discard(ip)
+
+
+class Enricher(threading.Thread):
+    """
+    Fills the 'device' and 'site' fields of parsed records from the inventory file,
+    falling back to reverse DNS for the device name of unlisted sources. The file is
+    reloaded in this thread when it changes; lookups keep using the previous
+    inventory until the new one is loaded.
+    """
+    def __init__(self, path, reverse_dns=True):
+        super().__init__(name="syslog-inventory", daemon=True)
+        self.path = path
+        self.mtime = None
+        self.inventory = Inventory()
+        self.resolver = ReverseResolver() if reverse_dns else None
+        self.cache = {}         # ip int -> inventory (device, site)
+        self.stop_event = threading.Event()
+        self.reload()
+
+    def reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self.mtime:
+            return
+        try:
+            inventory = Inventory.load(self.path)
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"Could not load inventory {self.path}: {e}")
+            return
+        self.inventory, self.cache, self.mtime = inventory, {}, mtime
+        print(f"Loaded {len(inventory)} inventory entries from {self.path}")
+
+    def run(self):
+        while not self.stop_event.wait(INVENTORY_CHECK_INTERVAL):
+            self.reload()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def lookup(self, ip):
+        answer = self.cache.get(ip)
+        if answer is None:
+            if len(self.cache) >= MAX_DNS_CACHE:
+                self.cache.clear()
+            answer = self.cache[ip] = self.inventory.lookup(ip)
+        device, site = answer
+        if not device and self.resolver:
+            device = self.resolver.lookup(ip)
+        return device, site
+
+    def enrich(self, records):
+        enriched = []
+        for record in records:
+            device, site = self.lookup(record.src_ip)
+            enriched.append(record._replace(device=device, site=site) if device or site else record)
+        return enriched
+
+
+if __name__ == "__main__":
+    # Shows what each address resolves to, e.g. to check an inventory export
+    if len(sys.argv) < 3:
+        print("Usage: python syslog_inventory.py INVENTORY_FILE IP [IP ...]")
+        sys.exit(2)
+    inventory = Inventory.load(sys.argv[1])
+    print(f"{len(inventory)} entries")
+    for address in sys.argv[2:]:
+        hostname, site = inventory.lookup(ip_to_int(address))
+        print(f"{address:15} {hostname.decode() or '-'} {site.decode() or '-'}")
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# --- Metrics Settings ---
+RATE_WINDOW = 10            # Seconds over which per-source rates are averaged
+TOP_SOURCES = 50            # Sources listed in /metrics (all are in /metrics.json)
+PROC_NET_UDP = ("/proc/net/udp", "/proc/net/udp6")
+GAUGES = ("queue_depth", "queue_high_water", "queue_capacity", "uptime_seconds", "workers")
+GAUGE_SUFFIXES = ("_queued", "_spool_bytes", "_connected")   # Per-destination relay gauges
+
+
+def read_udp_drops(port):
+    """
+    Sums the kernel drop counters of every UDP socket bound to port, from /proc/net/udp.
+    This covers drops the socket option cannot report (e.g. before it was enabled) and
+    all SO_REUSEPORT workers at once. Returns None where /proc is not available.
+    """
+    total = None
+    for path in PROC_NET_UDP:
+        try:
+            with open(path) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            # sl local_address rem_address st tx:rx tr:tm retrnsmt uid timeout inode ref pointer drops
+            if len(fields) < 13:
+                continue
+            if int(fields[1].rsplit(":", 1)[1], 16) == port:
+                total = (total or 0) + int(fields[12])
+    return total
+
+
+class SourceRates:
+    """Per-source message rates over the last RATE_WINDOW seconds, from periodic count samples."""
+    def __init__(self, window=RATE_WINDOW):
+        self.samples = deque(maxlen=window + 1)
+        self.lock = threading.Lock()
+
+    def sample(self, counts):
+        """Records cumulative per-source counts; calls within a second of the last sample are ignored."""
+        now = time.time()
+        with self.lock:
+            if self.samples and now - self.samples[-1][0] < 1:
+                return
+            self.samples.append((now, dict(counts)))
+
+    def rates(self):
+        with self.lock:
+            if len(self.samples) < 2:
+                return {}
+            (start, first), (end, last) = self.samples[0], self.samples[-1]
+        interval = max(end - start, 1e-6)
+        return {source: (count - first.get(source, 0)) / interval for source, count in last.items()
+                if count != first.get(source, 0)}
+
+
+def render_prometheus(metrics, rates):
+    lines = []
+    for name, value in sorted(metrics.items()):
+        if value is None:
+            continue
+        kind = "gauge" if name in GAUGES or name.endswith(GAUGE_SUFFIXES) else "counter"
+        metric = f"syslog_{name}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.append(f"{metric} {value}")
+    if rates:
+        lines.append("# TYPE syslog_source_messages_per_second gauge")
+        for source, rate in sorted(rates.items(), key=lambda item: -item[1])[:TOP_SOURCES]:
+            lines.append(f'syslog_source_messages_per_second{{source="{source}"}} {rate:.3f}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer(threading.Thread):
+    """
+    Serves live counters over HTTP: Prometheus text on /metrics and JSON on /metrics.json.
+    collect() returns a flat dict of counters and gauges; rates, if given, is a SourceRates.
+    views maps further paths to functions that take the query parameters ({name: value})
+    and return JSON-serialisable data (e.g. '/top', see syslog_sketch).
+    """
+    def __init__(self, address, port, collect, rates=None, views=None):
+        super().__init__(name="syslog-metrics", daemon=True)
+        self.collect = collect
+        self.rates = rates
+        self.views = views or {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path in server.views:
+                    params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                    try:
+                        body = json.dumps(server.views[url.path](params)).encode()
+                    except (ValueError, OSError) as e:
+                        self.send_error(400, str(e))
+                        return
+                    content_type = "application/json"
+                elif url.path == "/metrics":
+                    body = render_prometheus(server.collect(), server.rates.rates() if server.rates else {}).encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif url.path == "/metrics.json":
+                    rates = server.rates.rates() if server.rates else {}
+                    body = json.dumps(dict(server.collect(), source_rates=rates), indent=2).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes off the console
+
+        self.httpd = ThreadingHTTPServer((address, port), Handler)
+        self.httpd.daemon_threads = True
+
+    def run(self):
+        self.httpd.serve_forever(poll_interval=0.5)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,110 @@
+import calendar
+import re
+import time
+from syslog_records import SyslogRecord, UNKNOWN, ip_to_int
+
+# All patterns work on raw bytes; only matched slices are ever converted.
+PRI_PATTERN = re.compile(rb"<(\d{1,3})>")
+# RFC 5424: VERSION SP TIMESTAMP SP HOSTNAME SP APP-NAME SP PROCID SP MSGID SP
+RFC5424_PATTERN = re.compile(rb"1 (\S+) (\S+) (\S+) (\S+) (\S+) ")
+RFC5424_TIME_PATTERN = re.compile(rb"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})?")
+# RFC 3164 / Cisco: 'Mmm dd hh:mm:ss[.mmm]', optionally prefixed by '*' (clock not set) or '.' (not in sync)
+RFC3164_TIME_PATTERN = re.compile(rb"[*.]?([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?")
+# Cisco '%FACILITY-SEVERITY-MNEMONIC'
+MNEMONIC_PATTERN = re.compile(rb"%([A-Z][A-Z0-9_]*-[0-7]-[A-Z0-9_]+)")
+TIME_SEARCH_WINDOW = 96  # Timestamps sit near the start of the message
+
+MONTHS = {name.encode(): number for number, name in enumerate(calendar.month_abbr) if name}
+
+
+def parse_rfc3164_time(match, received_at):
+    """Converts a 'Mmm dd hh:mm:ss' match to epoch seconds, inferring the year (UTC)."""
+    month = MONTHS.get(match.group(1))
+    if month is None:
+        return 0.0
+    year = time.gmtime(received_at).tm_year
+    fraction = float(b"0." + match.group(6)) if match.group(6) else 0.0
+    try:
+        stamp = calendar.timegm((year, month, int(match.group(2)), int(match.group(3)),
+                                 int(match.group(4)), int(match.group(5)), 0, 0, 0))
+    except ValueError:
+        return 0.0
+    if stamp - received_at > 86400:
+        # A December message received in January belongs to last year
+        stamp = calendar.timegm((year - 1, month, int(match.group(2)), int(match.group(3)),
+                                 int(match.group(4)), int(match.group(5)), 0, 0, 0))
+    return stamp + fraction
+
+def parse_rfc5424_time(value):
+    match = RFC5424_TIME_PATTERN.match(value)
+    if not match:
+        return 0.0
+    stamp = calendar.timegm(tuple(int(match.group(i)) for i in range(1, 7)) + (0, 0, 0))
+    if match.group(7):
+        stamp += float(b"0." + match.group(7))
+    offset = match.group(8)
+    if offset and offset != b"Z":
+        sign = 1 if offset[:1] == b"+" else -1
+        stamp -= sign * (int(offset[1:3]) * 3600 + int(offset[4:6]) * 60)
+    return stamp
+
+
+def parse_message(data, addr, received_at):
+    """
+    Parses one raw syslog datagram into a SyslogRecord.
+
+    Handles RFC 5424, RFC 3164 and the Cisco IOS variants ('seq: host: *Mmm dd ...: %FAC-SEV-MNEMONIC:').
+    Unparseable parts are left empty rather than rejected.
+
+    Args:
+        data (bytes): The raw message.
+        addr (tuple): (ip, port) of the sender.
+        received_at (float): Receive time in epoch seconds.
+    """
+    facility = severity = UNKNOWN
+    body = data
+    pri = PRI_PATTERN.match(data)
+    if pri:
+        value = int(pri.group(1))
+        if value <= 191:
+            facility, severity = value >> 3, value & 7
+        body = data[pri.end():]
+
+    hostname = b""
+    app_name = b""
+    device_time = 0.0
+
+    rfc5424 = RFC5424_PATTERN.match(body)
+    if rfc5424:
+        device_time = parse_rfc5424_time(rfc5424.group(1))
+        hostname = b"" if rfc5424.group(2) == b"-" else rfc5424.group(2)
+        app_name = b"" if rfc5424.group(3) == b"-" else rfc5424.group(3)
+    else:
+        stamp = RFC3164_TIME_PATTERN.search(body, 0, TIME_SEARCH_WINDOW)
+        if stamp:
+            device_time = parse_rfc3164_time(stamp, received_at)
+            # Cisco 'logging origin-id hostname' puts 'host:' before the timestamp
+            for token in body[:stamp.start()].split(b":"):
+                token = token.strip()
+                if token and not token.isdigit():
+                    hostname = token
+            rest = body[stamp.end():].split(None, 2)
+            # RFC 3164 puts 'HOST TAG:' after the timestamp; Cisco puts a timezone or ':'
+            if not hostname and rest and not rest[0].endswith(b":") and not rest[0].startswith(b"%"):
+                hostname = rest[0]
+                if len(rest) > 1 and rest[1].endswith(b":") and not rest[1].startswith(b"%"):
+                    app_name = rest[1].rstrip(b":").split(b"[")[0]
+
+    mnemonic = MNEMONIC_PATTERN.search(body)
+    return SyslogRecord(
+        received_at=received_at,
+        device_time=device_time,
+        src_ip=ip_to_int(addr[0]),
+        src_port=addr[1],
+        facility=facility,
+        severity=severity,
+        hostname=hostname,
+        mnemonic=mnemonic.group(1) if mnemonic else b"",
+        app_name=app_name,
+        message=body.rstrip(b"\r\n\x00"),
+    )
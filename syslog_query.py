@@ -0,0 +1,425 @@
+import argparse
+import fnmatch
+import heapq
+import ipaddress
+import os
+import re
+import sys
+import time
+from collections import Counter
+from itertools import groupby
+from syslog_index import build_query_index, load_query_index
+from syslog_records import HEADER, SEVERITY_NAMES, decode_header, decode_record, decode_repeat, int_to_ip, iter_records
+from syslog_store import active_segments, list_segments, read_segment_bytes
+
+# --- Query Settings ---
+DEFAULT_STORE_DIR = "syslog_store"
+FOLLOW_INTERVAL = 1.0       # Seconds between checks for new records in --follow mode
+DEFAULT_TOP = 10
+FACILITY_NAMES = ('kern', 'user', 'mail', 'daemon', 'auth', 'syslog', 'lpr', 'news', 'uucp', 'cron',
+                  'authpriv', 'ftp', 'ntp', 'security', 'console', 'solaris-cron') + tuple(f"local{i}" for i in range(8))
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d")
+RELATIVE_TIME_PATTERN = re.compile(r"^(\d+)([smhdw])$")
+RELATIVE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_time_arg(value):
+    """Accepts 'now', a relative age ('15m', '2h', '7d') or a local 'YYYY-MM-DD[ HH:MM[:SS]]'."""
+    if value == "now":
+        return time.time()
+    relative = RELATIVE_TIME_PATTERN.match(value)
+    if relative:
+        return time.time() - int(relative.group(1)) * RELATIVE_UNITS[relative.group(2)]
+    for fmt in TIME_FORMATS:
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"unrecognised time '{value}'")
+
+def parse_name_or_number(value, names):
+    if value.isdigit():
+        return int(value)
+    try:
+        return names.index(value.lower())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or one of {', '.join(names)}")
+
+def host_matches(pattern, value):
+    """Matches a source IP or hostname against an exact name, a glob ('core-*') or a CIDR ('10.1.0.0/16')."""
+    if "/" in pattern:
+        try:
+            return ipaddress.ip_address(value) in ipaddress.ip_network(pattern, strict=False)
+        except ValueError:
+            return False
+    if any(c in pattern for c in "*?["):
+        return fnmatch.fnmatchcase(value.lower(), pattern.lower())
+    return value.lower() == pattern.lower()
+
+def mnemonic_matches(pattern, value):
+    """'LINK-3-UPDOWN' exact, 'LINEPROTO-*' glob, or a bare Cisco facility such as 'SYS'."""
+    pattern = pattern.lstrip("%").upper()
+    if "-" not in pattern and not any(c in pattern for c in "*?["):
+        pattern += "-*"
+    return fnmatch.fnmatchcase(value.upper(), pattern)
+
+
+class Query:
+    """Record filters; everything except free text is answered from the persisted indexes."""
+    def __init__(self, start=None, end=None, hosts=(), mnemonics=(), max_severity=None, facilities=(),
+                 text=None, ignore_case=False, sites=()):
+        self.start = start
+        self.end = end
+        self.hosts = list(hosts)
+        self.sites = list(sites)
+        self.mnemonics = list(mnemonics)
+        self.max_severity = max_severity
+        self.facilities = set(facilities)
+        self.text = None
+        if text:
+            self.text = re.compile(re.escape(text.encode()), re.IGNORECASE if ignore_case else 0)
+        # The same host, site and mnemonic keys recur in every segment; match each one once
+        self.host_cache = {}
+        self.site_cache = {}
+        self.mnemonic_cache = {}
+
+    def needs_scan(self):
+        """True if record bytes must be read, i.e. the indexes alone cannot answer the query."""
+        return self.text is not None
+
+    def host_keys(self, keys):
+        matched = []
+        for key in keys:
+            if key not in self.host_cache:
+                self.host_cache[key] = any(host_matches(pattern, key) for pattern in self.hosts)
+            if self.host_cache[key]:
+                matched.append(key)
+        return matched
+
+    def site_keys(self, keys):
+        matched = []
+        for key in keys:
+            if key not in self.site_cache:
+                self.site_cache[key] = any(fnmatch.fnmatchcase(key.lower(), pattern.lower()) for pattern in self.sites)
+            if self.site_cache[key]:
+                matched.append(key)
+        return matched
+
+    def mnemonic_keys(self, keys):
+        matched = []
+        for key in keys:
+            if key not in self.mnemonic_cache:
+                self.mnemonic_cache[key] = any(mnemonic_matches(pattern, key) for pattern in self.mnemonics)
+            if self.mnemonic_cache[key]:
+                matched.append(key)
+        return matched
+
+    def match_header(self, header):
+        if self.start is not None and header.received_at < self.start:
+            return False
+        if self.end is not None and header.received_at >= self.end:
+            return False
+        if self.max_severity is not None and header.severity > self.max_severity:
+            return False
+        if self.facilities and header.facility not in self.facilities:
+            return False
+        return True
+
+    def match_record(self, record, indexed=False):
+        """Checks the filters the header cannot; with indexed, only the free text is left to check."""
+        if not indexed:
+            if self.hosts:
+                names = [int_to_ip(record.src_ip)]
+                for name in (record.hostname, record.device):
+                    if name:
+                        names.append(name.decode('utf-8', errors='replace'))
+                if not self.host_keys(names):
+                    return False
+            if self.sites and not (record.site and self.site_keys([record.site.decode('utf-8', errors='replace')])):
+                return False
+            if self.mnemonics and not (record.mnemonic and self.mnemonic_keys([record.mnemonic.decode('utf-8', errors='replace')])):
+                return False
+        if self.text and not self.text.search(record.message):
+            return False
+        return True
+
+    def segment_may_match(self, index):
+        """Prunes closed segments on their sidecar time range, hosts, sites and severities."""
+        if self.start is not None and index['last'] < self.start:
+            return False
+        if self.end is not None and index['first'] >= self.end:
+            return False
+        if self.hosts and not self.host_keys(index['hosts']):
+            return False
+        if self.sites and not self.site_keys(index.get('sites', [])):
+            return False
+        if self.max_severity is not None and not any(int(sev) <= self.max_severity for sev in index['severities']):
+            return False
+        return True
+
+
+def select_ordinals(qidx, query):
+    """Record ordinals (time-sorted) that satisfy every filter except free text."""
+    lo, hi = qidx.time_range(query.start, query.end)
+    candidates = []
+    if query.hosts:
+        candidates.append(qidx.ordinals_for(query.host_keys(qidx.hosts), qidx.hosts, lo, hi))
+    if query.sites:
+        candidates.append(qidx.ordinals_for(query.site_keys(qidx.sites), qidx.sites, lo, hi))
+    if query.mnemonics:
+        candidates.append(qidx.ordinals_for(query.mnemonic_keys(qidx.mnemonics), qidx.mnemonics, lo, hi))
+    if query.max_severity is not None:
+        keys = [key for key in qidx.severities if int(key) <= query.max_severity]
+        if len(keys) < len(qidx.severities):
+            candidates.append(qidx.ordinals_for(keys, qidx.severities, lo, hi))
+    if not candidates:
+        ordinals = range(lo, hi)
+    else:
+        # Intersect starting from the smallest posting list
+        candidates.sort(key=len)
+        ordinals = candidates[0]
+        for other in candidates[1:]:
+            other = set(other)
+            ordinals = [ordinal for ordinal in ordinals if ordinal in other]
+    if query.facilities:
+        facility = qidx.columns['facility']
+        ordinals = [ordinal for ordinal in ordinals if facility[ordinal] in query.facilities]
+    return ordinals
+
+def scan_buffer(buffer, query):
+    """Linear scan for segments without a query index; returns matches in receive-time order."""
+    matches = [record for offset, record in iter_records(buffer, query.match_header) if query.match_record(record)]
+    matches.sort(key=lambda record: record.received_at)
+    return matches
+
+def read_closed_segment(index):
+    try:
+        return read_segment_bytes(index['file'])
+    except FileNotFoundError:
+        return read_segment_bytes(index['file'] + ".gz")  # Compressed since it was listed
+
+def load_or_build_index(index, buffer=None):
+    """Loads a closed segment's query index, building (and saving) it for segments that predate indexing."""
+    qidx = load_query_index(index['query_index_path'])
+    if qidx is None:
+        if buffer is None:
+            buffer = read_closed_segment(index)
+        try:
+            build_query_index(buffer, index['query_index_path'])
+        except OSError:
+            return None, buffer  # Read-only store; fall back to a scan
+        qidx = load_query_index(index['query_index_path'])
+    return qidx, buffer
+
+def query_closed_segment(index, query):
+    """Yields the matching records of one closed segment in receive-time order."""
+    qidx, buffer = load_or_build_index(index)
+    if qidx is None:
+        yield from scan_buffer(buffer, query)
+        return
+    ordinals = select_ordinals(qidx, query)
+    if not ordinals:
+        return
+    if buffer is None:
+        buffer = read_closed_segment(index)
+    if query.text and not query.text.search(buffer):
+        return  # Cheap whole-segment check before decoding anything
+    for ordinal in ordinals:
+        record = decode_record(buffer, qidx.offsets[ordinal])
+        if query.match_record(record, indexed=True):
+            yield record
+
+def read_active_segment(path, query, position=0):
+    """
+    Reads records appended to a segment still being written, from byte position on.
+    Returns (matching records sorted by receive time, position after the last complete record).
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(position)
+            buffer = f.read()
+    except FileNotFoundError:
+        # Closed and compressed since it was listed; read the rest from the archive
+        try:
+            buffer = read_segment_bytes(path + ".gz")[position:]
+        except OSError:
+            return [], position
+    matches = []
+    offset = 0
+    while offset + HEADER.size <= len(buffer):
+        header = decode_header(buffer, offset)
+        if header.length < HEADER.size or offset + header.length > len(buffer):
+            break  # Record still being written
+        if query.match_header(header):
+            record = decode_record(buffer, offset)
+            if query.match_record(record):
+                matches.append(record)
+        offset += header.length
+    matches.sort(key=lambda record: record.received_at)
+    return matches, position + offset
+
+
+def closed_segments(store_dir, query):
+    return [index for index in list_segments(store_dir, recursive=True) if query.segment_may_match(index)]
+
+def run_query(store_dir, query, positions=None):
+    """
+    Yields matching records from the whole store in receive-time order.
+    Segments covering the same window (one per worker process) are merged.
+    positions, if given, is filled with the bytes read from each active segment for --follow.
+    """
+    segments = closed_segments(store_dir, query)
+    for start, group in groupby(segments, key=lambda index: index['start']):
+        yield from heapq.merge(*(query_closed_segment(index, query) for index in group),
+                               key=lambda record: record.received_at)
+    active = []
+    for path in active_segments(store_dir, recursive=True):
+        matches, position = read_active_segment(path, query)
+        active.append(matches)
+        if positions is not None:
+            positions[path] = position
+    yield from heapq.merge(*active, key=lambda record: record.received_at)
+
+def indexed_values(store_dir, query, field):
+    """
+    Yields, per segment, (field values, weights) of matching records: from the index
+    columns when no free text is given, otherwise from the decoded records. A record's
+    weight is the number of messages it stands for (see record_weight).
+    """
+    for index in closed_segments(store_dir, query):
+        qidx, buffer = load_or_build_index(index)
+        if qidx is None:
+            records = scan_buffer(buffer, query)
+        elif query.needs_scan():
+            records = list(query_closed_segment(index, query))
+        else:
+            ordinals = select_ordinals(qidx, query)
+            values = qidx.column_values(field, ordinals) if field else None
+            if field == "severity":
+                values = [severity_name(value) for value in values]
+            yield values, qidx.column_values('weight', ordinals)
+            continue
+        yield [record_value(record, field) for record in records] if field else None, [record_weight(record) for record in records]
+    for path in active_segments(store_dir, recursive=True):
+        records = read_active_segment(path, query)[0]
+        yield [record_value(record, field) for record in records] if field else None, [record_weight(record) for record in records]
+
+def count_matches(store_dir, query):
+    """Messages matching the query, counting each suppressed duplicate."""
+    return sum(sum(weights) for values, weights in indexed_values(store_dir, query, None))
+
+def top_values(store_dir, query, field, limit=DEFAULT_TOP):
+    """Most frequent host, source, site, mnemonic or severity among matching messages."""
+    counts = Counter()
+    for values, weights in indexed_values(store_dir, query, field):
+        for value, weight in zip(values, weights):
+            counts[value] += weight
+    counts.pop("", None)
+    counts.pop("-", None)
+    return counts.most_common(limit)
+
+def record_weight(record):
+    """1, or for a duplicate-suppression summary the number of copies it replaced."""
+    repeat = decode_repeat(record.repeat)
+    return repeat[0] if repeat else 1
+
+def severity_name(severity):
+    return SEVERITY_NAMES[severity] if severity < len(SEVERITY_NAMES) else "-"
+
+def record_value(record, field):
+    if field == "host":
+        return (record.device or record.hostname).decode('utf-8', errors='replace') or int_to_ip(record.src_ip)
+    if field == "source":
+        return int_to_ip(record.src_ip)
+    if field == "site":
+        return record.site.decode('utf-8', errors='replace')
+    if field == "mnemonic":
+        return record.mnemonic.decode('utf-8', errors='replace')
+    return severity_name(record.severity)
+
+def format_record(record):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.received_at))
+    hostname = (record.device or record.hostname).decode('utf-8', errors='replace') or "-"
+    if record.site:
+        hostname += f" [{record.site.decode('utf-8', errors='replace')}]"
+    message = record.message.decode('utf-8', errors='replace')
+    repeat = decode_repeat(record.repeat)
+    if repeat:
+        count, first, last = repeat
+        message += (f" [repeated {count} times between {time.strftime('%H:%M:%S', time.localtime(first))}"
+                    f" and {time.strftime('%H:%M:%S', time.localtime(last))}]")
+    return f"{stamp} {int_to_ip(record.src_ip):15} {hostname} {severity_name(record.severity):7} {message}"
+
+def segment_record_path(index):
+    path = index['file']
+    return path[:-len(".gz")] if path.endswith(".gz") else path
+
+def follow(store_dir, query, positions):
+    """Prints matching records as they are appended to the active segments."""
+    # Segments already covered by the history output (or being tailed)
+    seen = set(positions) | {segment_record_path(index) for index in list_segments(store_dir, recursive=True)}
+    while True:
+        time.sleep(FOLLOW_INTERVAL)
+        paths = set(active_segments(store_dir, recursive=True)) | set(positions)
+        for path in sorted(paths):
+            seen.add(path)
+            matches, positions[path] = read_active_segment(path, query, positions.get(path, 0))
+            for record in matches:
+                print(format_record(record), flush=True)
+            if not os.path.exists(path):
+                del positions[path]
+        # Segments opened and closed between two polls
+        for index in list_segments(store_dir, recursive=True):
+            if segment_record_path(index) not in seen:
+                seen.add(segment_record_path(index))
+                for record in scan_buffer(read_closed_segment(index), query):
+                    print(format_record(record), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the syslog store written by Syslog_Server.")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="Store directory (default: %(default)s)")
+    parser.add_argument("--since", type=parse_time_arg, help="Start time: '2h', '7d' or 'YYYY-MM-DD[ HH:MM[:SS]]'")
+    parser.add_argument("--until", type=parse_time_arg, help="End time (exclusive), same formats as --since")
+    parser.add_argument("--host", action="append", default=[], help="Source IP, hostname, glob or CIDR (repeatable)")
+    parser.add_argument("--site", action="append", default=[], help="Inventory site name or glob (repeatable)")
+    parser.add_argument("--mnemonic", action="append", default=[], help="Cisco mnemonic or facility, e.g. LINK-3-UPDOWN, 'OSPF-*', SYS")
+    parser.add_argument("--severity", type=lambda v: parse_name_or_number(v, SEVERITY_NAMES), help="Maximum severity (0-7 or name)")
+    parser.add_argument("--facility", action="append", default=[], type=lambda v: parse_name_or_number(v, FACILITY_NAMES),
+                        help="Syslog facility (number or name such as local7; repeatable)")
+    parser.add_argument("--text", help="Free text the message must contain")
+    parser.add_argument("-i", "--ignore-case", action="store_true", help="Case-insensitive --text")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--count", action="store_true", help="Print only the number of matching records")
+    mode.add_argument("--top", choices=("host", "source", "site", "mnemonic", "severity"), help="Most frequent values")
+    mode.add_argument("--follow", action="store_true", help="Keep printing new matching records")
+    parser.add_argument("--limit", type=int, help="Maximum records (or --top rows) to print")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store directory '{args.store}' not found")
+        sys.exit(2)
+    query = Query(args.since, args.until, args.host, args.mnemonic, args.severity, args.facility, args.text,
+                  args.ignore_case, args.site)
+    try:
+        if args.count:
+            print(count_matches(args.store, query))
+        elif args.top:
+            for value, count in top_values(args.store, query, args.top, args.limit or DEFAULT_TOP):
+                print(f"{count:10} {value}")
+        else:
+            positions = {}
+            for shown, record in enumerate(run_query(args.store, query, positions)):
+                if args.limit is not None and shown >= args.limit:
+                    break
+                print(format_record(record))
+            if args.follow:
+                query.end = None
+                for path in active_segments(args.store, recursive=True):
+                    if path not in positions:  # History stopped early (--limit)
+                        positions[path] = read_active_segment(path, query)[1]
+                follow(args.store, query, positions)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        sys.stderr.close()  # Output piped into head etc.
@@ -0,0 +1,111 @@
+import socket
+import struct
+from collections import namedtuple
+
+# --- Binary Record Format ---
+# Each record is a fixed little-endian header followed by length-prefixed byte fields:
+#   total_length u32 | received_at f64 | device_time f64 | src_ip u32 | src_port u16 |
+#   facility u8 | severity u8 | field_count u8 | (length u16 + bytes) * field_count
+# The header alone is enough to filter on time, source, facility and severity, so
+# queries can skip records without touching the message bytes.
+HEADER = struct.Struct('<IddIHBBB')
+FIELD_LENGTH = struct.Struct('<H')
+MAX_FIELD_LENGTH = 0xFFFF
+UNKNOWN = 255  # facility/severity when the message has no PRI
+
+# Variable-length fields in on-disk order. New fields are only ever appended,
+# so older records (with fewer fields) still decode.
+FIELD_NAMES = ('hostname', 'mnemonic', 'app_name', 'message', 'repeat', 'device', 'site')
+# 'repeat' is empty for ordinary records; duplicate-suppression summaries (see
+# syslog_dedup) carry the number of suppressed copies and their first/last receive times.
+# 'hostname' is what the message itself claims; 'device' and 'site' are filled in at
+# ingest from the device inventory or reverse DNS (see syslog_inventory).
+REPEAT = struct.Struct('<Idd')
+
+SyslogRecord = namedtuple('SyslogRecord', [
+    'received_at', 'device_time', 'src_ip', 'src_port', 'facility', 'severity',
+] + list(FIELD_NAMES))
+SyslogRecord.__new__.__defaults__ = (b'',) * len(FIELD_NAMES)
+
+RecordHeader = namedtuple('RecordHeader', [
+    'length', 'received_at', 'device_time', 'src_ip', 'src_port', 'facility', 'severity', 'field_count',
+])
+
+SEVERITY_NAMES = ('emerg', 'alert', 'crit', 'err', 'warning', 'notice', 'info', 'debug')
+
+
+def ip_to_int(ip):
+    try:
+        return struct.unpack('!I', socket.inet_aton(ip))[0]
+    except OSError:
+        return 0
+
+def int_to_ip(value):
+    return socket.inet_ntoa(struct.pack('!I', value))
+
+
+def encode_repeat(count, first, last):
+    return REPEAT.pack(count, first, last)
+
+def decode_repeat(value):
+    """Returns (count, first, last) from a record's 'repeat' field, or None for ordinary records."""
+    if len(value) < REPEAT.size:
+        return None
+    return REPEAT.unpack_from(value)
+
+
+def encode_record(record):
+    """Packs a SyslogRecord into its binary form."""
+    fields = []
+    for name in FIELD_NAMES:
+        value = getattr(record, name)
+        if isinstance(value, str):
+            value = value.encode('utf-8', errors='replace')
+        value = value[:MAX_FIELD_LENGTH]
+        fields.append(FIELD_LENGTH.pack(len(value)))
+        fields.append(value)
+    body = b"".join(fields)
+    header = HEADER.pack(HEADER.size + len(body), record.received_at, record.device_time,
+                         record.src_ip, record.src_port, record.facility, record.severity, len(FIELD_NAMES))
+    return header + body
+
+def decode_header(buffer, offset=0):
+    """Unpacks only the fixed header of the record starting at offset."""
+    return RecordHeader(*HEADER.unpack_from(buffer, offset))
+
+def decode_record(buffer, offset=0):
+    """Unpacks the full record starting at offset."""
+    header = decode_header(buffer, offset)
+    position = offset + HEADER.size
+    fields = []
+    for _ in range(header.field_count):
+        (length,) = FIELD_LENGTH.unpack_from(buffer, position)
+        position += FIELD_LENGTH.size
+        fields.append(bytes(buffer[position:position + length]))
+        position += length
+    # Ignore fields this version does not know about; default the ones it lacks
+    fields = fields[:len(FIELD_NAMES)]
+    return SyslogRecord(header.received_at, header.device_time, header.src_ip, header.src_port,
+                        header.facility, header.severity, *fields)
+
+def iter_records(buffer, header_filter=None):
+    """
+    Yields (offset, record) for every record in buffer.
+    header_filter(RecordHeader) -> bool skips records before their fields are decoded.
+    """
+    offset = 0
+    end = len(buffer)
+    while offset + HEADER.size <= end:
+        header = decode_header(buffer, offset)
+        if header.length < HEADER.size or offset + header.length > end:
+            break  # Truncated tail (e.g. a record still being written)
+        if header_filter is None or header_filter(header):
+            yield offset, decode_record(buffer, offset)
+        offset += header.length
+
+def read_record_file(path, header_filter=None):
+    """Reads a whole record file and yields its records."""
+    with open(path, 'rb') as f:
+        buffer = f.read()
+    for offset, record in iter_records(buffer, header_filter):
+        yield record
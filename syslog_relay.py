@@ -0,0 +1,345 @@
+import glob
+import os
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+from syslog_parser import PRI_PATTERN, RFC5424_PATTERN, RFC3164_TIME_PATTERN, TIME_SEARCH_WINDOW
+from syslog_records import ip_to_int
+
+# --- Relay Settings ---
+RELAY_BATCH_SIZE = 500                  # Messages per send
+RELAY_BATCH_BYTES = 256 * 1024          # ...or bytes per send, whichever comes first
+RELAY_FLUSH_INTERVAL = 0.5              # Seconds a partial batch may wait
+RELAY_CONNECT_TIMEOUT = 5
+RELAY_SEND_TIMEOUT = 10
+RELAY_RETRY_INTERVAL = 5                # Seconds between reconnect attempts while a destination is down
+RELAY_MAX_QUEUED = 100000               # Messages held in memory per destination; beyond this they are dropped
+RELAY_SPOOL_DIR = "relay_spool"
+RELAY_SPOOL_FILE_BYTES = 16 * 1024 * 1024
+RELAY_MAX_SPOOL_BYTES = 1024 ** 3       # Oldest spool files are deleted above this (per destination)
+RELAY_ADD_ORIGIN = True                 # Name the source device in messages sent without a hostname
+
+
+def frame(message, framing="octet"):
+    """RFC 6587 framing for one message."""
+    if framing == "octet":
+        return str(len(message)).encode() + b" " + message
+    return message.rstrip(b"\n") + b"\n"
+
+def complete_frames(buffer, framing="octet"):
+    """Returns (end, count): the offset just past the last complete frame in buffer, and the frames before it."""
+    if framing != "octet":
+        end = buffer.rfind(b"\n") + 1
+        return end, buffer.count(b"\n", 0, end)
+    position = count = 0
+    while True:
+        space = buffer.find(b" ", position, position + 10)
+        if space < 0:
+            return position, count
+        end = space + 1 + int(buffer[position:space])
+        if end > len(buffer):
+            return position, count
+        position = end
+        count += 1
+
+def add_origin(data, name, received_at):
+    """
+    Returns data with name as its HOSTNAME if the message carries none, so the
+    downstream collector does not attribute it to the relay. RFC 5424 '-' is replaced;
+    Cisco/RFC 3164 messages get 'name: ' in front of the timestamp, as with
+    'logging origin-id', or an RFC 3164 timestamp and hostname if they have no timestamp.
+    """
+    pri = PRI_PATTERN.match(data)
+    start = pri.end() if pri else 0
+    body = data[start:]
+    rfc5424 = RFC5424_PATTERN.match(body)
+    if rfc5424:
+        if rfc5424.group(2) != b"-":
+            return data
+        return data[:start + rfc5424.start(2)] + name + body[rfc5424.end(2):]
+    stamp = RFC3164_TIME_PATTERN.search(body, 0, TIME_SEARCH_WINDOW)
+    if stamp is None:
+        now = time.gmtime(received_at)
+        header = f"{time.strftime('%b', now)} {now.tm_mday:2d} {time.strftime('%H:%M:%S', now)} ".encode()
+        return data[:start] + header + name + b" " + body
+    # The same checks syslog_parser uses to find the hostname
+    for token in body[:stamp.start()].split(b":"):
+        token = token.strip()
+        if token and not token.isdigit():
+            return data
+    rest = body[stamp.end():].split(None, 1)
+    if rest and not rest[0].endswith(b":") and not rest[0].startswith(b"%"):
+        return data
+    return data[:start + stamp.start()] + name + b": " + body[stamp.start():]
+
+
+class DiskSpool:
+    """
+    Append-only spool of framed messages for a destination that is down.
+    Files are replayed oldest first; the read position of the file being replayed is
+    saved after every send, so a restart resumes where it stopped.
+    """
+    def __init__(self, directory, framing="octet"):
+        self.directory = directory
+        self.framing = framing
+        os.makedirs(directory, exist_ok=True)
+        self.write_file = None
+        self.write_path = None
+        self.dropped_bytes = 0
+        files = self.files()
+        self.next_sequence = int(os.path.basename(files[-1]).split(".")[0]) + 1 if files else 0
+
+    def files(self):
+        return sorted(glob.glob(os.path.join(self.directory, "*.spool")))
+
+    def size(self):
+        return sum(os.path.getsize(path) for path in self.files())
+
+    def append(self, frames):
+        if self.write_file is None or self.write_file.tell() >= RELAY_SPOOL_FILE_BYTES:
+            self.close_writer()
+            self.write_path = os.path.join(self.directory, f"{self.next_sequence:012d}.spool")
+            self.next_sequence += 1
+            self.write_file = open(self.write_path, 'ab')
+        self.write_file.write(b"".join(frames))
+        self.write_file.flush()
+        self.enforce_limit()
+
+    def close_writer(self):
+        if self.write_file:
+            self.write_file.close()
+        self.write_file = self.write_path = None
+
+    def enforce_limit(self):
+        files = self.files()
+        total = sum(os.path.getsize(path) for path in files)
+        while total > RELAY_MAX_SPOOL_BYTES and len(files) > 1:
+            oldest = files.pop(0)
+            size = os.path.getsize(oldest)
+            if oldest == self.write_path:
+                self.close_writer()
+            for path in (oldest, oldest + ".pos"):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
+            self.dropped_bytes += size
+            print(f"Relay spool {self.directory} over limit; discarded {os.path.basename(oldest)}")
+
+    def read_chunk(self, max_bytes=RELAY_BATCH_BYTES):
+        """Returns (path, end, data, count) for the next unsent frames, or None if the spool is empty."""
+        files = self.files()
+        if not files:
+            return None
+        path = files[0]
+        if path == self.write_path:
+            self.close_writer()  # Replay the file being written; new frames go to a new one
+        start = self.load_position(path)
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(max_bytes)
+        end, count = complete_frames(data, self.framing)
+        if end == 0 and len(data) == max_bytes:
+            end, count = len(data), 0  # Part of a single frame larger than a chunk
+        return path, start + end, data[:end], count
+
+    def advance(self, path, end):
+        """Marks frames up to end as sent; deletes the file once fully replayed."""
+        if end >= os.path.getsize(path):
+            for done in (path, path + ".pos"):
+                if os.path.exists(done):
+                    os.remove(done)
+            return
+        with open(path + ".pos", 'w') as f:
+            f.write(str(end))
+
+    def load_position(self, path):
+        try:
+            with open(path + ".pos") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+
+class RelaySender(threading.Thread):
+    """
+    Forwards raw messages to one downstream collector over a persistent TCP (or TLS)
+    connection, in batches. submit() only appends to an in-memory queue, so the receive
+    loop never waits on the network. While the destination is down, queued messages
+    are spooled to disk; once it is back the spool is replayed in order before any
+    newer messages are sent.
+    """
+    def __init__(self, name, host, port, tls=False, cafile=None, framing="octet", spool_dir=RELAY_SPOOL_DIR):
+        super().__init__(name=f"syslog-relay-{name}", daemon=True)
+        self.destination = name
+        self.host = host
+        self.port = port
+        self.tls = tls or bool(cafile)
+        self.cafile = cafile
+        self.framing = framing
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+        self.spool = DiskSpool(os.path.join(spool_dir, name), framing)
+        self.sock = None
+        self.counters = {'sent': 0, 'spooled': 0, 'replayed': 0, 'dropped': 0, 'connects': 0}
+        self.down = False  # Last connection attempt failed; reported once until it recovers
+
+    def submit(self, messages):
+        """Queues raw messages (bytes); never blocks."""
+        with self.lock:
+            room = RELAY_MAX_QUEUED - len(self.queue)
+            if len(messages) > room:
+                self.counters['dropped'] += len(messages) - max(room, 0)
+                messages = messages[:max(room, 0)]
+            self.queue.extend(messages)
+            if len(self.queue) >= RELAY_BATCH_SIZE:
+                self.wakeup.set()
+
+    def take_batch(self):
+        frames = []
+        size = 0
+        with self.lock:
+            while self.queue and len(frames) < RELAY_BATCH_SIZE and size < RELAY_BATCH_BYTES:
+                frames.append(frame(self.queue.popleft(), self.framing))
+                size += len(frames[-1])
+        return frames
+
+    def connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=RELAY_CONNECT_TIMEOUT)
+        if self.tls:
+            context = ssl.create_default_context(cafile=self.cafile)
+            sock = context.wrap_socket(sock, server_hostname=self.host)
+        sock.settimeout(RELAY_SEND_TIMEOUT)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.sock = sock
+        self.counters['connects'] += 1
+        self.down = False
+        print(f"Relay {self.destination}: connected to {self.host}:{self.port}")
+
+    def disconnect(self, error):
+        if not self.down:
+            print(f"Relay {self.destination}: {self.host}:{self.port} unavailable ({error}); spooling to disk")
+        self.down = True
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+
+    def spill(self):
+        """Moves everything queued in memory to the disk spool (destination down)."""
+        while True:
+            frames = self.take_batch()
+            if not frames:
+                return
+            self.spool.append(frames)
+            self.counters['spooled'] += len(frames)
+
+    def run(self):
+        last_attempt = 0
+        while not (self.stop_event.is_set() and (self.sock is None or not self.queue)):
+            if self.sock is None:
+                if time.time() - last_attempt < RELAY_RETRY_INTERVAL:
+                    self.spill()
+                    self.stop_event.wait(0.2)
+                    continue
+                last_attempt = time.time()
+                try:
+                    self.connect()
+                except (OSError, ssl.SSLError) as e:
+                    self.disconnect(e)
+                    self.spill()
+                    continue
+            # Older, spooled messages go first
+            chunk = self.spool.read_chunk()
+            if chunk:
+                path, end, data, count = chunk
+                try:
+                    self.sock.sendall(data)
+                except (OSError, ssl.SSLError) as e:
+                    self.disconnect(e)
+                    continue
+                self.spool.advance(path, end)
+                self.counters['replayed'] += count
+                if len(self.queue) >= RELAY_MAX_QUEUED // 2:
+                    self.spill()  # Newer than everything spooled, so order is kept
+                continue
+            if not self.queue:
+                self.wakeup.wait(RELAY_FLUSH_INTERVAL)
+                self.wakeup.clear()
+            frames = self.take_batch()
+            if not frames:
+                continue
+            try:
+                self.sock.sendall(b"".join(frames))
+                self.counters['sent'] += len(frames)
+            except (OSError, ssl.SSLError) as e:
+                self.spool.append(frames)  # Spool is empty here, so order is kept
+                self.counters['spooled'] += len(frames)
+                self.disconnect(e)
+        self.spill()
+        self.spool.close_writer()
+        if self.sock:
+            self.sock.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup.set()
+        self.join()
+
+
+class Relay:
+    """
+    Fans each received message out to every configured destination. Messages without
+    a hostname are given one (see add_origin): the enricher's device name for the
+    source address, if an enricher is given and knows it, otherwise the address.
+    """
+    def __init__(self, destinations, spool_dir=RELAY_SPOOL_DIR, enricher=None, fill_origin=RELAY_ADD_ORIGIN):
+        self.senders = [RelaySender(spool_dir=spool_dir, **destination) for destination in destinations]
+        self.enricher = enricher
+        self.fill_origin = fill_origin
+
+    def start(self):
+        for sender in self.senders:
+            sender.start()
+        return self
+
+    def origin_name(self, ip):
+        if self.enricher:
+            device = self.enricher.lookup(ip_to_int(ip))[0]
+            if device:
+                return device
+        return ip.encode()
+
+    def submit(self, batch):
+        if self.fill_origin:
+            messages = [add_origin(data, self.origin_name(addr[0]), received_at) for data, addr, received_at in batch]
+        else:
+            messages = [data for data, addr, received_at in batch]
+        for sender in self.senders:
+            sender.submit(messages)
+
+    def metrics(self):
+        metrics = {}
+        for sender in self.senders:
+            for name, value in sender.counters.items():
+                metrics[f"relay_{sender.destination}_{name}"] = value
+            metrics[f"relay_{sender.destination}_queued"] = len(sender.queue)
+            metrics[f"relay_{sender.destination}_spool_bytes"] = sender.spool.size()
+            metrics[f"relay_{sender.destination}_connected"] = int(sender.sock is not None)
+        return metrics
+
+    def totals(self):
+        """Counters summed over all destinations, as reported in the server's stats."""
+        counters = [sender.counters for sender in self.senders]
+        return {'relayed': sum(c['sent'] + c['replayed'] for c in counters),
+                'relay_spooled': sum(c['spooled'] for c in counters),
+                'relay_dropped': sum(c['dropped'] for c in counters)}
+
+    def stop(self):
+        for sender in self.senders:
+            sender.stop()
@@ -0,0 +1,307 @@
+import fnmatch
+import json
+import re
+import sys
+import time
+from collections import deque, namedtuple
+from syslog_records import int_to_ip
+
+try:
+    import ahocorasick  # Optional C implementation (pip install pyahocorasick)
+except ImportError:
+    ahocorasick = None
+
+# --- Rule Settings ---
+# Each rule fires when a message contains one of its literals (and matches its regex,
+# if any) `threshold` times within `window` seconds from the same host. After firing
+# it stays quiet for that host for `cooldown` seconds.
+DEFAULT_RULES = [
+    {"name": "device-restart", "literal": "%SYS-5-RESTART"},
+    {"name": "uplink-down", "literal": "%LINK-3-UPDOWN",
+     "regex": r"Interface (TenGigabitEthernet|TwentyFiveGigE|FortyGigabitEthernet|HundredGigE|Port-channel)\S+, changed state to down"},
+    {"name": "login-failure-burst", "literal": "%SEC_LOGIN-4-LOGIN_FAILED", "threshold": 5, "window": 60},
+    {"name": "port-err-disabled", "literal": "%PM-4-ERR_DISABLE"},
+]
+DEFAULT_COOLDOWN = 300
+STATE_PRUNE_INTERVAL = 60       # Seconds between sweeps of idle per-host window state
+MIN_DERIVED_LITERAL = 3         # Shortest literal worth prefiltering on when taken from a regex
+REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+Alert = namedtuple('Alert', ['rule', 'host', 'count', 'first', 'last', 'record'])
+
+
+class Rule:
+    def __init__(self, name, literal=None, literals=None, regex=None, ignore_case=False, threshold=1, window=0,
+                 cooldown=DEFAULT_COOLDOWN, hosts=None):
+        self.name = name
+        flags = re.IGNORECASE if ignore_case else 0
+        self.regex = re.compile(regex.encode(), flags) if regex else None
+        self.literals = [value.encode() for value in ([literal] if literal else []) + list(literals or [])]
+        if not self.literals and regex:
+            derived = required_literal(regex)
+            if derived:
+                self.literals = [derived.encode()]
+        if ignore_case:
+            self.literals = [value.lower() for value in self.literals]
+        self.ignore_case = ignore_case
+        self.threshold = max(1, int(threshold))
+        self.window = float(window)
+        self.cooldown = float(cooldown)
+        self.hosts = hosts or []
+        if not self.literals and not self.regex:
+            raise ValueError(f"Rule '{name}' needs a literal or a regex")
+
+    def host_allowed(self, host):
+        return not self.hosts or any(fnmatch.fnmatchcase(host.lower(), pattern.lower()) for pattern in self.hosts)
+
+
+def required_literal(pattern):
+    """
+    Longest plain run of characters that every match of a simple regex must contain,
+    so regex-only rules can still use the prefilter. Returns None for patterns with
+    alternation at the top level or no run of MIN_DERIVED_LITERAL characters.
+    """
+    if "(?" in pattern:
+        return None  # Inline flags or lookarounds; not worth second-guessing
+    depth = 0
+    for i, char in enumerate(pattern):
+        if char == "\\":
+            continue
+        if char == "(" and (i == 0 or pattern[i - 1] != "\\"):
+            depth += 1
+        elif char == ")" and pattern[i - 1] != "\\":
+            depth -= 1
+        elif char == "|" and depth == 0 and pattern[i - 1] != "\\":
+            return None
+    runs = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            # Escaped punctuation is a literal; escapes such as \d or \S end the run
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                if depth == 0:
+                    current += pattern[i + 1]
+            else:
+                runs.append(current)
+                current = ""
+            i += 2
+            continue
+        if char in "([":
+            runs.append(current)
+            current = ""
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char in "*?{":
+            # The quantifier makes the previous character optional
+            runs.append(current[:-1])
+            current = ""
+            if char == "{":
+                i = pattern.find("}", i) if "}" in pattern[i:] else len(pattern)
+        elif char in REGEX_SPECIAL:
+            runs.append(current)
+            current = ""
+        elif depth == 0:
+            current += char
+        i += 1
+    runs.append(current)
+    best = max(runs, key=len)
+    return best if len(best) >= MIN_DERIVED_LITERAL else None
+
+
+class MultiPatternMatcher:
+    """
+    Aho-Corasick automaton over bytes: one pass over a message finds every literal it
+    contains, whatever the number of literals. Uses pyahocorasick when installed.
+    """
+    def __init__(self, literals):
+        """literals maps bytes -> list of rule ids."""
+        self.literals = literals
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for literal, ids in literals.items():
+                self.automaton.add_word(literal.decode('latin-1'), ids)
+            self.automaton.make_automaton()
+            return
+        self.automaton = None
+        # Trie
+        goto = [{}]
+        output = [[]]
+        for literal, ids in literals.items():
+            state = 0
+            for byte in literal:
+                if byte not in goto[state]:
+                    goto.append({})
+                    output.append([])
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            output[state] = output[state] + list(ids)
+        # Failure links (breadth first), folded into a full transition table so the
+        # scan does a single dict lookup per byte
+        alphabet = {byte for literal in literals for byte in literal}
+        fail = [0] * len(goto)
+        delta = [dict() for _ in goto]
+        queue = deque()
+        for byte in alphabet:
+            child = goto[0].get(byte)
+            if child is not None:
+                delta[0][byte] = child
+                queue.append(child)
+        while queue:
+            state = queue.popleft()
+            output[state] = output[state] + [i for i in output[fail[state]] if i not in output[state]]
+            for byte in alphabet:
+                child = goto[state].get(byte)
+                if child is not None:
+                    fail[child] = delta[fail[state]].get(byte, 0)
+                    delta[state][byte] = child
+                    queue.append(child)
+                else:
+                    target = delta[fail[state]].get(byte, 0)
+                    if target:
+                        delta[state][byte] = target
+        self.delta = delta
+        self.output = output
+
+    def search(self, data):
+        """Returns the set of rule ids whose literals occur in data (bytes)."""
+        found = set()
+        if self.automaton is not None:
+            if self.literals:
+                for end, ids in self.automaton.iter(data.decode('latin-1')):
+                    found.update(ids)
+            return found
+        delta = self.delta
+        output = self.output
+        state = 0
+        for byte in data:
+            state = delta[state].get(byte, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class RulesEngine:
+    """
+    Evaluates every rule against each parsed SyslogRecord.
+
+    All literals (case-sensitive and case-insensitive) are compiled into two
+    multi-pattern matchers, so the per-message cost is one pass over the message plus
+    a regex confirm for only the rules whose literal was seen. Thresholds are counted
+    per rule and host over a sliding window.
+    """
+    def __init__(self, rules, on_alert=None):
+        self.rules = [rule if isinstance(rule, Rule) else Rule(**rule) for rule in rules]
+        self.on_alert = on_alert or print_alert
+        exact = {}
+        folded = {}
+        self.unindexed = []  # Regex rules without a usable literal; checked on every message
+        for rule_id, rule in enumerate(self.rules):
+            if not rule.literals:
+                self.unindexed.append(rule_id)
+            for literal in rule.literals:
+                table = folded if rule.ignore_case else exact
+                table.setdefault(literal, []).append(rule_id)
+        self.exact = MultiPatternMatcher(exact) if exact else None
+        self.folded = MultiPatternMatcher(folded) if folded else None
+        self.windows = {}       # (rule_id, host) -> deque of match times
+        self.quiet_until = {}   # (rule_id, host) -> end of cooldown
+        self.last_prune = time.time()
+        self.matched = 0
+        self.alerts = 0
+
+    def candidates(self, message):
+        rule_ids = set(self.unindexed)
+        if self.exact:
+            rule_ids |= self.exact.search(message)
+        if self.folded:
+            rule_ids |= self.folded.search(message.lower())
+        return rule_ids
+
+    def evaluate(self, record):
+        """Checks one record; returns the alerts it triggered (also passed to on_alert)."""
+        rule_ids = self.candidates(record.message)
+        if not rule_ids:
+            return []
+        alerts = []
+        host = (record.device or record.hostname).decode('utf-8', errors='replace') or int_to_ip(record.src_ip)
+        for rule_id in sorted(rule_ids):
+            rule = self.rules[rule_id]
+            if rule.regex and not rule.regex.search(record.message):
+                continue
+            if not rule.host_allowed(host):
+                continue
+            self.matched += 1
+            alert = self.count_match(rule_id, rule, host, record)
+            if alert:
+                alerts.append(alert)
+        for alert in alerts:
+            self.alerts += 1
+            self.on_alert(alert)
+        return alerts
+
+    def count_match(self, rule_id, rule, host, record):
+        key = (rule_id, host)
+        now = record.received_at
+        if self.quiet_until.get(key, 0) > now:
+            return None
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = deque(maxlen=rule.threshold)
+        window.append(now)
+        while window and now - window[0] > rule.window:
+            window.popleft()
+        if len(window) < rule.threshold:
+            return None
+        alert = Alert(rule, host, len(window), window[0], now, record)
+        window.clear()
+        self.quiet_until[key] = now + rule.cooldown
+        return alert
+
+    def evaluate_batch(self, records):
+        alerts = []
+        for record in records:
+            alerts.extend(self.evaluate(record))
+        if time.time() - self.last_prune >= STATE_PRUNE_INTERVAL:
+            self.prune()
+        return alerts
+
+    def prune(self):
+        """Drops window and cooldown state for hosts that have gone quiet."""
+        now = time.time()
+        for key, window in list(self.windows.items()):
+            if not window or now - window[-1] > self.rules[key[0]].window:
+                del self.windows[key]
+        for key, until in list(self.quiet_until.items()):
+            if until <= now:
+                del self.quiet_until[key]
+        self.last_prune = now
+
+
+def format_alert(alert):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(alert.last))
+    message = alert.record.message.decode('utf-8', errors='replace')
+    if alert.count > 1:
+        return (f"[alert] {stamp} {alert.rule.name} on {alert.host}: {alert.count} matches "
+                f"in {alert.last - alert.first:.0f}s, last: {message}")
+    return f"[alert] {stamp} {alert.rule.name} on {alert.host}: {message}"
+
+def print_alert(alert):
+    print(format_alert(alert))
+
+def load_rules(path):
+    """Reads a JSON list of rule definitions (same keys as DEFAULT_RULES)."""
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    # Replays raw syslog lines from stdin through the rules, e.g. to try out a rules file
+    from syslog_parser import parse_message
+    engine = RulesEngine(load_rules(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RULES)
+    for line in sys.stdin.buffer:
+        engine.evaluate(parse_message(line, ("0.0.0.0", 0), time.time()))
+    print(f"{len(engine.rules)} rules, {engine.matched} matches, {engine.alerts} alerts")
@@ -0,0 +1,269 @@
+import argparse
+import array
+import base64
+import hashlib
+import heapq
+import json
+import math
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter, deque
+from syslog_records import int_to_ip
+
+# --- Sketch Settings ---
+SKETCH_WIDTH = 2048         # Count-min counters per row; overestimates are at most ~e/width of the window's messages
+SKETCH_DEPTH = 4            # Rows (independent hashes); failure probability ~e^-depth
+HLL_PRECISION = 14          # 2^14 registers: ~0.8% standard error on distinct sources
+TOP_CANDIDATES = 64         # Heavy-hitter candidates tracked per bucket and dimension
+BUCKET_SECONDS = 60         # Sliding windows are made of buckets this long...
+BUCKET_COUNT = 60           # ...so the longest window is an hour
+DEFAULT_WINDOW = 300
+DEFAULT_LIMIT = 20
+DIMENSIONS = ('sources', 'mnemonics')
+DEFAULT_URL = "http://127.0.0.1:9514"
+
+
+def hash64(key):
+    """Stable 64-bit hash of bytes (the same in every process, so sketches can be merged)."""
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+class CountMinSketch:
+    """Approximate counts for an unbounded set of keys in width * depth counters."""
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH, table=None):
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else array.array('I', bytes(4 * width * depth))
+
+    def cells(self, key_hash):
+        # Row i uses h1 + i * h2 (Kirsch-Mitzenmacher), so one hash serves every row
+        h1, h2 = key_hash & 0xFFFFFFFF, key_hash >> 32 | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key_hash, count=1):
+        """Adds count and returns the key's new estimate."""
+        table = self.table
+        width = self.width
+        h1, h2 = key_hash & 0xFFFFFFFF, key_hash >> 32 | 1
+        estimate = 0xFFFFFFFF
+        for row in range(self.depth):
+            cell = row * width + (h1 + row * h2) % width
+            value = table[cell] + count
+            if value > 0xFFFFFFFF:
+                value = 0xFFFFFFFF
+            table[cell] = value
+            if value < estimate:
+                estimate = value
+        return estimate
+
+    def estimate(self, key_hash):
+        table = self.table
+        return min(table[cell] for cell in self.cells(key_hash))
+
+    def merge(self, other):
+        self.table = array.array('I', (min(a + b, 0xFFFFFFFF) for a, b in zip(self.table, other.table)))
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2^precision one-byte registers."""
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    def add(self, key_hash):
+        bits = 64 - self.precision
+        index = key_hash >> bits
+        rank = bits - (key_hash & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+
+class HeavyHitters:
+    """The `capacity` keys with the highest count-min estimates, kept with a lazy min-heap."""
+    def __init__(self, capacity=TOP_CANDIDATES):
+        self.capacity = capacity
+        self.counts = {}
+        self.heap = []
+
+    def offer(self, key, estimate):
+        counts = self.counts
+        if key not in counts and len(counts) >= self.capacity:
+            heap = self.heap
+            while counts.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)  # Stale entry from an earlier estimate
+            if estimate <= heap[0][0]:
+                return
+            del counts[heapq.heappop(heap)[1]]
+        counts[key] = estimate
+        heapq.heappush(self.heap, (estimate, key))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(value, name) for name, value in counts.items()]
+            heapq.heapify(self.heap)
+
+
+class SketchBucket:
+    """Sketches for BUCKET_SECONDS of traffic."""
+    def __init__(self, start):
+        self.start = start
+        self.total = 0
+        self.counts = {name: CountMinSketch() for name in DIMENSIONS}
+        self.candidates = {name: HeavyHitters() for name in DIMENSIONS}
+        self.distinct = HyperLogLog()
+
+
+class StreamSketches:
+    """
+    Top sources, top mnemonics and distinct sources over sliding windows of up to
+    BUCKET_SECONDS * BUCKET_COUNT seconds, in memory that does not grow with the fleet.
+    update() is called with each batch of parsed records; every copy is counted,
+    including duplicates later collapsed in the store.
+    """
+    def __init__(self):
+        self.buckets = deque(maxlen=BUCKET_COUNT)
+        self.lock = threading.Lock()
+
+    def update(self, records):
+        if not records:
+            return
+        addresses = Counter(record.src_ip for record in records)
+        devices = {record.src_ip: record.device for record in records if record.device}
+        # Sources are named by inventory device where known, else by address
+        sources = Counter()
+        for address, count in addresses.items():
+            sources[devices.get(address) or int_to_ip(address).encode()] += count
+        mnemonics = Counter(record.mnemonic for record in records if record.mnemonic)
+        now = time.time()
+        with self.lock:
+            if not self.buckets or now - self.buckets[-1].start >= BUCKET_SECONDS:
+                self.buckets.append(SketchBucket(now - now % BUCKET_SECONDS))
+            bucket = self.buckets[-1]
+            bucket.total += len(records)
+            for name, counts in (('sources', sources), ('mnemonics', mnemonics)):
+                sketch = bucket.counts[name]
+                candidates = bucket.candidates[name]
+                for key, count in counts.items():
+                    candidates.offer(key.decode('utf-8', errors='replace'), sketch.add(hash64(key), count))
+            for address in addresses:
+                bucket.distinct.add(hash64(address.to_bytes(4, 'big')))
+
+    def export(self, window=DEFAULT_WINDOW):
+        """The window's buckets merged into one mergeable dict (see merge_exports and summarize)."""
+        cutoff = time.time() - window
+        keys = {name: set() for name in DIMENSIONS}
+        with self.lock:
+            buckets = [bucket for bucket in self.buckets if bucket.start + BUCKET_SECONDS > cutoff]
+            for bucket in buckets:
+                for name in DIMENSIONS:
+                    keys[name].update(bucket.candidates[name].counts)
+        # Merged outside the lock so the writer is not held up; only the newest bucket
+        # is still changing, and its counts are at most one batch behind
+        merged = SketchBucket(buckets[0].start if buckets else time.time())
+        for bucket in buckets:
+            merged.total += bucket.total
+            for name in DIMENSIONS:
+                merged.counts[name].merge(bucket.counts[name])
+            merged.distinct.merge(bucket.distinct)
+        return {
+            'window': window,
+            'start': merged.start,
+            'total': merged.total,
+            'counts': {name: base64.b64encode(merged.counts[name].table.tobytes()).decode() for name in DIMENSIONS},
+            'candidates': {name: sorted(keys[name]) for name in DIMENSIONS},
+            'distinct': base64.b64encode(bytes(merged.distinct.registers)).decode(),
+        }
+
+    def summary(self, window=DEFAULT_WINDOW, limit=DEFAULT_LIMIT):
+        return summarize(self.export(window), limit)
+
+
+def load_export(export):
+    counts = {}
+    for name in DIMENSIONS:
+        table = array.array('I')
+        table.frombytes(base64.b64decode(export['counts'][name]))
+        counts[name] = CountMinSketch(table=table)
+    return counts, HyperLogLog(registers=bytearray(base64.b64decode(export['distinct'])))
+
+def merge_exports(exports):
+    """Combines exports from several processes (e.g. the multi-process workers)."""
+    merged = None
+    for export in exports:
+        if merged is None:
+            merged = export
+            continue
+        counts, distinct = load_export(merged)
+        other_counts, other_distinct = load_export(export)
+        for name in DIMENSIONS:
+            counts[name].merge(other_counts[name])
+        distinct.merge(other_distinct)
+        merged = {
+            'window': merged['window'],
+            'start': min(merged['start'], export['start']),
+            'total': merged['total'] + export['total'],
+            'counts': {name: base64.b64encode(counts[name].table.tobytes()).decode() for name in DIMENSIONS},
+            'candidates': {name: sorted(set(merged['candidates'][name]) | set(export['candidates'][name]))
+                           for name in DIMENSIONS},
+            'distinct': base64.b64encode(bytes(distinct.registers)).decode(),
+        }
+    return merged
+
+def summarize(export, limit=DEFAULT_LIMIT):
+    """Top-N sources and mnemonics (estimated counts) and distinct sources from an export."""
+    counts, distinct = load_export(export)
+    result = {'window': export['window'], 'since': export['start'], 'messages': export['total'],
+              'distinct_sources': distinct.count() if export['total'] else 0}
+    for name in DIMENSIONS:
+        estimates = [(counts[name].estimate(hash64(key.encode('utf-8', errors='replace'))), key)
+                     for key in export['candidates'][name]]
+        estimates.sort(key=lambda item: (-item[0], item[1]))
+        result[f"top_{name}"] = [[key, count] for count, key in estimates[:limit]]
+    return result
+
+
+def parse_window(value):
+    """Seconds, or a number with an s/m/h suffix ('90s', '5m', '1h')."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if value[-1:] in units:
+        return int(value[:-1]) * units[value[-1]]
+    return int(value)
+
+def print_summary(summary):
+    stamp = time.strftime("%H:%M:%S", time.localtime(summary['since']))
+    print(f"{summary['messages']} messages since {stamp}, ~{summary['distinct_sources']} distinct sources")
+    for name in DIMENSIONS:
+        print(f"\nTop {name}:")
+        for key, count in summary[f"top_{name}"]:
+            print(f"{count:10} {key}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show live top talkers from a running Syslog_Server.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Metrics endpoint of the server (default: %(default)s)")
+    parser.add_argument("--window", type=parse_window, default=DEFAULT_WINDOW, help="e.g. 60, 5m, 1h (default: 300s)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON")
+    args = parser.parse_args()
+    try:
+        with urllib.request.urlopen(f"{args.url}/top?window={args.window}&limit={args.limit}", timeout=10) as response:
+            summary = json.load(response)
+    except OSError as e:
+        print(f"Could not query {args.url}: {e}")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
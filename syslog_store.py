@@ -0,0 +1,259 @@
+import calendar
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from syslog_index import build_query_index, query_index_path
+from syslog_records import encode_record, int_to_ip, read_record_file
+
+# --- Store Settings ---
+SEGMENT_SECONDS = 3600                    # Each segment covers one hour of receive time
+MAX_STORE_BYTES = 20 * 1024 ** 3          # Oldest segments are deleted above this total size
+MAX_AGE_SECONDS = 30 * 86400              # ...or once they are older than this
+SEGMENT_PREFIX = "segment-"
+
+
+def segment_name(window_start):
+    return SEGMENT_PREFIX + time.strftime("%Y%m%dT%H%M%S", time.gmtime(window_start))
+
+def read_segment_bytes(path):
+    """Returns the raw record bytes of a segment file, compressed or not."""
+    if path.endswith(".gz"):
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    with open(path, 'rb') as f:
+        return f.read()
+
+def load_index(index_path):
+    with open(index_path) as f:
+        return json.load(f)
+
+def list_segments(directory, recursive=False):
+    """
+    Returns the sidecar index of every closed segment in directory, oldest first.
+    Each index has 'file', 'start', 'end', 'first', 'last', 'count', 'hosts', 'sites' and 'severities'.
+    With recursive, per-worker subdirectories (see Syslog_Server multi-process mode) are included.
+    """
+    patterns = [os.path.join(directory, SEGMENT_PREFIX + "*.idx.json")]
+    if recursive:
+        patterns.append(os.path.join(directory, "*", SEGMENT_PREFIX + "*.idx.json"))
+    segments = []
+    for index_path in (path for pattern in patterns for path in glob.glob(pattern)):
+        try:
+            index = load_index(index_path)
+        except (OSError, ValueError):
+            continue  # Being rewritten by the compressor
+        index['index_path'] = index_path
+        index['query_index_path'] = query_index_path(index_path)
+        index['file'] = os.path.join(os.path.dirname(index_path), index['file'])
+        segments.append(index)
+    segments.sort(key=lambda index: index['start'])
+    return segments
+
+def segments_for_range(directory, start=None, end=None, hosts=None, max_severity=None):
+    """
+    Returns closed segments whose sidecar index overlaps [start, end) and, if given,
+    contains any of hosts and any severity <= max_severity. Only these need reading.
+    """
+    selected = []
+    for index in list_segments(directory, recursive=True):
+        if start is not None and index['last'] < start:
+            continue
+        if end is not None and index['first'] >= end:
+            continue
+        if hosts and not set(hosts) & set(index['hosts']):
+            continue
+        if max_severity is not None and not any(int(sev) <= max_severity for sev in index['severities']):
+            continue
+        selected.append(index)
+    return selected
+
+def active_segments(directory, recursive=False):
+    """Returns the paths of segments still being written (no sidecar index yet)."""
+    patterns = [os.path.join(directory, SEGMENT_PREFIX + "*.rec")]
+    if recursive:
+        patterns.append(os.path.join(directory, "*", SEGMENT_PREFIX + "*.rec"))
+    return sorted(path for pattern in patterns for path in glob.glob(pattern)
+                  if not os.path.exists(path[:-len(".rec")] + ".idx.json"))
+
+
+class SegmentIndex:
+    """In-memory index of the segment being written; saved as its sidecar on roll-over."""
+    def __init__(self, window_start, window_end):
+        self.start = window_start
+        self.end = window_end
+        self.first = None
+        self.last = None
+        self.count = 0
+        self.bytes = 0
+        self.hosts = set()
+        self.sites = set()
+        self.severities = {}
+
+    def add(self, record, size):
+        if self.first is None or record.received_at < self.first:
+            self.first = record.received_at
+        if self.last is None or record.received_at > self.last:
+            self.last = record.received_at
+        self.count += 1
+        self.bytes += size
+        self.hosts.add(int_to_ip(record.src_ip))
+        if record.hostname:
+            self.hosts.add(record.hostname.decode('utf-8', errors='replace'))
+        if record.device:
+            self.hosts.add(record.device.decode('utf-8', errors='replace'))
+        if record.site:
+            self.sites.add(record.site.decode('utf-8', errors='replace'))
+        self.severities[record.severity] = self.severities.get(record.severity, 0) + 1
+
+    def to_dict(self, file_name):
+        return {
+            'file': file_name,
+            'start': self.start,
+            'end': self.end,
+            'first': self.first,
+            'last': self.last,
+            'count': self.count,
+            'bytes': self.bytes,
+            'hosts': sorted(self.hosts),
+            'sites': sorted(self.sites),
+            'severities': {str(sev): count for sev, count in sorted(self.severities.items())},
+        }
+
+
+class SegmentStore:
+    """
+    Appends SyslogRecords into time-bounded segment files.
+
+    When a record falls outside the current segment's window the segment is closed:
+    its sidecar index (time range, hosts, severities) is written, and the query index
+    (see syslog_index) is built and the file gzip-compressed in the background. Size- and age-based retention runs on every roll.
+    """
+    def __init__(self, directory, segment_seconds=SEGMENT_SECONDS, max_bytes=MAX_STORE_BYTES,
+                 max_age=MAX_AGE_SECONDS, compress=True):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.file = None
+        self.path = None
+        self.index = None
+        self.compressors = []
+        os.makedirs(directory, exist_ok=True)
+        # Segments left open by an earlier run are closed before new data arrives
+        for path in active_segments(directory):
+            self.recover_segment(path)
+
+    def window_for(self, timestamp):
+        start = int(timestamp // self.segment_seconds) * self.segment_seconds
+        return start, start + self.segment_seconds
+
+    def append(self, records):
+        """
+        Appends records (in receive order), rolling segments at window boundaries.
+        Returns the number of bytes written.
+        """
+        chunks = []
+        written = 0
+        for record in records:
+            if self.index is None or not (self.index.start <= record.received_at < self.index.end):
+                if chunks:
+                    self.file.write(b"".join(chunks))
+                    chunks = []
+                self.open_segment(record.received_at)
+            encoded = encode_record(record)
+            self.index.add(record, len(encoded))
+            chunks.append(encoded)
+            written += len(encoded)
+        if chunks:
+            self.file.write(b"".join(chunks))
+        return written
+
+    def open_segment(self, timestamp):
+        self.roll()
+        start, end = self.window_for(timestamp)
+        self.path = os.path.join(self.directory, segment_name(start) + ".rec")
+        self.index = SegmentIndex(start, end)
+        if os.path.exists(self.path) or os.path.exists(self.path[:-len(".rec")] + ".idx.json"):
+            # Re-opened window (e.g. after a restart within the same hour)
+            self.path = os.path.join(self.directory, f"{segment_name(start)}-{int(time.time())}.rec")
+        self.file = open(self.path, 'ab')
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def roll(self):
+        """Closes the active segment, writes its sidecar index and compresses it."""
+        if self.file is None:
+            return
+        self.file.close()
+        self.close_segment(self.path, self.index)
+        self.file = self.path = self.index = None
+        self.enforce_retention()
+
+    def close_segment(self, path, index):
+        base = path[:-len(".rec")]
+        write_index(base + ".idx.json", index.to_dict(os.path.basename(path)))
+        worker = threading.Thread(target=finish_segment, args=(path, base + ".idx.json", self.compress), daemon=True)
+        worker.start()
+        self.compressors = [t for t in self.compressors if t.is_alive()] + [worker]
+
+    def recover_segment(self, path):
+        start = calendar.timegm(time.strptime(os.path.basename(path)[len(SEGMENT_PREFIX):][:15], "%Y%m%dT%H%M%S"))
+        index = SegmentIndex(start, start + self.segment_seconds)
+        for record in read_record_file(path):
+            index.add(record, 0)
+        index.bytes = os.path.getsize(path)
+        if index.count:
+            self.close_segment(path, index)
+        else:
+            os.remove(path)
+
+    def enforce_retention(self):
+        segments = list_segments(self.directory)
+        cutoff = time.time() - self.max_age
+        total = sum(os.path.getsize(s['file']) for s in segments if os.path.exists(s['file']))
+        for index in segments:
+            expired = index['end'] < cutoff
+            if not expired and total <= self.max_bytes:
+                break
+            size = os.path.getsize(index['file']) if os.path.exists(index['file']) else 0
+            for path in (index['file'], index['index_path'], index['query_index_path']):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
+            print(f"Retention: removed segment {os.path.basename(index['file'])}")
+
+    def close(self):
+        self.roll()
+        for worker in self.compressors:
+            worker.join()
+
+
+def write_index(index_path, index):
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+def finish_segment(path, index_path, compress=True):
+    """Background work for a closed segment: builds its query index, then compresses it."""
+    build_query_index(read_segment_bytes(path), query_index_path(index_path))
+    if compress:
+        compress_segment(path, index_path)
+
+def compress_segment(path, index_path):
+    """Gzips a closed segment and points its sidecar index at the compressed file."""
+    gz_path = path + ".gz"
+    with open(path, 'rb') as src, gzip.open(gz_path + ".tmp", 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(gz_path + ".tmp", gz_path)
+    index = load_index(index_path)
+    index['file'] = os.path.basename(gz_path)
+    write_index(index_path, index)
+    os.remove(path)
@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import functools
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+import time
+
+# --- Stream Listener Settings ---
+MAX_MESSAGE_SIZE = 64 * 1024     # Longest accepted frame; newline frames above this are cut and counted as truncated
+STREAM_READ_SIZE = 64 * 1024     # Bytes read from a connection per wakeup
+MAX_PENDING_BATCHES = 256        # Writer backlog above which connections stop being read
+BACKPRESSURE_POLL = 0.01         # Seconds between backlog checks while paused
+MAX_LENGTH_DIGITS = 9            # Octet-counting length prefix longer than this is a framing error
+
+
+class FramingError(Exception):
+    pass
+
+
+class FrameDecoder:
+    """
+    Splits a syslog byte stream into messages (RFC 6587).
+
+    Octet counting ('<length> <message>') is used when a frame starts with a digit;
+    otherwise the frame runs to the next LF (non-transparent framing). Senders may
+    mix both on one connection.
+    """
+    def __init__(self, max_size=MAX_MESSAGE_SIZE):
+        self.max_size = max_size
+        self.buffer = bytearray()
+        self.discarding = False  # Skipping the rest of an oversized newline frame
+        self.truncated = 0
+
+    def feed(self, data):
+        """Adds received bytes and returns the list of complete messages."""
+        self.buffer += data
+        messages = []
+        while self.buffer:
+            if self.discarding:
+                newline = self.buffer.find(b"\n")
+                if newline < 0:
+                    self.buffer.clear()
+                    break
+                del self.buffer[:newline + 1]
+                self.discarding = False
+                continue
+            if self.buffer[:1].isdigit():
+                space = self.buffer.find(b" ", 0, MAX_LENGTH_DIGITS + 1)
+                if space < 0:
+                    if len(self.buffer) > MAX_LENGTH_DIGITS:
+                        raise FramingError(f"invalid octet count {bytes(self.buffer[:MAX_LENGTH_DIGITS + 1])!r}")
+                    break
+                prefix = bytes(self.buffer[:space])
+                if not prefix.isdigit():
+                    raise FramingError(f"invalid octet count {prefix!r}")
+                length = int(prefix)
+                if length > self.max_size:
+                    raise FramingError(f"frame of {length} bytes exceeds {self.max_size}")
+                if len(self.buffer) < space + 1 + length:
+                    break
+                messages.append(bytes(self.buffer[space + 1:space + 1 + length]))
+                del self.buffer[:space + 1 + length]
+            else:
+                newline = self.buffer.find(b"\n")
+                if newline < 0:
+                    if len(self.buffer) > self.max_size:
+                        messages.append(bytes(self.buffer[:self.max_size]))
+                        self.truncated += 1
+                        self.buffer.clear()
+                        self.discarding = True
+                    break
+                message = bytes(self.buffer[:newline]).rstrip(b"\r")
+                if len(message) > self.max_size:
+                    message = message[:self.max_size]
+                    self.truncated += 1
+                if message:  # Skip blank lines (e.g. a CRLF trailing an octet-counted frame)
+                    messages.append(message)
+                del self.buffer[:newline + 1]
+        return messages
+
+    def flush(self):
+        """Returns an unterminated trailing newline frame when the peer closes."""
+        message = b""
+        if self.buffer and not self.discarding and not self.buffer[:1].isdigit():
+            message = bytes(self.buffer).rstrip(b"\r")
+        self.buffer.clear()
+        return [message] if message else []
+
+    def take_truncated(self):
+        count, self.truncated = self.truncated, 0
+        return count
+
+
+async def handle_connection(reader, stream, log_writer, stats):
+    """Reads one device connection and hands each chunk's messages to the writer as a batch."""
+    peer = stream.get_extra_info('peername') or ('0.0.0.0', 0)
+    addr = (peer[0], peer[1])
+    decoder = FrameDecoder()
+    stats.add(connections=1)
+    loop = asyncio.get_running_loop()
+
+    async def submit(messages):
+        if messages:
+            now = time.time()
+            batch = [(message, addr, now) for message in messages]
+            # A blocking submit waits for room in the writer queue; wait in a worker
+            # thread so only this connection stalls, not the loop and every other peer
+            await loop.run_in_executor(None, functools.partial(log_writer.submit, batch, block=True))
+            stats.add(received=len(messages), bytes_received=sum(len(m) for m in messages),
+                      truncated=decoder.take_truncated())
+
+    try:
+        while True:
+            data = await reader.read(STREAM_READ_SIZE)
+            if not data:
+                break
+            await submit(decoder.feed(data))
+            # Backpressure: while the writer is behind, stop reading so the
+            # sender's TCP window fills up instead of messages being dropped
+            while log_writer.pending() > MAX_PENDING_BATCHES or log_writer.full():
+                await asyncio.sleep(BACKPRESSURE_POLL)
+        await submit(decoder.flush())
+    except FramingError as e:
+        print(f"Closing connection from {addr[0]}:{addr[1]}: {e}")
+        stats.add(framing_errors=1)
+    except (ConnectionError, ssl.SSLError, OSError) as e:
+        print(f"Connection from {addr[0]}:{addr[1]} failed: {e}")
+    finally:
+        stream.close()
+
+
+class StreamListener(threading.Thread):
+    """
+    Runs the TCP and/or TLS syslog listeners on an asyncio loop in a background thread.
+    Messages go to the same BatchedLogWriter as UDP datagrams.
+    """
+    def __init__(self, address, log_writer, stats, tcp_port=None, tls_port=None, ssl_context=None, reuse_port=False):
+        super().__init__(name="syslog-stream", daemon=True)
+        self.address = address
+        self.log_writer = log_writer
+        self.stats = stats
+        self.tcp_port = tcp_port
+        self.tls_port = tls_port
+        self.ssl_context = ssl_context
+        self.reuse_port = reuse_port
+        self.loop = None
+        self.stop_requested = None
+        self.ready = threading.Event()
+        self.error = None
+        self.connections = set()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.serve())
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+            self.loop.close()
+
+    async def serve(self):
+        self.stop_requested = asyncio.Event()
+
+        async def handler(reader, stream):
+            task = asyncio.current_task()
+            self.connections.add(task)
+            try:
+                await handle_connection(reader, stream, self.log_writer, self.stats)
+            finally:
+                self.connections.discard(task)
+
+        servers = []
+        if self.tcp_port:
+            servers.append(await asyncio.start_server(handler, self.address, self.tcp_port,
+                                                      reuse_port=self.reuse_port, backlog=1024))
+            print(f"Listening for syslog over TCP on {self.address}:{self.tcp_port}")
+        if self.tls_port:
+            servers.append(await asyncio.start_server(handler, self.address, self.tls_port, ssl=self.ssl_context,
+                                                      reuse_port=self.reuse_port, backlog=1024))
+            print(f"Listening for syslog over TLS on {self.address}:{self.tls_port}")
+        self.ready.set()
+        await self.stop_requested.wait()
+        for server in servers:
+            server.close()
+        for task in list(self.connections):
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    def wait_ready(self, timeout=10):
+        """Waits for the listeners to bind; raises the bind error if they could not."""
+        self.ready.wait(timeout)
+        if self.error:
+            raise self.error
+
+    def stop(self):
+        if self.loop and self.stop_requested and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self.stop_requested.set)
+            except RuntimeError:
+                pass  # Loop already finished
+        self.join()
+
+
+def make_server_ssl_context(certfile, keyfile, cafile=None):
+    """TLS context for the listener; with cafile, devices must present a certificate signed by it."""
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile, keyfile)
+    if cafile:
+        context.load_verify_locations(cafile)
+        context.verify_mode = ssl.CERT_REQUIRED
+    return context
+
+
+# --- Local Testing Helpers ---
+
+def generate_self_signed_cert(cert_path, key_path, common_name="localhost", days=365):
+    """Creates a self-signed certificate and key with openssl for local TLS testing."""
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-sha256",
+                    "-keyout", key_path, "-out", cert_path, "-days", str(days),
+                    "-subj", f"/CN={common_name}", "-addext", f"subjectAltName=DNS:{common_name},IP:127.0.0.1"],
+                   check=True, capture_output=True)
+    print(f"Wrote {cert_path} and {key_path}")
+
+def frame_message(message, framing="octet"):
+    if framing == "octet":
+        return str(len(message)).encode() + b" " + message
+    return message + b"\n"
+
+def send_messages(host, port, messages, framing="octet", cafile=None):
+    """Client stand-in: sends messages over one TCP (or, with cafile, TLS) connection."""
+    sock = socket.create_connection((host, port))
+    if cafile:
+        context = ssl.create_default_context(cafile=cafile)
+        sock = context.wrap_socket(sock, server_hostname=host)
+    try:
+        sock.sendall(b"".join(frame_message(message, framing) for message in messages))
+        # Close gracefully so unsent data is not discarded by a reset
+        if cafile:
+            sock = sock.unwrap()
+        sock.shutdown(socket.SHUT_WR)
+        while sock.recv(4096):
+            pass
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCP/TLS syslog testing helpers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    gen_cert = commands.add_parser("gen-cert", help="Generate a self-signed certificate for the TLS listener")
+    gen_cert.add_argument("directory")
+    gen_cert.add_argument("--cn", default="localhost")
+    send = commands.add_parser("send", help="Send test messages to a TCP/TLS listener")
+    send.add_argument("host")
+    send.add_argument("port", type=int)
+    send.add_argument("--count", type=int, default=1000)
+    send.add_argument("--size", type=int, default=0, help="Pad each message to this many bytes")
+    send.add_argument("--framing", choices=("octet", "newline"), default="octet")
+    send.add_argument("--cafile", help="Use TLS and trust this certificate")
+    args = parser.parse_args()
+
+    if args.command == "gen-cert":
+        os.makedirs(args.directory, exist_ok=True)
+        generate_self_signed_cert(os.path.join(args.directory, "syslog.crt"),
+                                  os.path.join(args.directory, "syslog.key"), args.cn)
+        sys.exit(0)
+
+    messages = []
+    for i in range(args.count):
+        message = f"<189>{i}: test-sw01: *Mar  1 00:00:01.123: %SYS-5-CONFIG_I: Configured from console by admin ({i})".encode()
+        messages.append(message.ljust(args.size, b"x"))
+    start = time.time()
+    send_messages(args.host, args.port, messages, args.framing, args.cafile)
+    print(f"Sent {len(messages)} messages in {time.time() - start:.2f}s")
@@ -0,0 +1,31 @@
+from config_transfer import find_missing_lines
+
+RUNNING_CONFIG = """SW1#show running-config
+Building configuration...
+
+Current configuration : 412 bytes
+!
+hostname SW1
+!
+username admin privilege 15 secret 9 $9$abc
+!
+interface GigabitEthernet1/0/1
+ switchport mode access
+!
+interface GigabitEthernet1/0/2
+!
+end
+
+SW1#"""
+
+
+def test_abbreviated_and_range_lines_are_found():
+    lines = ["int range gig 1/0/1 - 48", "do wr mem", "int gi1/0/1", "sw mode acc", "exit",
+             "username admin privilege 15 secret Passw0rd", "end"]
+    assert find_missing_lines(lines, RUNNING_CONFIG) == []
+
+
+def test_line_under_the_wrong_interface_is_missing():
+    lines = ["interface GigabitEthernet1/0/2", " switchport mode access"]
+    assert find_missing_lines(lines, RUNNING_CONFIG) == [
+        "interface GigabitEthernet1/0/2 > switchport mode access"]
@@ -0,0 +1,88 @@
+from ios_config_lint import lint_config_lines
+
+
+def test_comment_and_blank_lines_are_not_commands():
+    lines = [
+        "# Baseline for 2960X access switches",
+        "",
+        "!",
+        "hostname SW1",
+        "interface GigabitEthernet1/0/1",
+        "  # access port for the printer",
+        " description printer",
+        "!",
+    ]
+    assert lint_config_lines(lines) == []
+
+
+def test_unknown_command_is_still_reported():
+    issues = lint_config_lines(["# comment", "hostnme SW1"])
+    assert [(issue.line_number, issue.severity) for issue in issues] == [(2, 'warning')]
+
+
+# Saved from a 2960X running-config, as in 2960x_config.txt and aaa_config_part_*.txt
+AAA_CONFIG = """version 15.2
+no service pad
+service timestamps debug datetime msec
+service password-encryption
+hostname SW1
+!
+aaa new-model
+aaa group server radius ISE
+ server name ISE-1
+ deadtime 15
+aaa authentication dot1x default group ISE
+aaa accounting dot1x default start-stop group ISE
+!
+mls qos
+no vstack
+access-session mac-move deny
+service-template DEFAULT_LINKSEC_POLICY_MUST_SECURE
+ linksec policy must-secure
+service-template CRITICAL_AUTH_VLAN
+ vlan 999
+!
+ip access-list extended ACL-DEFAULT
+ 10 permit udp any eq bootpc any eq bootps
+ 20 permit udp any any eq domain
+ 30 deny ip any any
+!
+class-map type control subscriber match-all DOT1X_FAILED
+ match method dot1x
+ match result-type method dot1x authoritative
+!
+policy-map type control subscriber DOT1X_MAB_POLICY
+ event session-started match-all
+  10 class always do-until-failure
+   10 authenticate using dot1x priority 10
+ event authentication-failure match-first
+  5 class DOT1X_FAILED do-until-failure
+   10 terminate dot1x
+   20 authenticate using mab priority 20
+  10 class AAA_SVR_DOWN_UNAUTHD_HOST do-until-failure
+   10 activate service-template CRITICAL_AUTH_VLAN
+   20 authorize
+   30 pause reauthentication
+!
+interface GigabitEthernet1/0/1
+ switchport mode access
+ access-session port-control auto
+ mab
+ dot1x pae authenticator
+ service-policy type control subscriber DOT1X_MAB_POLICY
+!
+radius server ISE-1
+ address ipv4 10.1.1.10 auth-port 1812 acct-port 1813
+ key 7 0822455D0A16
+end"""
+
+
+def test_saved_aaa_config_has_no_errors():
+    issues = lint_config_lines(AAA_CONFIG.splitlines())
+    assert [issue for issue in issues if issue.severity == 'error'] == []
+
+
+def test_wrong_mode_is_an_error_and_unknown_command_a_warning():
+    issues = lint_config_lines(["switchport mode access", "frobnicate all", "ip access-list extended X",
+                                " 10 permit ip 10.0.0.0 255.255.255.0 any", " no 10"])
+    assert [(issue.line_number, issue.severity) for issue in issues] == [(1, 'error'), (2, 'warning'), (4, 'error')]
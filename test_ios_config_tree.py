@@ -0,0 +1,32 @@
+from ios_config_tree import parse_config_tree, compute_config_delta
+
+RUNNING_CONFIG = """hostname SW1
+!
+interface GigabitEthernet1/0/1
+ description printer
+ switchport access vlan 10
+ switchport mode access
+!
+interface GigabitEthernet1/0/2
+ switchport mode access
+!
+end"""
+
+
+def test_abbreviated_lines_match_the_running_config():
+    desired = parse_config_tree([
+        "int gi1/0/1",
+        "sw acc vl 10",
+        "sw mode acc",
+        "int range gi1/0/1 - 2",
+        "sw mode access",
+        "exit",
+        "hostname SW1",
+    ])
+    assert compute_config_delta(desired, parse_config_tree(RUNNING_CONFIG.splitlines())) == []
+
+
+def test_lines_missing_on_one_interface_of_a_range_are_pushed():
+    desired = parse_config_tree(["int range gi1/0/1 - 2", "sw acc vl 10"])
+    assert compute_config_delta(desired, parse_config_tree(RUNNING_CONFIG.splitlines())) == [
+        "interface GigabitEthernet1/0/2", "switchport access vlan 10"]
@@ -1,9 +1,7 @@
 import socket
 import time
 from datetime import datetime
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from notify_outbox import NotificationOutbox, SMTPTransport
 
 # Configuration for SMTP
 smtp_server = 'smtp-gateway.test.com'  # Replace with your SMTP server
@@ -22,22 +20,15 @@ dns_threshold = 500  # milliseconds
 latency_threshold = 1000  # milliseconds
 packet_loss_threshold = 10  # percent
 
+# Alerts are queued and sent as digests over one persistent SMTP connection
+outbox = NotificationOutbox(SMTPTransport(
+    smtp_server, smtp_port, smtp_user, email_recipient,
+    #username=smtp_user, password=smtp_password,
+)).start()
+
 def send_alert(message):
-    """Send an email alert using SMTP."""
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = email_recipient
-    msg['Subject'] = 'Network Performance Alert'
-    msg.attach(MIMEText(message, 'html'))
-    
-    try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user)
-            server.sendmail(smtp_user, email_recipient, msg.as_string())
-        print("Email sent successfully")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    """Queue an email alert for the background SMTP sender."""
+    outbox.enqueue('Network Performance Alert', message, subtype='html')
 
 def run_test():
     global test_num
@@ -77,18 +68,21 @@ def run_test():
         send_alert(f"Performance Alert: Packet Loss {packet_loss:.2f}% exceeded threshold")
     return results
 
-while True:
-    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    results = run_test()
-    with open("network_test_results.html", "r") as file:
-        existing_content = file.read()
+try:
+    while True:
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        results = run_test()
+        with open("network_test_results.html", "r") as file:
+            existing_content = file.read()
     
-    with open("network_test_results.html", "w") as file:
-        file.write(f"<html><body><h1>Network Test Results - {current_time}</h1><ul>")
-        for result in results:
-            file.write(f"<li>{result}</li>")
-        file.write("</ul>")
-        file.write(existing_content)
-        file.write("</body></html>")
+        with open("network_test_results.html", "w") as file:
+            file.write(f"<html><body><h1>Network Test Results - {current_time}</h1><ul>")
+            for result in results:
+                file.write(f"<li>{result}</li>")
+            file.write("</ul>")
+            file.write(existing_content)
+            file.write("</body></html>")
     
-    time.sleep(10)  # Delay between tests
\ No newline at end of file
+        time.sleep(10)  # Delay between tests
+finally:
+    outbox.close()  # Send whatever is still queued (Ctrl+C included)